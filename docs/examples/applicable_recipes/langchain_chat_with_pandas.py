@@ -2,30 +2,58 @@
 Demonstrates how to use the `ChatInterface` and `PanelCallbackHandler` to create a
 chatbot to talk to your Pandas DataFrame. This is heavily inspired by the
 [LangChain `chat_pandas_df` Reference Example](https://github.com/langchain-ai/streamlit-agent/blob/main/streamlit_agent/chat_pandas_df.py).
+
+Highlights:
+
+- Parses the uploaded CSV into an Arrow table with `ArrowFrame`, in parallel blocks off the event
+    loop, instead of a pandas DataFrame on the event loop.
+- Only sends a window of rows to the browser at a time.
+- Creates the agent with the first question, on the columns of the table only, as its code runs
+    in the sandbox.
+- Runs the code of the agent in a `PandasSandbox` of worker processes, with a time and memory limit
+    per call, on the table memory mapped from an Arrow file, and reports the time of each call.
+- Answers simple questions, like "how many species are there?", locally with an `IntentMatcher`
+    in milliseconds, and only asks the agent otherwise.
+- Gives the agent a profile of the table in its prompt, cached by the content of the uploaded file,
+    so it does not need tool calls to find out its structure.
+- Offers the penguins dataset from the local `DatasetCache`, seeded from the copy next to the
+    recipe, instead of downloading it when the recipe is imported.
 """
 
 from __future__ import annotations
 
+import asyncio
+from functools import partial
 from pathlib import Path
 from textwrap import dedent
 
 import pandas as pd
 import panel as pn
 import param
-import requests
 from langchain.agents import AgentType
 from langchain.chat_models import ChatOpenAI
+from langchain.tools import BaseTool
 from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
+from pydantic import Field
+
+from panel_chat_examples.cache import content_key
+from panel_chat_examples.columnar import WINDOW_ROWS, ArrowFrame
+from panel_chat_examples.datasets import get_dataset_cache
+from panel_chat_examples.frame_profile import get_profile_cache
+from panel_chat_examples.intents import IntentMatcher
+from panel_chat_examples.sandbox import SandboxError, get_sandbox, share_table
 
 pn.extension("perspective")
 
-PENGUINS_URL = (
-    "https://raw.githubusercontent.com/mwaskom/seaborn-data/master/penguins.csv"
+PENGUINS_PATH = get_dataset_cache().source_path(
+    "penguins", seed=Path(__file__).parent / "penguins.csv"
 )
-PENGUINS_PATH = Path(__file__).parent / "penguins.csv"
-if not PENGUINS_PATH.exists():
-    response = requests.get(PENGUINS_URL)
-    PENGUINS_PATH.write_text(response.text)
+
+AGENT_PREFIX = """You are working with a pandas dataframe in Python. \
+The name of the dataframe is `df`. This is a profile of `df`, \
+use it instead of inspecting `df` with the tool:
+
+"""
 
 FILE_DOWNLOAD_STYLE = """
 .bk-btn a {
@@ -44,13 +72,68 @@ class AgentConfig(param.Parameterized):
     avatar = param.String("🐼")
 
     show_chain_of_thought = param.Boolean(default=False)
+    answer_locally = param.Boolean(
+        default=True, doc="Answers simple questions without the agent"
+    )
 
     def _get_agent_message(self, message: str) -> pn.chat.ChatMessage:
         return pn.chat.ChatMessage(message, user=self.user, avatar=self.avatar)
 
 
+def table_view(frame: ArrowFrame) -> pn.viewable.Viewable:
+    """Shows the rows of the table, WINDOW_ROWS rows at a time"""
+    if len(frame) <= WINDOW_ROWS:
+        return pn.pane.Perspective(frame.window(), sizing_mode="stretch_width")
+    first_row = pn.widgets.EditableIntSlider(
+        name=f"First row of {len(frame):,}",
+        start=0,
+        end=len(frame) - 1,
+        step=WINDOW_ROWS,
+        value=0,
+    )
+    window = pn.bind(lambda start: frame.window(start, start + WINDOW_ROWS), first_row)
+    return pn.Column(
+        first_row,
+        pn.pane.Perspective(window, sizing_mode="stretch_width", height=500),
+        sizing_mode="stretch_width",
+    )
+
+
+class SandboxedPythonTool(BaseTool):
+    """Replaces the `python_repl_ast` tool of the agent to run its code in the sandbox"""
+
+    name: str = "python_repl_ast"
+    description: str = (
+        "A Python shell. Use this to execute python commands. Input should be a valid "
+        "python command. When using this tool, sometimes output is abbreviated - make "
+        "sure it does not look abbreviated before using it in your answer."
+    )
+    table_path: str
+    seconds: list = Field(default_factory=list)
+
+    def _run(self, query: str, run_manager=None) -> str:
+        try:
+            result = get_sandbox().run(query, self.table_path)
+        except SandboxError as error:
+            return str(error)
+        self.seconds.append(result.seconds)
+        return result.output
+
+    async def _arun(self, query: str, run_manager=None) -> str:
+        try:
+            result = await get_sandbox().arun(query, self.table_path)
+        except SandboxError as error:
+            return str(error)
+        self.seconds.append(result.seconds)
+        return result.output
+
+
 class AppState(param.Parameterized):
-    data = param.DataFrame()
+    frame = param.ClassSelector(class_=ArrowFrame, doc="The uploaded table")
+    table_path = param.String(
+        default=None, doc="The Arrow file of the table, memory mapped by the sandbox"
+    )
+    profile = param.String(default="", doc="The profile of the table for the agent")
 
     llm = param.Parameter(constant=True)
     pandas_df_agent = param.Parameter(constant=True)
@@ -62,6 +145,8 @@ class AppState(param.Parameterized):
             config = AgentConfig()
 
         super().__init__(config=config)
+        self.python_tool: SandboxedPythonTool | None = None
+        self.intent_matcher = IntentMatcher()
         with param.edit_constant(self):
             self.llm = ChatOpenAI(
                 temperature=0,
@@ -69,25 +154,50 @@ class AppState(param.Parameterized):
                 streaming=True,
             )
 
-    @param.depends("llm", "data", on_init=True, watch=True)
+    @property
+    def data(self) -> pd.DataFrame | None:
+        """The pandas view of the uploaded table"""
+        return None if self.frame is None else self.frame.to_pandas()
+
+    @param.depends("llm", "frame", on_init=True, watch=True)
     def _reset_pandas_df_agent(self):
+        # the agent is created with the first question about the table
         with param.edit_constant(self):
-            if not self.error_message:
-                self.pandas_df_agent = create_pandas_dataframe_agent(
-                    self.llm,
-                    self.data,
-                    verbose=True,
-                    agent_type=AgentType.OPENAI_FUNCTIONS,
-                    handle_parsing_errors=True,
-                )
-            else:
-                self.pandas_df_agent = None
+            self.pandas_df_agent = None
+
+    def _get_pandas_df_agent(self):
+        if self.pandas_df_agent is None:
+            # the tool runs the code on the memory mapped file, so the agent
+            # only needs the columns, not the rows
+            agent = create_pandas_dataframe_agent(
+                self.llm,
+                self.frame.window(0, 0),
+                prefix=AGENT_PREFIX + self.profile,
+                include_df_in_prompt=False,
+                verbose=True,
+                agent_type=AgentType.OPENAI_FUNCTIONS,
+                handle_parsing_errors=True,
+            )
+            # the tool keeps its name and arguments, so the prompt is unchanged
+            self.python_tool = SandboxedPythonTool(table_path=self.table_path)
+            agent.tools = [
+                self.python_tool if tool.name == self.python_tool.name else tool
+                for tool in agent.tools
+            ]
+            with param.edit_constant(self):
+                self.pandas_df_agent = agent
+        return self.pandas_df_agent
+
+    def remove_table_file(self, *_):
+        if self.table_path:
+            Path(self.table_path).unlink(missing_ok=True)
+            self.table_path = None
 
     @property
     def error_message(self):
-        if not self.llm and self.data is None:
+        if not self.llm and self.frame is None:
             return "Please **upload a `.csv` file** and click the **send** button."
-        if self.data is None:
+        if self.frame is None:
             return "Please **upload a `.csv` file** and click the **send** button."
         return ""
 
@@ -99,26 +209,60 @@ class AppState(param.Parameterized):
             https://python.langchain.com/docs/integrations/toolkits/pandas" \
             target="_blank">LangChain Pandas DataFrame Agent</a>.
 
-            I execute LLM generated Python code under the hood - this can be bad if
-            the `llm` generated Python code is harmful. Use cautiously!
+            I execute LLM generated Python code under the hood, in separate processes
+            with a time and memory limit - this can still be bad if the `llm`
+            generated Python code is harmful. Use cautiously!
 
             {self.error_message}"""
         ).strip()
 
-    async def callback(self, contents, user, instance):
-        if isinstance(contents, pd.DataFrame):
-            self.data = contents
-            instance.active = 1
-            message = self.config._get_agent_message(
+    async def upload(self, contents: bytes, instance):
+        message = self.config._get_agent_message("Reading the `.csv` file...")
+        instance.send(message, respond=False)
+        table_path = None
+        try:
+            frame = await asyncio.to_thread(ArrowFrame.from_csv, contents)
+            table_path = await asyncio.to_thread(share_table, frame.table)
+            # computed once per distinct file, keyed by its bytes, so the table is
+            # not converted to pandas and hashed when the profile is cached
+            profile = await asyncio.to_thread(
+                get_profile_cache().get, frame.to_pandas, content_key(contents)
+            )
+        except (OSError, ValueError) as error:
+            # keeps the previous table, if any
+            if table_path is not None:
+                table_path.unlink(missing_ok=True)
+            message.object = f"Could not read the `.csv` file: {error}"
+            return
+        self.remove_table_file()
+        self.table_path = str(table_path)
+        self.profile = profile
+        self.frame = frame
+        message.object = table_view(self.frame)
+        instance.active = 1
+        instance.send(
+            self.config._get_agent_message(
                 "You can ask me anything about the data. For example "
                 "'how many species are there?'"
-            )
-            return message
+            ),
+            respond=False,
+        )
 
+    async def callback(self, contents, user, instance):
         if self.error_message:
             message = self.config._get_agent_message(self.error_message)
             return message
 
+        if self.config.answer_locally:
+            answer = self.intent_matcher.answer(contents, self.data)
+            if answer is not None:
+                stats = self.intent_matcher.stats()
+                return self.config._get_agent_message(
+                    f"{answer.text}\n\n*Answered locally with `{answer.code}` in "
+                    f"{answer.seconds * 1000:.1f} ms, like {stats['answered']} of "
+                    f"{stats['answered'] + stats['passed']} questions so far.*"
+                )
+
         if self.config.show_chain_of_thought:
             langchain_callbacks = [
                 pn.chat.langchain.PanelCallbackHandler(instance=instance)
@@ -126,22 +270,36 @@ class AppState(param.Parameterized):
         else:
             langchain_callbacks = []
 
-        response = await self.pandas_df_agent.arun(
-            contents, callbacks=langchain_callbacks
-        )
+        agent = self._get_pandas_df_agent()
+        self.python_tool.seconds.clear()
+        response = await agent.arun(contents, callbacks=langchain_callbacks)
+        if self.python_tool.seconds:
+            timings = ", ".join(
+                f"{seconds * 1000:.0f} ms" for seconds in self.python_tool.seconds
+            )
+            response += f"\n\n*Code run in the sandbox in {timings}.*"
         message = self.config._get_agent_message(response)
         return message
 
 
 state = AppState()
 
+
+def upload_csv(instance, event):
+    # parses the upload into Arrow instead of the message parsing it into pandas
+    file_input = instance.active_widget
+    if isinstance(file_input, pn.widgets.FileInput) and file_input.value:
+        contents, file_input.value = file_input.value, None
+        pn.state.execute(partial(state.upload, contents, instance))
+
+
 chat_interface = pn.chat.ChatInterface(
     widgets=[
         pn.widgets.FileInput(name="Upload", accept=".csv"),
         pn.chat.ChatAreaInput(name="Message", placeholder="Send a message"),
     ],
-    renderers=pn.pane.Perspective,
     callback=state.callback,
+    button_properties={"send": {"callback": upload_csv}},
     callback_exception="verbose",
     show_rerun=False,
     show_undo=False,
@@ -171,7 +329,10 @@ layout = pn.template.MaterialTemplate(
         download_button,
         "#### Agent Settings",
         state.config.param.show_chain_of_thought,
+        state.config.param.answer_locally,
     ],
 )
 
+pn.state.on_session_destroyed(state.remove_table_file)
+
 layout.servable()
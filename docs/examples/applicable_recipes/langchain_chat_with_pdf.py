@@ -2,71 +2,247 @@
 Demonstrates how to use the `ChatInterface` to chat about a PDF using
 OpenAI, [LangChain](https://python.langchain.com/docs/get_started/introduction) and
 [Chroma](https://docs.trychroma.com/).
+
+Highlights:
+
+- Uses `IndexStore` to persist the vector index of each PDF on disk, keyed by its content, so changing
+    the number of chunks or the chain type does not rebuild it.
+- Uses `CachedEmbeddings` to only embed the chunks that were not embedded before, e.g. of another
+    revision of the PDF.
+- Uses `ingest_pdf` to parse the pages in a process pool, straight from the uploaded bytes, and to
+    embed them in concurrent batches, streaming the progress into the chat. The indexed pages can be
+    queried while the rest of the PDF is indexed.
+- Uses a local `BM25Index` to retrieve chunks without embedding the question, alone or fused with the
+    vector search, as selected in the sidebar.
+- Shows the retrieved sources right away and answers with the LangChain question answering chain
+    of the selected type, streaming the tokens of the answer of the `stuff` and `map_reduce` chains
+    from `astream_events` with `stream_deltas`.
+- Uses a `RetrievalPrefetcher`, if enabled in the sidebar, to retrieve the chunks while the question
+    is typed, so the retrieval is usually done by the time it is sent.
 """
 
+import asyncio
 import os
-import tempfile
 
 import panel as pn
-from langchain.chains import RetrievalQA
-from langchain.document_loaders import PyPDFLoader
+from langchain.chains.question_answering import load_qa_chain
 from langchain.embeddings import OpenAIEmbeddings
+from langchain.schema import BaseRetriever, Document
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.vectorstores import Chroma
 from langchain_community.chat_models import ChatOpenAI
 
+from panel_chat_examples.bm25 import BM25Index, reciprocal_rank_fusion
+from panel_chat_examples.cache import content_key
+from panel_chat_examples.embedding_cache import CachedEmbeddings
+from panel_chat_examples.index_store import get_index_store
+from panel_chat_examples.ingest import ingest_pdf
+from panel_chat_examples.prefetch import RetrievalPrefetcher
+from panel_chat_examples.streaming import stream_deltas
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 0
+RETRIEVAL_MODES = ["Vector", "BM25", "Hybrid"]
+
+# the runs of the LLM that writes the answer, which is streamed
+ANSWER_TAG = "answer"
+
 pn.extension()
 
 
-@pn.cache
-def initialize_chain(pdf, k, chain):
-    # load document
-    with tempfile.NamedTemporaryFile("wb", delete=False) as f:
-        f.write(pdf)
-
-    file_name = f.name
-    loader = PyPDFLoader(file_name)
-    documents = loader.load()
-    # split the documents into chunks
-    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-    texts = text_splitter.split_documents(documents)
-    # select which embeddings we want to use
-    embeddings = OpenAIEmbeddings()
-    # create the vectorestore to use as the index
-    db = Chroma.from_documents(texts, embeddings)
-    # expose this index in a retriever interface
-    retriever = db.as_retriever(search_type="similarity", search_kwargs={"k": k})
-    # create a chain to answer questions
-    qa = RetrievalQA.from_chain_type(
-        llm=ChatOpenAI(),
-        chain_type=chain,
-        retriever=retriever,
-        return_source_documents=True,
-        verbose=True,
+def load_index(path):
+    # the chunks of all PDFs are embedded through a cache shared by all sessions
+    embeddings = CachedEmbeddings(OpenAIEmbeddings())
+    return Chroma(persist_directory=str(path), embedding_function=embeddings)
+
+
+class PDFRetriever(BaseRetriever):
+    """Retrieves the chunks by vector similarity, BM25 or both fused"""
+
+    db: Chroma
+    bm25: BM25Index
+    mode: str = "Vector"
+    k: int = 2
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        rankings = []
+        if self.mode in ("Vector", "Hybrid"):
+            rankings.append(self.db.similarity_search(query, k=self.k))
+        if self.mode in ("BM25", "Hybrid"):
+            rankings.append(
+                [
+                    Document(page_content=text, metadata=metadata)
+                    for _, text, metadata in self.bm25.search(query, k=self.k)
+                ]
+            )
+        documents = {doc.page_content: doc for ranking in rankings for doc in ranking}
+        ranked = reciprocal_rank_fusion(
+            [[doc.page_content for doc in ranking] for ranking in rankings]
+        )
+        return [documents[text] for text in ranked[: self.k]]
+
+
+def release_index():
+    # the index of the previous PDF may be evicted once no session uses it
+    if document["key"] is not None:
+        get_index_store().release(document["key"])
+        document["key"] = None
+
+
+async def index_pdf(pdf, key):
+    store = get_index_store()
+    release_index()
+    progress = None
+    try:
+        bm25 = document["bm25"] = BM25Index()
+        db = await asyncio.to_thread(store.lookup, key, load_index)
+        if db is not None:
+            document["key"] = key
+            # the BM25 index is cheap to rebuild from the stored chunks
+            stored = await asyncio.to_thread(db.get, include=["documents", "metadatas"])
+            bm25.add(stored["documents"], stored["metadatas"])
+            document["db"] = db
+            return
+
+        # create the vectorstore to use as the index, persisted to the store
+        db = document["db"] = load_index(store.clean_path(key))
+
+        def add_texts(texts, metadatas):
+            bm25.add(texts, metadatas)
+            db.add_texts(texts, metadatas)
+
+        # split the pages into chunks
+        text_splitter = CharacterTextSplitter(
+            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+        )
+        progress = chat_interface.send(
+            "Indexing the PDF...", user="System", respond=False
+        )
+        async for indexed, total in ingest_pdf(
+            pdf, add_texts, text_splitter.split_text
+        ):
+            progress.object = f"{indexed}/{total} pages indexed"
+            # the chunks prefetched meanwhile may miss the pages indexed since
+            prefetcher.clear()
+        store.add(key, db)
+        document["key"] = key
+    except Exception as exc:  # pylint: disable=broad-except
+        # the partial index is neither queried nor stored
+        document["db"] = document["bm25"] = None
+        prefetcher.clear()
+        release_index()
+        if key not in store:
+            await asyncio.to_thread(store.clean_path, key)
+        message = f"The PDF could not be indexed: {exc}. Please upload it again."
+        if progress is None:
+            chat_interface.send(message, user="System", respond=False)
+        else:
+            progress.object = message
+        chat_interface.active = 0
+        chat_input.placeholder = "First, upload a PDF!"
+
+
+def initialize_retriever(db, bm25, k, mode):
+    # expose the indexes in a retriever interface
+    return PDFRetriever(db=db, bm25=bm25, mode=mode, k=k)
+
+
+def retrieve(question):
+    retriever = initialize_retriever(
+        document["db"], document["bm25"], k_slider.value, retrieval_select.value
     )
-    return qa
+    return retriever.ainvoke(question)
+
+
+def retrieval_context():
+    # a prefetch is only reused with the same retrieval settings
+    return (k_slider.value, retrieval_select.value)
 
 
-def respond(contents, user, chat_interface):
+async def prefetch(event):
+    if prefetch_checkbox.value and document["db"] is not None:
+        prefetcher.update(event.new, retrieval_context())
+
+
+def load_chain(chain_type):
+    """Returns the LangChain question answering chain of the chain type"""
+    llm = ChatOpenAI()
+    answer_llm = ChatOpenAI(streaming=True, tags=[ANSWER_TAG])
+    if chain_type == "stuff":
+        return load_qa_chain(answer_llm, chain_type="stuff")
+    if chain_type == "map_reduce":
+        # only the reduce step writes the answer
+        return load_qa_chain(llm, chain_type="map_reduce", reduce_llm=answer_llm)
+    # each step of the refine chain rewrites the answer and the map_rerank
+    # chain parses the answer and score of each document, so neither streams
+    return load_qa_chain(llm, chain_type=chain_type)
+
+
+async def answer_tokens(chain, inputs, result):
+    """Yields the tokens of the answer of the chain and updates result with its output"""
+    root = None
+    async for event in chain.astream_events(inputs, version="v1"):
+        root = root or event["run_id"]
+        if event["event"] == "on_chat_model_stream" and ANSWER_TAG in event["tags"]:
+            yield event["data"]["chunk"].content
+        elif event["event"] == "on_chain_end" and event["run_id"] == root:
+            result.update(event["data"]["output"])
+
+
+async def respond(contents, user, chat_interface):
     chat_input.placeholder = "Ask questions here!"
+    if key_input.value:
+        os.environ["OPENAI_API_KEY"] = key_input.value
+
     if chat_interface.active == 0:
         chat_interface.active = 1
-        yield {"user": "OpenAI", "value": "Let's chat about the PDF!"}
+        chat_interface.send("Let's chat about the PDF!", user="OpenAI", respond=False)
 
         contents.seek(0)
-        pn.state.cache["pdf"] = contents.read()
+        pdf = contents.read()
+        key = content_key(pdf, str(CHUNK_SIZE), str(CHUNK_OVERLAP))
+        # index in the background, so the indexed pages can be queried meanwhile
+        document["task"] = asyncio.create_task(index_pdf(pdf, key))
         return
 
-    qa = initialize_chain(pn.state.cache["pdf"], k_slider.value, chain_select.value)
-    if key_input.value:
-        os.environ["OPENAI_API_KEY"] = key_input.value
+    # the index is created or loaded right after the upload
+    while document["db"] is None and not document["task"].done():
+        await asyncio.sleep(0.1)
+    db = document["db"]
+    if db is None:
+        return "The PDF could not be indexed, please upload it again."
 
-    response = qa({"query": contents})
-    answers = pn.Accordion(("Response", response["result"]))
-    for doc in response["source_documents"][::-1]:
-        answers.append((f"Snippet from page {doc.metadata['page']}", doc.page_content))
-    answers.active = [0, 1]
-    yield {"user": "OpenAI", "value": answers}
+    # show the sources as soon as they are retrieved
+    if prefetch_checkbox.value:
+        docs = await prefetcher.get(contents, retrieval_context())
+    else:
+        docs = await retrieve(contents)
+    if not docs:
+        return "I could not find anything relevant in the PDF."
+    sources = pn.Accordion(
+        *(
+            (f"Snippet from page {doc.metadata['page']}", doc.page_content)
+            for doc in docs
+        )
+    )
+    sources.active = [0]
+    chat_interface.send(sources, user="OpenAI", respond=False)
+
+    chain = load_chain(chain_select.value)
+    result = {}
+    inputs = {"input_documents": docs, "question": contents}
+    message = await stream_deltas(
+        answer_tokens(chain, inputs, result), chat_interface, user="OpenAI"
+    )
+    if message is None:
+        chat_interface.send(result["output_text"], user="OpenAI", respond=False)
+
+
+def cleanup(session_context):
+    prefetcher.clear()
+    if document["task"] is not None:
+        document["task"].cancel()
+    release_index()
 
 
 # sidebar widgets
@@ -81,11 +257,25 @@ chain_select = pn.widgets.RadioButtonGroup(
     name="Chain Type", options=["stuff", "map_reduce", "refine", "map_rerank"]
 )
 
-sidebar = pn.Column(key_input, k_slider, chain_select)
+retrieval_select = pn.widgets.RadioButtonGroup(
+    name="Retrieval", options=RETRIEVAL_MODES, value="Vector"
+)
+
+prefetch_checkbox = pn.widgets.Checkbox(name="Retrieve while typing", value=False)
+
+sidebar = pn.Column(
+    key_input, k_slider, retrieval_select, chain_select, prefetch_checkbox
+)
+
+# the indexes of the uploaded PDF of the session, the key of the stored index
+# referenced by the session and the task indexing it
+document = {"db": None, "bm25": None, "key": None, "task": None}
+prefetcher = RetrievalPrefetcher(retrieve)
 
 # main widgets
 pdf_input = pn.widgets.FileInput(accept=".pdf", value="", height=50)
 chat_input = pn.chat.ChatAreaInput(placeholder="First, upload a PDF!")
+chat_input.param.watch(prefetch, "value_input")
 chat_interface = pn.chat.ChatInterface(
     help_text="Please first upload a PDF and click send!",
     callback=respond,
@@ -94,6 +284,7 @@ chat_interface = pn.chat.ChatInterface(
     callback_exception="verbose",
 )
 chat_interface.active = 0
+pn.state.on_session_destroyed(cleanup)
 
 # layout
 template = pn.template.BootstrapTemplate(sidebar=[sidebar], main=[chat_interface])
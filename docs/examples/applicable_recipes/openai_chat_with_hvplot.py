@@ -1,15 +1,36 @@
 """
 We use [OpenAI *Function Calling*](https://platform.openai.com/docs/guides/function-calling) and
 [hvPlot](https://hvplot.holoviz.org/) to create an **advanced chatbot** that can create plots.
+
+Highlights:
+
+- Uses a `PlotCache` per session to build each plot once, so repeated plot requests reuse the plot.
+- Updates the plot pane in place, so a change of the `renderer` arguments only re-renders the plot.
+- Plots your own `.csv` or `.parquet` dataset, uploaded in the sidebar, and rasterizes or datashades
+    the plots of datasets with more rows than set in the sidebar on the server, so the browser only
+    receives an image.
+- Streams the function calls and shows the code, and starts building the plot, as soon as the
+    `hvplot` arguments are complete, while the `renderer` arguments are still generated.
+- Loads the gapminder dataset from the local `DatasetCache`, memory mapped from an Arrow file,
+    instead of downloading it when the app starts.
 """
 
+import asyncio
+import io
 import json
 from pathlib import Path
 
 import hvplot.pandas  # noqa
 import pandas as pd
 import panel as pn
-from openai import AsyncOpenAI
+
+from panel_chat_examples.cache import content_key
+from panel_chat_examples.clients import get_client
+from panel_chat_examples.columnar import read_csv
+from panel_chat_examples.datasets import get_dataset_cache
+from panel_chat_examples.plot_cache import PlotCache
+from panel_chat_examples.serialize import SerializedHistory
+from panel_chat_examples.streaming import stream_tool_calls
 
 ROOT = Path(__file__).parent
 
@@ -33,6 +54,9 @@ PANEL_LOGO = {
     "dark": "https://panel.holoviz.org/_static/logo_horizontal_dark_theme.png",
 }
 PANEL_URL = "https://panel.holoviz.org/index.html"
+# the plots of datasets with more rows are rasterized on the server
+MAX_RAW_ROWS = 100_000
+RASTERIZE_KINDS = {"line", "scatter", "points", "paths"}
 
 pn.chat.message.DEFAULT_AVATARS["assistant"] = HVPLOT_LOGO
 pn.chat.ChatMessage.show_reaction_icons = False
@@ -40,9 +64,8 @@ pn.chat.ChatMessage.show_reaction_icons = False
 
 @pn.cache
 def _read_data():
-    return pd.read_csv(
-        "https://raw.githubusercontent.com/kirenz/datasets/master/gapminder.csv"
-    )
+    # NumPy types, which datashader aggregates
+    return get_dataset_cache().load("gapminder").to_pandas()
 
 
 DATA = _read_data()
@@ -92,24 +115,33 @@ You are now a **Plotting Assistant** that helps users plot their data using `hvP
 by `HoloViz`.\
 """
 
-DATA_PROMPT = f"""\
-Hi. Here is a description of your `data`.
 
-The type is `{DATA.__class__.__name__}`. The `dtypes` are
+def _describe(data, intro="Hi. Here is a description of your `data`."):
+    return f"""\
+{intro}
+
+The type is `{data.__class__.__name__}` with {len(data):,} rows. The `dtypes` are
 
 ```bash
-{DATA.dtypes}
+{data.dtypes}
 ```"""
 
+
+DATA_PROMPT = _describe(DATA)
+
 pn.extension(raw_css=[CSS_TO_BE_UPSTREAMED_TO_PANEL])
 
 tools_pane = pn.pane.JSON(
     object=TOOLS, depth=6, theme=JSON_THEME, name="Tools", sizing_mode="stretch_both"
 )
+plot_pane = pn.pane.HoloViews(sizing_mode="stretch_both", name="Plot")
+arguments_pane = pn.pane.JSON(
+    sizing_mode="stretch_both", depth=3, theme=JSON_THEME, name="Arguments"
+)
 tabs_layout = pn.Tabs(
-    pn.Column(name="Plot"),
+    plot_pane,
     tools_pane,
-    pn.Column(name="Arguments"),
+    arguments_pane,
     sizing_mode="stretch_both",
     styles={"border-left": "2px solid var(--neutral-fill-active)"},
     dynamic=True,
@@ -128,78 +160,152 @@ def _powered_by():
     )
 
 
-def _to_code(kwargs):
+def _to_code(kwargs, comments=None):
     """Returns the .hvplot code corresponding to the kwargs"""
+    comments = comments or {}
     code = "data.hvplot("
     if kwargs:
         code += "\n"
     for key, value in kwargs.items():
-        code += f"    {key}={repr(value)},\n"
+        code += f"    {key}={value!r},"
+        if key in comments:
+            code += f"  # {comments[key]}"
+        code += "\n"
     code += ")"
     return code
 
 
-def _update_tool_kwargs(tool_calls, original_kwargs):
-    if tool_calls:
-        for tool_call in tool_calls:
-            name = tool_call.function.name
-            kwargs = json.loads(tool_call.function.arguments)
-            if kwargs:
-                # the llm does not always specify both the hvplot and renderer args
-                # if not is specified its most natural to assume we continue with the
-                # same args as before
-                original_kwargs[name] = kwargs
+def _large_data_kwargs(kwargs, rows, max_rows):
+    """
+    Returns the kwargs with server side rasterization if the data has more
+    than max_rows rows, and the comments explaining it
+    """
+    if (
+        rows <= max_rows
+        or kwargs.get("kind", "line") not in RASTERIZE_KINDS
+        or "rasterize" in kwargs
+        or "datashade" in kwargs
+    ):
+        return kwargs, {}
+    # the points of an overlay are shaded by category
+    option = "datashade" if kwargs.get("by") else "rasterize"
+    return {**kwargs, option: True}, {option: f"the data has {rows:,} rows"}
+
 
+def _read_dataset(contents, filename):
+    if filename.endswith(".parquet"):
+        return pd.read_parquet(io.BytesIO(contents))
+    # NumPy types, which datashader aggregates
+    return read_csv(contents).to_pandas()
 
-def _clean_tool_kwargs(kwargs):
+
+def _update_tool_kwargs(name, kwargs, original_kwargs):
+    if kwargs:
+        # the llm does not always specify both the hvplot and renderer args
+        # if not is specified its most natural to assume we continue with the
+        # same args as before
+        original_kwargs[name] = kwargs
+
+
+def _clean_hvplot_kwargs(kwargs):
     # Sometimes the llm adds the backend argument to the hvplot arguments
     backend = kwargs["hvplot"].pop("backend", None)
-    if backend and "backend" not in kwargs["renderer"]:
-        # We add the backend argument to the renderer if none is specified
-        kwargs["renderer"]["backend"] = backend
     # Use responsive by default
     if "responsive" not in kwargs:
         kwargs["hvplot"]["responsive"] = True
+    return backend
+
+
+def _clean_renderer_kwargs(kwargs, backend):
+    if backend and "backend" not in kwargs["renderer"]:
+        # We add the backend argument to the renderer if none is specified
+        kwargs["renderer"]["backend"] = backend
 
 
-client = AsyncOpenAI()
 tool_kwargs = {"hvplot": {}, "renderer": {}}
+dataset = {"name": "gapminder", "data": DATA}
+# per session, as a rasterized plot is linked to the ranges of the figure showing it
+plot_cache = PlotCache()
+
+
+def _start_plot():
+    """Sends the code of the hvplot arguments and starts building the plot"""
+    data = dataset["data"]
+    hvplot_kwargs, comments = _large_data_kwargs(
+        tool_kwargs["hvplot"], len(data), max_raw_rows_input.value
+    )
+    code = _to_code(hvplot_kwargs, comments)
+
+    response = f"Try running\n```python\n{code}\n```\n"
+    chat_interface.send(response, user="Assistant", respond=False)
+    return asyncio.create_task(
+        asyncio.to_thread(
+            plot_cache.get,
+            dataset["name"],
+            hvplot_kwargs,
+            lambda: data.hvplot(**hvplot_kwargs),
+        )
+    )
 
 
 async def callback(
     contents: str, user: str, instance
 ):  # pylint: disable=unused-argument
     """Responds to a task"""
-    messages = instance.serialize()
-    response = await client.chat.completions.create(
+    messages = history.serialize()
+    response = await get_client("openai").chat.completions.create(
         model=MODEL,
         messages=messages,
         tools=TOOLS,
         tool_choice="auto",
+        stream=True,
     )
-    response_message = response.choices[0].message
-    tool_calls = response_message.tool_calls
-
-    _update_tool_kwargs(tool_calls, tool_kwargs)
-    _clean_tool_kwargs(tool_kwargs)
-    code = _to_code(tool_kwargs["hvplot"])
-
-    response = f"Try running\n```python\n{code}\n```\n"
-    chat_interface.send(response, user="Assistant", respond=False)
-    plot = DATA.hvplot(**tool_kwargs["hvplot"])
-    pane = pn.pane.HoloViews(
-        object=plot, sizing_mode="stretch_both", name="Plot", **tool_kwargs["renderer"]
+    backend = None
+    plot = None
+    # the plot is built while the renderer arguments are still generated
+    async for name, kwargs in stream_tool_calls(response):
+        _update_tool_kwargs(name, kwargs, tool_kwargs)
+        if name == "hvplot" and plot is None:
+            backend = _clean_hvplot_kwargs(tool_kwargs)
+            plot = _start_plot()
+    if plot is None:
+        backend = _clean_hvplot_kwargs(tool_kwargs)
+        plot = _start_plot()
+    _clean_renderer_kwargs(tool_kwargs, backend)
+
+    # unchanged values do not trigger an update, e.g. only the new renderer options
+    plot_pane.param.update(object=await plot, **tool_kwargs["renderer"])
+    arguments_pane.object = json.loads(json.dumps(tool_kwargs))
+
+
+async def upload_dataset(event):
+    if not event.new:
+        return
+    filename = dataset_input.filename
+    data = await asyncio.to_thread(_read_dataset, event.new, filename)
+    # the plots of the same content are reused, e.g. when it is uploaded again
+    dataset.update(name=f"{filename}:{content_key(event.new)}", data=data)
+    # the columns of the previous dataset do not apply
+    tool_kwargs.update(hvplot={}, renderer={})
+    chat_interface.send(
+        _describe(data, f"Here is a description of your new `data`, `{filename}`."),
+        user="Assistant",
+        respond=False,
     )
-    arguments = pn.pane.JSON(
-        tool_kwargs,
-        sizing_mode="stretch_both",
-        depth=3,
-        theme=JSON_THEME,
-        name="Arguments",
-    )
-    tabs_layout[:] = [pane, tools_pane, arguments]
 
 
+dataset_input = pn.widgets.FileInput(
+    accept=".csv,.parquet", sizing_mode="stretch_width"
+)
+dataset_input.param.watch(upload_dataset, "value")
+max_raw_rows_input = pn.widgets.IntInput(
+    name="Rasterize the plots of datasets with more rows than",
+    value=MAX_RAW_ROWS,
+    start=0,
+    step=10_000,
+    sizing_mode="stretch_width",
+)
+
 chat_interface = pn.chat.ChatInterface(
     callback=callback,
     show_rerun=False,
@@ -207,6 +313,7 @@ chat_interface = pn.chat.ChatInterface(
     show_clear=False,
     callback_exception="verbose",
 )
+history = SerializedHistory(chat_interface)
 chat_interface.send(
     SYSTEM_PROMPT,
     user="System",
@@ -225,6 +332,9 @@ pn.template.FastListTemplate(
     title="Chat with hvPlot",
     sidebar=[
         _powered_by(),
+        "#### Your dataset",
+        dataset_input,
+        max_raw_rows_input,
         EXPLANATION,
     ],
     main=[component],
@@ -3,15 +3,15 @@ Use the OpenAI API to generate images using the DALL·E model.
 """
 
 import panel as pn
-from openai import AsyncOpenAI
+
+from panel_chat_examples.clients import get_client
 
 pn.extension()
 
 
 async def callback(contents: str, user: str, instance: pn.chat.ChatInterface):
-    if api_key_input.value:
-        # use api_key_input.value if set, otherwise use OPENAI_API_KEY
-        aclient.api_key = api_key_input.value
+    # use api_key_input.value if set, otherwise use OPENAI_API_KEY
+    aclient = get_client("openai", api_key_input.value)
 
     response = await aclient.images.generate(
         model=model_buttons.value,
@@ -49,7 +49,6 @@ def update_model_params(model):
         )
 
 
-aclient = AsyncOpenAI()
 api_key_input = pn.widgets.PasswordInput(
     placeholder="sk-... uses $OPENAI_API_KEY if not set",
     sizing_mode="stretch_width",
@@ -6,10 +6,15 @@ Highlights:
 
 - The user decides the callback user and avatar for the response.
 - A system message is used to control the conversation flow.
+- Uses `stream_deltas` to append the parts of the response to the message in place.
+- Uses `cached_stream` to replay identical requests if `$PANEL_CHAT_EXAMPLES_CACHE` is set.
 """
 
 import panel as pn
-from openai import AsyncOpenAI
+
+from panel_chat_examples.cache import cached_stream
+from panel_chat_examples.clients import get_client
+from panel_chat_examples.streaming import openai_delta, stream_deltas
 
 pn.extension()
 
@@ -34,25 +39,30 @@ async def callback(
 
     prompt = f"Reply profoundly about '{contents}', then follow up with a question."
     messages = [{"role": "user", "content": prompt}]
-    response = await aclient.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages,
-        stream=True,
-        max_tokens=250,
-        temperature=0.1,
+    request = {
+        "model": "gpt-3.5-turbo",
+        "messages": messages,
+        "stream": True,
+        "max_tokens": 250,
+        "temperature": 0.1,
+    }
+    aclient = get_client("openai")
+    response = cached_stream(
+        request,
+        lambda: aclient.chat.completions.create(**request),
+        get_delta=openai_delta,
+        base_url=aclient.base_url,
     )
 
-    message = ""
-    async for chunk in response:
-        part = chunk.choices[0].delta.content
-        if part is not None:
-            message += part
-            yield {"user": callback_user, "avatar": callback_avatar, "object": message}
-
+    await stream_deltas(
+        response,
+        instance,
+        user=callback_user,
+        avatar=callback_avatar,
+    )
     instance.respond()
 
 
-aclient = AsyncOpenAI()
 chat_interface = pn.chat.ChatInterface(
     callback=callback,
     help_text="Enter a topic for the bots to discuss! Beware the token usage!",
@@ -7,9 +7,9 @@ The chatbot Assistant echoes back the message entered by the User in an
 
 Highlights:
 
-- The function is defined as `async` and uses `yield` to stream back responses.
-- Initialize `message` first to gather the characters and then `yield` it;
-    without it, only one letter would be displayed at a time.
+- The function is defined as `async` and streams back responses.
+- Uses `instance.stream` with the returned `message` to append each character
+    in place instead of re-sending the whole text for every character.
 """
 
 from asyncio import sleep
@@ -21,11 +21,10 @@ pn.extension()
 
 async def callback(contents: str, user: str, instance: pn.chat.ChatInterface):
     await sleep(1)
-    message = ""
+    message = None
     for char in "Echoing User: " + contents:
         await sleep(0.05)
-        message += char
-        yield message
+        message = instance.stream(char, user=instance.callback_user, message=message)
 
 
 chat_interface = pn.chat.ChatInterface(callback=callback)
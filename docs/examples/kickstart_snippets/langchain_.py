@@ -4,53 +4,50 @@ Demonstrates how to use LangChain to wrap OpenAI's GPT-3.5 API with Panel's Chat
 Highlights:
 
 - Uses `PasswordInput` to set the API key, or uses the `OPENAI_API_KEY` environment variable.
-- Uses `serialize` to get chat history from the `ChatInterface`.
-- Uses `yield` to continuously concatenate the parts of the response
+- Uses `SerializedHistory` to incrementally serialize the chat history from the `ChatInterface`.
+- Uses `TokenBufferMemory` to only count the tokens of new messages and evict the oldest ones.
+- Uses `stream_deltas` to append the parts of the response to the message in place
 """
 
-from operator import itemgetter
-
 import panel as pn
-from langchain.memory import ConversationTokenBufferMemory
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_openai import ChatOpenAI
 
+from panel_chat_examples.memory import TokenBufferMemory
+from panel_chat_examples.serialize import SerializedHistory
+from panel_chat_examples.streaming import stream_deltas
+
 pn.extension()
 
 
+def to_langchain_message(message):
+    if message["role"] == "user":
+        return HumanMessage(content=message["content"])
+    return AIMessage(content=message["content"])
+
+
 async def callback(contents: str, user: str, instance: pn.chat.ChatInterface):
     if api_key_input.value:
         # use api_key_input.value if set, otherwise use OPENAI_API_KEY
         llm.api_key = api_key_input.value
 
-    memory.clear()
-    for message in instance.serialize():
-        if message["role"] == "user":
-            memory.chat_memory.add_user_message(HumanMessage(**message))
-        else:
-            memory.chat_memory.add_ai_message(AIMessage(**message))
+    memory.update(history.serialize())
 
     response = chain.astream({"user_input": contents})
 
-    message = ""
-    async for chunk in response:
-        message += chunk
-        yield message
+    await stream_deltas(response, instance)
 
 
 llm = ChatOpenAI(model="gpt-3.5-turbo")
-memory = ConversationTokenBufferMemory(
-    return_messages=True,
-    llm=llm,
-    memory_key="chat_history",
+memory = TokenBufferMemory(
+    count_tokens=lambda message: llm.get_num_tokens_from_messages([message]),
     max_token_limit=8192 - 1024,
 )
 memory_link = RunnablePassthrough.assign(
-    chat_history=RunnableLambda(memory.load_memory_variables)
-    | itemgetter("chat_history")
+    chat_history=RunnableLambda(lambda _: memory.messages)
 )
 prompt_link = ChatPromptTemplate.from_template(
     "{chat_history}\n\nBe a helpful chat bot and answer: {user_input}",
@@ -76,6 +73,7 @@ chat_interface = pn.chat.ChatInterface(
     help_text="Send a message to get a reply from GPT 3.5 Turbo!",
     callback_exception="verbose",
 )
+history = SerializedHistory(chat_interface, converter=to_langchain_message)
 template = pn.template.FastListTemplate(
     title="LangChain OpenAI GPT-3.5",
     header_background="#E8B0E6",
@@ -4,46 +4,113 @@ with Panel's ChatInterface.
 
 Highlights:
 
-- Uses `pn.state.onload` to load the model from Hugging Face Hub when the app is loaded and prevent blocking the app.
-- Uses `pn.state.cache` to store the `Llama` instance.
-- Uses `serialize` to get chat history from the `ChatInterface`.
-- Uses `yield` to continuously concatenate the parts of the response.
+- Uses `get_shared_model` to load the model from Hugging Face Hub once per process, in the background, and share the `Llama` instance between sessions.
+- Uses `pn.state.onload` to wait for the model without blocking the app, showing the loading status meanwhile, and the error with a retry button if the load fails.
+- Uses `get_scheduler` to run the requests of all sessions one at a time, round-robin, and show the queue position in a message.
+- Uses `PromptStateCache` to restore the evaluated prompt of the session before each turn, so only the new messages are evaluated.
+- Uses `SerializedHistory` to incrementally serialize the chat history from the `ChatInterface`.
+- Uses `stream_deltas` to append the parts of the response to the message in place.
 """
 
+from functools import partial
+
 import panel as pn
 from huggingface_hub import hf_hub_download
 from llama_cpp import Llama
 
+from panel_chat_examples.models import get_shared_model
+from panel_chat_examples.prompt_state import PromptStateCache
+from panel_chat_examples.scheduler import QueueFullError, get_scheduler
+from panel_chat_examples.serialize import SerializedHistory
+from panel_chat_examples.streaming import openai_delta, stream_deltas
+
 REPO_ID = "TheBloke/Mistral-7B-Instruct-v0.2-code-ft-GGUF"
 FILENAME = "mistral-7b-instruct-v0.2-code-ft.Q5_K_S.gguf"
 
 pn.extension()
 
 
-def load_model():
+def load_llama():
     model_path = hf_hub_download(repo_id=REPO_ID, filename=FILENAME)
-    pn.state.cache["llama"] = Llama(
+    return Llama(
         model_path=model_path,
         chat_format="mistral-instruct",
         verbose=False,
         n_gpu_layers=-1,
     )
+
+
+async def load_model():
+    status = None
+    if shared_llama.status != "ready":
+        status = chat_interface.send(
+            f"Loading {FILENAME}, shared by {shared_llama.users + 1} session(s)...",
+            user="System",
+            respond=False,
+        )
+    try:
+        # a failed load is retried by the next acquire
+        await shared_llama.acquire()
+    except Exception as exc:  # pylint: disable=broad-except
+        # the session only keeps the model once it is loaded
+        shared_llama.release()
+        retry_button = pn.widgets.Button(name="Retry", button_type="primary")
+        status = status or chat_interface.send("", user="System", respond=False)
+        retry_button.on_click(partial(retry_load, status))
+        status.object = pn.Column(f"Could not load {FILENAME}: {exc}", retry_button)
+        return
+    pn.state.on_session_destroyed(shared_llama.release)
+    if status is not None:
+        chat_interface.remove(status)
     chat_interface.disabled = False
 
 
-def callback(contents: str, user: str, instance: pn.chat.ChatInterface):
+async def retry_load(status, event):
+    chat_interface.remove(status)
+    await load_model()
+
+
+async def callback(contents: str, user: str, instance: pn.chat.ChatInterface):
     # memory is a list of messages
-    messages = instance.serialize()
+    messages = list(history.serialize())
+
+    llama = shared_llama.model
+    session = id(instance)
+
+    def generate():
+        # runs in the scheduler's worker thread, between the turns of other sessions
+        prompt_states.restore(session, llama)
+        try:
+            yield from llama.create_chat_completion_openai_v1(
+                messages=messages, stream=True
+            )
+        finally:
+            prompt_states.save(session, llama)
+
+    waiting = None
+
+    def show_position(position: int):
+        # a message of its own, removed once the request runs
+        nonlocal waiting
+        text = f"Waiting for {position} request(s) to the model..."
+        if not position:
+            if waiting is not None:
+                instance.remove(waiting)
+                waiting = None
+        elif waiting is None:
+            waiting = instance.send(text, user="System", respond=False)
+        else:
+            waiting.object = text
 
-    llama = pn.state.cache["llama"]
-    response = llama.create_chat_completion_openai_v1(messages=messages, stream=True)
+    response = scheduler.stream(session, generate, on_position=show_position)
 
-    message = ""
-    for chunk in response:
-        part = chunk.choices[0].delta.content
-        if part is not None:
-            message += part
-            yield message
+    try:
+        await stream_deltas(response, instance, get_delta=openai_delta)
+    except QueueFullError:
+        return "The model is busy, please try again later."
+    finally:
+        if waiting is not None:
+            instance.remove(waiting)
 
 
 chat_interface = pn.chat.ChatInterface(
@@ -52,10 +119,17 @@ chat_interface = pn.chat.ChatInterface(
     help_text="Send a message to get a reply from LlamaCpp!",
     disabled=True,
 )
+history = SerializedHistory(chat_interface)
 template = pn.template.FastListTemplate(
     title="LlamaCpp Mistral",
     header_background="#A0A0A0",
     main=[chat_interface],
 )
+shared_llama = get_shared_model("llama", load_llama)
+shared_llama.preload()
 pn.state.onload(load_model)
+scheduler = get_scheduler("llama")
+prompt_states = pn.state.as_cached("llama_prompt_states", PromptStateCache)
+pn.state.on_session_destroyed(lambda _: scheduler.cancel_session(id(chat_interface)))
+pn.state.on_session_destroyed(lambda _: prompt_states.discard(id(chat_interface)))
 template.servable()
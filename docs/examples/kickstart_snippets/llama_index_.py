@@ -4,7 +4,7 @@ Demonstrates how to use LlamaIndex to wrap OpenAI's GPT-3.5 API with Panel's Cha
 Highlights:
 
 - Uses `PasswordInput` to set the API key, or uses the `OPENAI_API_KEY` environment variable.
-- Uses `serialize` to get chat history from the `ChatInterface`.
+- Uses `SerializedHistory` to incrementally serialize the chat history from the `ChatInterface`.
 - Uses `yield` to continuously concatenate the parts of the response
 """
 
@@ -14,6 +14,8 @@ from llama_index.core.llms import ChatMessage
 from llama_index.core.tools import FunctionTool
 from llama_index.llms.openai import OpenAI
 
+from panel_chat_examples.serialize import SerializedHistory
+
 pn.extension()
 
 
@@ -28,7 +30,7 @@ async def callback(contents: str, user: str, instance: pn.chat.ChatInterface):
         llm.api_key = api_key_input.value
 
     # memory is a list of messages
-    messages = [ChatMessage(**message) for message in instance.serialize()]
+    messages = history.serialize()
 
     response = await llm.astream_chat(
         model="gpt-3.5-turbo",
@@ -55,6 +57,7 @@ chat_interface = pn.chat.ChatInterface(
     callback_user="GPT-3.5",
     help_text="Send a message to get a reply from GPT 3.5 Turbo!",
 )
+history = SerializedHistory(chat_interface, converter=lambda msg: ChatMessage(**msg))
 template = pn.template.FastListTemplate(
     title="LlamaIndex OpenAI GPT-3.5",
     header_background="#83CBF2",
@@ -4,46 +4,33 @@ Demonstrates how to use MistralAI's Small API with Panel's ChatInterface.
 Highlights:
 
 - Uses `PasswordInput` to set the API key, or uses the `MISTRAL_API_KEY` environment variable.
-- Runs `pn.bind` to update the `MistralAsyncClient` when the `api_key` changes and pn.state.cache to store the client.
-- Uses `serialize` to get chat history from the `ChatInterface`.
-- Uses `yield` to continuously concatenate the parts of the response.
+- Uses `get_client` to share pooled clients across sessions without sharing API keys.
+- Uses `SerializedHistory` to incrementally serialize the chat history from the `ChatInterface`.
+- Uses `stream_deltas` to append the parts of the response to the message in place.
 """
 
-import os
-
 import panel as pn
-from mistralai import Mistral, UserMessage
-
-pn.extension()
+from mistralai import UserMessage
 
+from panel_chat_examples.clients import get_client
+from panel_chat_examples.serialize import SerializedHistory
+from panel_chat_examples.streaming import mistral_delta, stream_deltas
 
-def update_api_key(api_key):
-    # Use the provided api_key or default to the environment variable
-    pn.state.cache["aclient"] = (
-        Mistral(api_key=api_key)
-        if api_key
-        else Mistral(api_key=os.getenv("MISTRAL_API_KEY", ""))
-    )
+pn.extension()
 
 
 async def callback(contents: str, user: str, instance: pn.chat.ChatInterface):
-    # memory is a list of serialized messages
-    messages = instance.serialize()
-
-    # Convert serialized messages into UserMessage format
-    formatted_messages = [UserMessage(content=msg["content"]) for msg in messages]
+    # memory is a list of serialized messages, converted into UserMessage format
+    formatted_messages = history.serialize()
 
-    response = await pn.state.cache["aclient"].chat.stream_async(
+    # Use the provided api_key or default to the MISTRAL_API_KEY environment variable
+    aclient = get_client("mistral", api_key_input.value)
+    response = await aclient.chat.stream_async(
         model="mistral-small",
         messages=formatted_messages,
     )
 
-    message = ""
-    async for chunk in response:
-        part = chunk.data.choices[0].delta.content
-        if part is not None:
-            message += part
-            yield message
+    await stream_deltas(response, instance, get_delta=mistral_delta)
 
 
 # Input widget for the API key
@@ -53,10 +40,6 @@ api_key_input = pn.widgets.PasswordInput(
     styles={"color": "black"},
 )
 
-# Bind the API key input to the update function
-pn.bind(update_api_key, api_key_input, watch=True)
-api_key_input.param.trigger("value")
-
 # Define the Chat Interface with callback
 chat_interface = pn.chat.ChatInterface(
     callback=callback,
@@ -64,6 +47,9 @@ chat_interface = pn.chat.ChatInterface(
     help_text="Send a message to get a reply from MistralAI!",
     callback_exception="verbose",
 )
+history = SerializedHistory(
+    chat_interface, converter=lambda msg: UserMessage(content=msg["content"])
+)
 
 # Template with the chat interface
 template = pn.template.FastListTemplate(
@@ -4,39 +4,40 @@ Demonstrates how to use OpenAI's GPT-3.5 API with Panel's ChatInterface.
 Highlights:
 
 - Uses `PasswordInput` to set the API key, or uses the `OPENAI_API_KEY` environment variable.
-- Uses `serialize` to get chat history from the `ChatInterface`.
-- Uses `yield` to continuously concatenate the parts of the response
+- Uses `get_client` to share pooled clients across sessions without sharing API keys.
+- Uses `SerializedHistory` to incrementally serialize the chat history from the `ChatInterface`.
+- Uses `stream_deltas` to append the parts of the response to the message in place
+- Uses `cached_stream` to replay identical requests if `$PANEL_CHAT_EXAMPLES_CACHE` is set
 """
 
 import panel as pn
-from openai import AsyncOpenAI
+
+from panel_chat_examples.cache import cached_stream
+from panel_chat_examples.clients import get_client
+from panel_chat_examples.serialize import SerializedHistory
+from panel_chat_examples.streaming import openai_delta, stream_deltas
 
 pn.extension()
 
 
 async def callback(contents: str, user: str, instance: pn.chat.ChatInterface):
-    if api_key_input.value:
-        # use api_key_input.value if set, otherwise use OPENAI_API_KEY
-        aclient.api_key = api_key_input.value
+    # use api_key_input.value if set, otherwise use OPENAI_API_KEY
+    aclient = get_client("openai", api_key_input.value)
 
     # memory is a list of messages
-    messages = instance.serialize()
-
-    response = await aclient.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=messages,
-        stream=True,
+    messages = history.serialize()
+
+    request = {"model": "gpt-3.5-turbo", "messages": messages, "stream": True}
+    response = cached_stream(
+        request,
+        lambda: aclient.chat.completions.create(**request),
+        get_delta=openai_delta,
+        base_url=aclient.base_url,
     )
 
-    message = ""
-    async for chunk in response:
-        part = chunk.choices[0].delta.content
-        if part is not None:
-            message += part
-            yield message
+    await stream_deltas(response, instance)
 
 
-aclient = AsyncOpenAI()
 api_key_input = pn.widgets.PasswordInput(
     placeholder="sk-... uses $OPENAI_API_KEY if not set",
     sizing_mode="stretch_width",
@@ -47,6 +48,7 @@ chat_interface = pn.chat.ChatInterface(
     callback_user="GPT-3.5",
     help_text="Send a message to get a reply from GPT-3.5 Turbo!",
 )
+history = SerializedHistory(chat_interface)
 template = pn.template.FastListTemplate(
     title="OpenAI GPT-3.5",
     header_background="#212121",
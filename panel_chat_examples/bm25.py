@@ -0,0 +1,136 @@
+"""A compact, in-process BM25 index for local lexical retrieval"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Hashable, Sequence
+
+import numpy as np
+
+K1 = 1.5
+B = 0.75
+RRF_K = 60
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Returns the lower cased words of the text"""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Ranks texts by their Okapi BM25 score for a query, without any remote
+    embedding calls.
+
+    The index is inverted: each term maps to compact `array` postings of the
+    ids of the texts it occurs in and its frequency in them, so a query only
+    touches the postings of its terms. Texts can be added while the index is
+    searched, e.g. while a PDF is ingested.
+
+    Arguments:
+        k1: The term frequency saturation.
+        b: The document length normalization.
+
+    Example:
+        >>> index = BM25Index()
+        >>> index.add(["The PSF was founded in 2001"], [{"page": 0}])
+        >>> index.search("When was the PSF founded?", k=1)
+    """
+
+    def __init__(self, k1: float = K1, b: float = B):
+        self.k1 = k1
+        self.b = b
+        self.texts: list[str] = []
+        self.metadatas: list[dict] = []
+        self._vocabulary: dict[str, int] = {}
+        self._ids: list[array] = []
+        self._frequencies: list[array] = []
+        self._lengths = array("i")
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(
+        self, texts: Sequence[str], metadatas: Sequence[dict] | None = None
+    ) -> None:
+        """Adds the texts and their metadata, like `add_texts` of a vector store"""
+        metadatas = metadatas or [{} for _ in texts]
+        with self._lock:
+            for text, metadata in zip(texts, metadatas):
+                text_id = len(self.texts)
+                tokens = tokenize(text)
+                for term, frequency in Counter(tokens).items():
+                    term_id = self._vocabulary.get(term)
+                    if term_id is None:
+                        term_id = self._vocabulary[term] = len(self._ids)
+                        self._ids.append(array("i"))
+                        self._frequencies.append(array("f"))
+                    self._ids[term_id].append(text_id)
+                    self._frequencies[term_id].append(frequency)
+                self._lengths.append(len(tokens))
+                self._total_length += len(tokens)
+                self.texts.append(text)
+                self.metadatas.append(metadata)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of each text for the query"""
+        with self._lock:
+            n_texts = len(self.texts)
+            scores = np.zeros(n_texts)
+            if not n_texts:
+                return scores
+            lengths = np.array(self._lengths, dtype=np.float64)
+            average_length = self._total_length / n_texts or 1
+            for term in set(tokenize(query)):
+                term_id = self._vocabulary.get(term)
+                if term_id is None:
+                    continue
+                ids = np.array(self._ids[term_id], dtype=np.int64)
+                frequencies = np.array(self._frequencies[term_id], dtype=np.float64)
+                idf = math.log(1 + (n_texts - len(ids) + 0.5) / (len(ids) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[ids] / average_length)
+                scores[ids] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+        return scores
+
+    def search(self, query: str, k: int = 4) -> list[tuple[float, str, dict]]:
+        """Returns the score, text and metadata of the k best matching texts"""
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if not k:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            (float(scores[i]), self.texts[i], self.metadatas[i])
+            for i in best
+            if scores[i] > 0
+        ]
+
+    def nbytes(self) -> int:
+        """Returns the bytes of the postings and lengths"""
+        return sum(
+            ids.itemsize * len(ids) + frequencies.itemsize * len(frequencies)
+            for ids, frequencies in zip(self._ids, self._frequencies)
+        ) + self._lengths.itemsize * len(self._lengths)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]], k: int = RRF_K
+) -> list[Any]:
+    """
+    Fuses rankings, e.g. of a lexical and a vector retriever, by the sum of
+    `1 / (k + rank)` of each item in each ranking.
+    """
+    scores: dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
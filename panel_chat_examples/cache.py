@@ -0,0 +1,286 @@
+"""An opt-in, exact match cache of streamed LLM responses"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from panel_chat_examples.streaming import aiter_deltas
+
+MAX_ENTRIES = 1024
+MAX_DISK_ENTRIES = 100_000
+
+# Set to "memory" or the path of a SQLite file to enable the process wide cache
+CACHE_ENV_VAR = "PANEL_CHAT_EXAMPLES_CACHE"
+# The number of chunks per second a cached response is replayed at
+SPEED_ENV_VAR = "PANEL_CHAT_EXAMPLES_CACHE_SPEED"
+
+
+def request_key(request: dict) -> str:
+    """
+    Returns a canonical hash of a request, e.g. the model, parameters and
+    serialized messages of a chat completion.
+    """
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf8")).hexdigest()
+
+
+def content_key(data: bytes, *parts: str) -> str:
+    """
+    Returns the hash of the content of a file, e.g. the bytes of an uploaded
+    PDF, and of any `parts` that change how it is processed, e.g. the chunk
+    size of its index.
+    """
+    digest = hashlib.sha256(data)
+    for part in parts:
+        digest.update(b"\0" + part.encode("utf8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Caches the text deltas of streamed LLM responses by a canonical hash of
+    the request.
+
+    Responses are kept in an in-memory LRU tier and, if a `path` is given, in
+    a SQLite tier that persists across restarts. A cache hit is replayed as a
+    stream of the original deltas, so it goes through the normal streaming
+    path, at `speed` chunks per second or as fast as possible if None.
+
+    Arguments:
+        path: The SQLite file of the disk tier. No disk tier if None.
+        max_entries: The number of responses kept in memory.
+        max_disk_entries: The number of responses kept on disk.
+        speed: The number of chunks per second to replay a cached response at.
+
+    Example:
+        >>> deltas = cache.stream(
+        ...     request, create, get_delta=openai_delta, base_url=client.base_url
+        ... )
+        >>> await stream_deltas(deltas, instance)
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        max_entries: int = MAX_ENTRIES,
+        max_disk_entries: int = MAX_DISK_ENTRIES,
+        speed: float | None = None,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.speed = speed
+        self._memory: OrderedDict[str, list[str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_entries = 0
+        if path is not None:
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, chunks TEXT, size INTEGER, last_used REAL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used "
+                "ON responses (last_used)"
+            )
+            self._db.commit()
+            self._disk_entries = self._count()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+
+    def get(self, key: str) -> list[str] | None:
+        """Returns the cached deltas of the key, if any"""
+        with self._lock:
+            chunks = self._memory.get(key)
+            if chunks is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT chunks FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    chunks = json.loads(row[0])
+                    self._db.execute(
+                        "UPDATE responses SET last_used = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    self._db.commit()
+                    self._set_memory(key, chunks)
+
+            if chunks is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_served += _size(chunks)
+            return chunks
+
+    def set(self, key: str, chunks: list[str]) -> None:
+        """Stores the deltas of the key"""
+        with self._lock:
+            self._set_memory(key, chunks)
+            size = _size(chunks)
+            self.bytes_stored += size
+            if self._db is None:
+                return
+            exists = self._db.execute(
+                "SELECT 1 FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, json.dumps(chunks), size, time.time()),
+            )
+            if exists is None:
+                self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                # other processes may share the file
+                self._disk_entries = self._count()
+                excess = self._disk_entries - self.max_disk_entries
+                if excess > 0:
+                    self._db.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM "
+                        "responses ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    )
+                    self._disk_entries -= excess
+            self._db.commit()
+
+    async def stream(
+        self,
+        request: dict,
+        create: Callable[[], Any],
+        get_delta: Callable[[Any], str | None] | None = None,
+        base_url: Any = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streams the text deltas of the response to the request.
+
+        Arguments:
+            request: The request, used to compute the key.
+            create: Returns the (awaitable) async or sync iterable of chunks of
+                the response on a cache miss.
+            get_delta: Extracts the text from a chunk.
+            base_url: The base URL of the client, so the responses of
+                different endpoints serving the same model are not shared.
+        """
+        if base_url is not None:
+            request = {**request, "base_url": str(base_url)}
+        key = request_key(request)
+        chunks = await self._off_loop(self.get, key)
+        if chunks is not None:
+            for chunk in chunks:
+                if self.speed:
+                    await asyncio.sleep(1 / self.speed)
+                yield chunk
+            return
+
+        response = create()
+        if inspect.isawaitable(response):
+            response = await response
+        chunks = []
+        async for chunk in aiter_deltas(response):
+            delta = get_delta(chunk) if get_delta else chunk
+            if not delta:
+                continue
+            chunks.append(delta)
+            yield delta
+        await self._off_loop(self.set, key, chunks)
+
+    def stats(self) -> dict[str, float]:
+        """Returns the hits, misses, hit rate and bytes served and stored"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_served": self.bytes_served,
+            "bytes_stored": self.bytes_stored,
+        }
+
+    def clear(self) -> None:
+        """Removes all responses"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+                self._disk_entries = 0
+
+    def _count(self):
+        return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    async def _off_loop(self, function, *args):
+        # the reads, writes and commits of the SQLite tier block
+        if self._db is None:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    def _set_memory(self, key, chunks):
+        self._memory[key] = chunks
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+def _size(chunks: list[str]) -> int:
+    return sum(len(chunk.encode("utf8")) for chunk in chunks)
+
+
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache | None:
+    """
+    Returns the process wide ResponseCache, if enabled by setting the
+    `PANEL_CHAT_EXAMPLES_CACHE` environment variable to "memory" or the path
+    of a SQLite file.
+    """
+    global _cache  # pylint: disable=global-statement
+    setting = os.getenv(CACHE_ENV_VAR)
+    if not setting:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            speed = os.getenv(SPEED_ENV_VAR)
+            _cache = ResponseCache(
+                path=None if setting == "memory" else setting,
+                speed=float(speed) if speed else None,
+            )
+    return _cache
+
+
+async def cached_stream(
+    request: dict,
+    create: Callable[[], Any],
+    get_delta: Callable[[Any], str | None] | None = None,
+    base_url: Any = None,
+) -> AsyncIterator[str]:
+    """
+    Streams the text deltas of the response to the request through the process
+    wide cache, or directly if the cache is not enabled.
+    """
+    cache = get_response_cache()
+    if cache is not None:
+        async for delta in cache.stream(request, create, get_delta, base_url):
+            yield delta
+        return
+
+    response = create()
+    if inspect.isawaitable(response):
+        response = await response
+    async for chunk in aiter_deltas(response):
+        delta = get_delta(chunk) if get_delta else chunk
+        if delta:
+            yield delta
@@ -0,0 +1,198 @@
+"""A process wide registry of LLM clients sharing pooled HTTP connections"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+from typing import Any, Callable
+
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30
+IDLE_TIMEOUT = 15 * 60
+
+
+def _create_http_client(
+    max_connections: int = MAX_CONNECTIONS,
+    max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = KEEPALIVE_EXPIRY,
+):
+    import httpx  # pylint: disable=import-outside-toplevel
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    http2 = importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(limits=limits, http2=http2, timeout=httpx.Timeout(600))
+
+
+def _create_openai_client(api_key: str, http_client, **kwargs):
+    from openai import AsyncOpenAI  # pylint: disable=import-outside-toplevel
+
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, **kwargs)
+
+
+def _create_mistral_client(api_key: str, http_client, **kwargs):
+    from mistralai import Mistral  # pylint: disable=import-outside-toplevel
+
+    return Mistral(api_key=api_key, async_client=http_client, **kwargs)
+
+
+class _Provider:
+    __slots__ = ("factory", "env_var")
+
+    def __init__(self, factory: Callable[..., Any], env_var: str | None):
+        self.factory = factory
+        self.env_var = env_var
+
+
+class _Entry:
+    __slots__ = ("client", "last_used")
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+class ClientRegistry:
+    """
+    Hands out LLM clients keyed by provider and a hash of the API key.
+
+    All clients of a provider share one pooled, keep-alive HTTP client, so
+    many sessions reuse a small number of warm connections. Each API key gets
+    its own client, so a key entered in one session is never used by another
+    one, and the `api_key` of a shared client is never mutated. Clients that
+    have not been used for `idle_timeout` seconds are evicted.
+
+    Arguments:
+        idle_timeout: Seconds after which an unused client is evicted.
+        http_client_factory: Creates the pooled HTTP client of a provider.
+            Defaults to a `httpx.AsyncClient` with bounded keep-alive pools
+            that uses HTTP/2 if `h2` is installed.
+
+    Example:
+        >>> aclient = get_client("openai", api_key_input.value)
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = IDLE_TIMEOUT,
+        http_client_factory: Callable[[], Any] = _create_http_client,
+    ):
+        self.idle_timeout = idle_timeout
+        self._http_client_factory = http_client_factory
+        self._providers: dict[str, _Provider] = {}
+        self._http_clients: dict[str, Any] = {}
+        self._clients: dict[tuple[str, str], _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def register_provider(
+        self,
+        provider: str,
+        factory: Callable[..., Any],
+        env_var: str | None = None,
+    ) -> None:
+        """
+        Registers a provider.
+
+        Arguments:
+            provider: The name of the provider, e.g. "openai".
+            factory: Creates a client from an `api_key`, the shared
+                `http_client` and any keyword arguments passed to `get`.
+            env_var: The environment variable to read the API key from if none
+                is provided.
+        """
+        self._providers[provider] = _Provider(factory, env_var)
+
+    def get(self, provider: str, api_key: str | None = None, **kwargs) -> Any:
+        """
+        Returns the client of the provider for the API key.
+
+        Arguments:
+            provider: The name of a registered provider.
+            api_key: The API key. Defaults to the provider's environment variable.
+            **kwargs: Additional arguments for the client, e.g. `base_url`.
+                They are part of the key.
+        """
+        if provider not in self._providers:
+            raise KeyError(  # noqa: TRY003
+                f"Unknown provider {provider!r}; "
+                f"choose one of {sorted(self._providers)!r}."
+            )
+        info = self._providers[provider]
+        if not api_key and info.env_var:
+            api_key = os.getenv(info.env_var, "")
+        key = (provider, _hash_key(api_key or "", kwargs))
+
+        with self._lock:
+            self._evict_idle()
+            entry = self._clients.get(key)
+            if entry is None:
+                self.misses += 1
+                http_client = self._http_clients.get(provider)
+                if http_client is None:
+                    http_client = self._http_client_factory()
+                    self._http_clients[provider] = http_client
+                client = info.factory(api_key, http_client, **kwargs)
+                entry = self._clients[key] = _Entry(client)
+            else:
+                self.hits += 1
+            entry.last_used = time.monotonic()
+            return entry.client
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of clients, pools, hits, misses and evictions"""
+        return {
+            "clients": len(self._clients),
+            "http_clients": len(self._http_clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        for key, entry in list(self._clients.items()):
+            if now - entry.last_used > self.idle_timeout:
+                del self._clients[key]
+                self.evictions += 1
+
+        in_use = {provider for provider, _ in self._clients}
+        for provider in list(self._http_clients):
+            if provider not in in_use:
+                _close(self._http_clients.pop(provider))
+
+
+def _hash_key(api_key: str, kwargs: dict) -> str:
+    value = api_key + repr(sorted(kwargs.items()))
+    return hashlib.sha256(value.encode("utf8")).hexdigest()
+
+
+def _close(http_client):
+    aclose = getattr(http_client, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    loop.create_task(aclose())
+
+
+registry = ClientRegistry()
+registry.register_provider("openai", _create_openai_client, "OPENAI_API_KEY")
+registry.register_provider("mistral", _create_mistral_client, "MISTRAL_API_KEY")
+
+
+def get_client(provider: str, api_key: str | None = None, **kwargs) -> Any:
+    """Returns a client of the process wide `registry`; see `ClientRegistry.get`"""
+    return registry.get(provider, api_key, **kwargs)
@@ -0,0 +1,108 @@
+"""Columnar CSV ingestion into Arrow tables with windowed pandas views"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+BLOCK_SIZE = 16 * 1024**2
+WINDOW_ROWS = 1000
+# string columns with at most this many distinct values per block are
+# dictionary encoded, e.g. the species of the penguins
+MAX_DICTIONARY_CARDINALITY = 1000
+
+
+def read_csv(source: bytes | str | Path, block_size: int = BLOCK_SIZE) -> pa.Table:
+    """
+    Parses a CSV, e.g. the bytes of an upload, into an Arrow table.
+
+    The CSV is parsed and converted one block of `block_size` bytes at a
+    time, with the types of the columns inferred from the first block, so
+    only one block of parsed text is held at once. If a later block does not
+    fit the types, e.g. a float in a column of integers, the CSV is parsed
+    again as a whole, which infers the types from all blocks but holds all
+    of them. Repetitive string columns are dictionary encoded.
+    """
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+    from pyarrow import csv  # pylint: disable=import-outside-toplevel
+
+    def open_source():
+        # reads the bytes without copying them
+        return pa.BufferReader(source) if isinstance(source, bytes) else source
+
+    read_options = csv.ReadOptions(block_size=block_size)
+    convert_options = csv.ConvertOptions(
+        # like pandas, e.g. "NA" is missing
+        strings_can_be_null=True,
+        auto_dict_encode=True,
+        auto_dict_max_cardinality=MAX_DICTIONARY_CARDINALITY,
+    )
+    try:
+        reader = csv.open_csv(
+            open_source(), read_options=read_options, convert_options=convert_options
+        )
+        return reader.read_all()
+    except pa.ArrowInvalid:
+        return csv.read_csv(
+            open_source(), read_options=read_options, convert_options=convert_options
+        )
+
+
+class ArrowFrame:
+    """
+    Holds a table in Arrow and converts it to pandas only when and as far as
+    needed.
+
+    `to_pandas` returns a DataFrame backed by the Arrow buffers, via
+    `pd.ArrowDtype`, so the table is not copied, and builds it once on first
+    use. `window` converts a slice of rows, e.g. the rows shown in the
+    browser, to a regular DataFrame.
+
+    Arguments:
+        table: The Arrow table.
+
+    Example:
+        >>> frame = ArrowFrame.from_csv(file_input.value)
+        >>> pn.pane.Perspective(frame.window(0, 1000))
+    """
+
+    def __init__(self, table: pa.Table):
+        self.table = table
+        self._data: pd.DataFrame | None = None
+
+    @classmethod
+    def from_csv(
+        cls, source: bytes | str | Path, block_size: int = BLOCK_SIZE
+    ) -> ArrowFrame:
+        """Returns the ArrowFrame of a CSV, parsed with `read_csv`"""
+        return cls(read_csv(source, block_size))
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def columns(self) -> list[str]:
+        return self.table.column_names
+
+    @property
+    def nbytes(self) -> int:
+        """The bytes of the Arrow buffers of the table"""
+        return self.table.nbytes
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Returns the DataFrame view of the whole table, built on first use"""
+        if self._data is None:
+            import pandas as pd  # pylint: disable=import-outside-toplevel
+
+            self._data = self.table.to_pandas(types_mapper=pd.ArrowDtype)
+        return self._data
+
+    def window(self, start: int = 0, stop: int | None = None) -> pd.DataFrame:
+        """Returns the rows from start to stop as a DataFrame with NumPy types"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = max(0, min(start, stop))
+        return self.table.slice(start, stop - start).to_pandas()
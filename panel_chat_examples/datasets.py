@@ -0,0 +1,306 @@
+"""A local cache of the example datasets, stored as memory mapped Arrow files"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+from panel_chat_examples.columnar import read_csv
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Set to the directory of the process wide DatasetCache
+DATASET_DIR_ENV_VAR = "PANEL_CHAT_EXAMPLES_DATASET_DIR"
+DEFAULT_DATASET_DIR = Path.home() / ".cache" / "panel_chat_examples" / "datasets"
+MANIFEST = "manifest.json"
+DOWNLOAD_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """An example dataset, downloaded once as a CSV"""
+
+    name: str
+    """The name the dataset is loaded by"""
+    url: str
+    """The URL of the CSV, or of a zip archive containing it"""
+    sha256: str
+    """The checksum of the CSV, which a download or seed must match"""
+    member: str | None = None
+    """The path of the CSV in the zip archive at the URL, e.g. a wheel on PyPI"""
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.csv"
+
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in (
+        Dataset(
+            "penguins",
+            "https://raw.githubusercontent.com/mwaskom/seaborn-data/master/penguins.csv",
+            "e07636bd8af74260099ea2f8678e2eabbf35def579940cc76f67061ee16c06c1",
+        ),
+        Dataset(
+            "gapminder",
+            # the copy of R's gapminder dataset in the gapminder 0.1 wheel
+            "https://files.pythonhosted.org/packages/85/83/"
+            "57293b277ac2990ea1d3d0439183da8a3466be58174f822c69b02e584863/"
+            "gapminder-0.1-py3-none-any.whl",
+            "9859ce5cbcc146efe608feb5cf917b6c60f8767fe7df2ebe49b00598a0baf099",
+            member="gapminder/gapminder.csv",
+        ),
+    )
+}
+
+
+class DatasetChecksumError(RuntimeError):
+    """Raised when a downloaded or seeded dataset does not match its checksum"""
+
+    def __init__(self, name: str, checksum: str, expected: str):
+        super().__init__(
+            f"The {name} dataset has the checksum {checksum}, expected {expected}"
+        )
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024**2), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _download(url: str, path: Path) -> None:
+    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        path.write_bytes(response.read())
+
+
+def _extract(path: Path, member: str) -> None:
+    with zipfile.ZipFile(path) as archive:
+        data = archive.read(member)
+    path.write_bytes(data)
+
+
+def _write_table(table: pa.Table, path: Path) -> None:
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    # the blocks of a CSV are dictionary encoded separately, an IPC file
+    # needs one dictionary per column
+    table = table.unify_dictionaries()
+    with pa.ipc.new_file(str(path), table.schema) as writer:
+        writer.write_table(table)
+
+
+class DatasetCache:
+    """
+    Keeps the example datasets in a local directory, so the examples load
+    them from disk instead of downloading them when they are imported.
+
+    Each dataset is downloaded once, checked against the checksum of its
+    `Dataset`, and stored both as the CSV, e.g. to offer it for download,
+    and as an uncompressed Arrow IPC (Feather) file. `load` memory maps the
+    Arrow file, so the table is not parsed again and its pages are shared by
+    all processes loading it. A dataset is only recorded in the manifest of
+    the cache once both files are complete, so an interrupted download is
+    downloaded again.
+
+    Arguments:
+        root: The directory of the datasets.
+        datasets: The datasets by name.
+        download: Downloads a URL to a path.
+
+    Example:
+        >>> data = cache.load("gapminder").to_pandas()
+    """
+
+    def __init__(
+        self,
+        root: str | Path = DEFAULT_DATASET_DIR,
+        datasets: dict[str, Dataset] | None = None,
+        download: Callable[[str, Path], None] = _download,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.datasets = DATASETS if datasets is None else datasets
+        self._download = download
+        self._lock = threading.Lock()
+        self._name_locks = {name: threading.Lock() for name in self.datasets}
+        self._tables: dict[str, pa.Table] = {}
+        self._manifest: dict[str, dict] = self._read_manifest()
+        self.hits = 0
+        self.downloads = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._manifest
+
+    def path(self, name: str) -> Path:
+        """Returns the path of the Arrow file of the dataset"""
+        return self.root / f"{name}.arrow"
+
+    def source_path(self, name: str, seed: str | Path | None = None) -> Path:
+        """Returns the path of the CSV of the dataset, fetching it if needed"""
+        self.fetch(name, seed)
+        return self.root / self.datasets[name].filename
+
+    def fetch(self, name: str, seed: str | Path | None = None) -> None:
+        """
+        Stores the dataset if it is not stored yet.
+
+        Arguments:
+            name: The name of the dataset.
+            seed: A local copy of the CSV, used instead of downloading it if
+                its checksum matches.
+        """
+        dataset = self.datasets[name]
+        with self._name_locks[name]:
+            if name in self._manifest:
+                return
+            source = self.root / dataset.filename
+            handle, temp = tempfile.mkstemp(dir=self.root, suffix=".csv")
+            os.close(handle)
+            temp = Path(temp)
+            try:
+                if seed is not None and Path(seed).exists():
+                    shutil.copyfile(seed, temp)
+                else:
+                    self._download(dataset.url, temp)
+                    self.downloads += 1
+                    if dataset.member:
+                        _extract(temp, dataset.member)
+                checksum = _sha256(temp)
+                if checksum != dataset.sha256:
+                    raise DatasetChecksumError(name, checksum, dataset.sha256)
+                _write_table(read_csv(temp), self.path(name))
+                temp.replace(source)
+            finally:
+                temp.unlink(missing_ok=True)
+            with self._lock:
+                self._manifest[name] = {
+                    "url": dataset.url,
+                    "sha256": checksum,
+                    "size": source.stat().st_size + self.path(name).stat().st_size,
+                }
+                self._write_manifest()
+
+    def load(self, name: str, seed: str | Path | None = None) -> pa.Table:
+        """
+        Returns the table of the dataset, memory mapped from its Arrow file,
+        fetching it if needed.
+        """
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+        with self._lock:
+            table = self._tables.get(name)
+        if table is not None:
+            self.hits += 1
+            return table
+        self.fetch(name, seed)
+        with pa.memory_map(str(self.path(name))) as source:
+            table = pa.ipc.open_file(source).read_all()
+        with self._lock:
+            self._tables[name] = table
+        return table
+
+    def verify(self, name: str) -> bool:
+        """Returns whether the stored CSV still matches the recorded checksum"""
+        entry = self._manifest.get(name)
+        source = self.root / self.datasets[name].filename
+        return (
+            entry is not None and source.exists() and _sha256(source) == entry["sha256"]
+        )
+
+    def prefetch(
+        self, names: list[str] | None = None, max_workers: int = 4
+    ) -> list[str]:
+        """
+        Fetches the datasets, all by default, in parallel, e.g. when a server
+        starts, and returns the names of the datasets that could not be
+        fetched, e.g. when offline.
+        """
+        names = list(self.datasets) if names is None else names
+        missing = [name for name in names if name not in self._manifest]
+        failed = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {name: executor.submit(self.fetch, name) for name in missing}
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except (OSError, ValueError, DatasetChecksumError) as error:
+                    logger.warning("Could not fetch the %s dataset: %s", name, error)
+                    failed.append(name)
+        return failed
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number and bytes of the stored datasets, hits and downloads"""
+        with self._lock:
+            return {
+                "datasets": len(self._manifest),
+                "bytes": sum(entry["size"] for entry in self._manifest.values()),
+                "hits": self.hits,
+                "downloads": self.downloads,
+            }
+
+    def _read_manifest(self) -> dict[str, dict]:
+        try:
+            manifest = json.loads((self.root / MANIFEST).read_text())
+        except (OSError, ValueError):
+            return {}
+        return {
+            name: entry
+            for name, entry in manifest.items()
+            if name in self.datasets
+            and self.path(name).exists()
+            and (self.root / self.datasets[name].filename).exists()
+        }
+
+    def _write_manifest(self):
+        temp = self.root / f".{MANIFEST}.{os.getpid()}"
+        temp.write_text(json.dumps(self._manifest))
+        temp.replace(self.root / MANIFEST)
+
+
+_cache: DatasetCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_dataset_cache() -> DatasetCache:
+    """
+    Returns the process wide DatasetCache, in `$PANEL_CHAT_EXAMPLES_DATASET_DIR`
+    if set, otherwise in `~/.cache/panel_chat_examples/datasets`.
+    """
+    global _cache  # pylint: disable=global-statement
+    with _cache_lock:
+        if _cache is None:
+            _cache = DatasetCache(os.getenv(DATASET_DIR_ENV_VAR) or DEFAULT_DATASET_DIR)
+        return _cache
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Fetches the example datasets")
+    parser.add_argument("names", nargs="*", help="The datasets, all by default")
+    args = parser.parse_args(args)
+    cache = get_dataset_cache()
+    failed = cache.prefetch(args.names or None)
+    print(f"Stored {cache.stats()['datasets']} datasets in {cache.root}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,240 @@
+"""A disk backed cache of text embeddings shared across documents and sessions"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+MAX_BYTES = 512 * 1024**2
+# Set to the path of the SQLite file of the process wide EmbeddingCache
+CACHE_ENV_VAR = "PANEL_CHAT_EXAMPLES_EMBEDDING_CACHE"
+DEFAULT_CACHE_PATH = (
+    Path.home() / ".cache" / "panel_chat_examples" / "embeddings.sqlite"
+)
+# SQLite limits the number of parameters of a query
+_MAX_PARAMETERS = 500
+
+
+def embedding_key(text: str, model: str) -> str:
+    """Returns the hash of a text and the model that embeds it"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Caches the embeddings of texts, e.g. the chunks of documents, in SQLite
+    by a hash of the text and the embedding model.
+
+    `embed` only sends the texts that are not cached to the provider, in a
+    single batch, so a revision of a document only embeds the chunks that
+    changed. The vectors are stored as float32. The least recently used
+    embeddings are removed once they take more than `max_bytes`.
+
+    Arguments:
+        path: The SQLite file. Defaults to an in-memory database.
+        max_bytes: The maximum total size of the vectors.
+
+    Example:
+        >>> vectors = cache.embed(texts, embeddings.embed_documents, "ada-002")
+    """
+
+    def __init__(self, path: str | Path | None = None, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            ":memory:" if path is None else str(path), check_same_thread=False
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB, size INTEGER, last_used REAL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._db.commit()
+        self.nbytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.calls = 0
+        self.calls_saved = 0
+        self.evictions = 0
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        embed_batch: Callable[[list[str]], Sequence[Sequence[float]]],
+        model: str,
+    ) -> list[list[float]]:
+        """
+        Returns the embeddings of the texts, embedding the missing ones.
+
+        Arguments:
+            texts: The texts to embed.
+            embed_batch: Embeds a list of texts with the provider, e.g.
+                `OpenAIEmbeddings().embed_documents`.
+            model: The name of the embedding model, part of the key.
+        """
+        keys = [embedding_key(text, model) for text in texts]
+        vectors = self._get(keys)
+        missing = {
+            key: text for key, text in zip(keys, texts) if vectors.get(key) is None
+        }
+        with self._lock:
+            self.hits += len(keys) - sum(vectors.get(key) is None for key in keys)
+            self.misses += len(missing)
+            if missing:
+                self.calls += 1
+            elif keys:
+                self.calls_saved += 1
+
+        if missing:
+            embedded = embed_batch(list(missing.values()))
+            new_vectors = {key: list(vector) for key, vector in zip(missing, embedded)}
+            self._set(new_vectors)
+            vectors.update(new_vectors)
+        return [vectors[key] for key in keys]
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the hits, misses, hit rate, provider calls made and saved,
+        number and bytes of the stored embeddings and evictions.
+        """
+        lookups = self.hits + self.misses
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "calls": self.calls,
+            "calls_saved": self.calls_saved,
+            "embeddings": count,
+            "bytes_stored": self.nbytes,
+            "evictions": self.evictions,
+        }
+
+    def clear(self) -> None:
+        """Removes all embeddings"""
+        with self._lock:
+            self._db.execute("DELETE FROM embeddings")
+            self._db.commit()
+            self.nbytes = 0
+
+    def _get(self, keys: list[str]) -> dict[str, list[float]]:
+        vectors = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), _MAX_PARAMETERS):
+                batch = keys[start : start + _MAX_PARAMETERS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    vectors[key] = vector.tolist()
+                self._db.execute(
+                    f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})",
+                    [now, *batch],
+                )
+            self._db.commit()
+        return vectors
+
+    def _set(self, vectors: dict[str, list[float]]):
+        now = time.time()
+        rows = []
+        for key, vector in vectors.items():
+            blob = array("f", vector).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            for key, *_ in rows:
+                row = self._db.execute(
+                    "SELECT size FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self.nbytes -= row[0]
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows
+            )
+            self.nbytes += sum(row[2] for row in rows)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.nbytes = 0
+                return
+            for key, size in rows:
+                if self.nbytes <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self.nbytes -= size
+                self.evictions += 1
+
+
+class CachedEmbeddings:
+    """
+    Wraps a LangChain `Embeddings`, like `OpenAIEmbeddings`, to embed the
+    documents and queries through an EmbeddingCache, e.g. as the
+    `embedding_function` of a `Chroma` vector store.
+
+    Arguments:
+        embeddings: The embeddings of the provider.
+        cache: The cache. Defaults to the process wide cache.
+        model: The name of the embedding model. Defaults to the `model` of
+            the embeddings.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        cache: EmbeddingCache | None = None,
+        model: str | None = None,
+    ):
+        self.embeddings = embeddings
+        self.cache = cache or get_embedding_cache()
+        self.model = model or getattr(embeddings, "model", type(embeddings).__name__)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.cache.embed(texts, self.embeddings.embed_documents, self.model)
+
+    def embed_query(self, text: str) -> list[float]:
+        # some models embed queries differently from documents
+        return self.cache.embed(
+            [text],
+            lambda texts: [self.embeddings.embed_query(texts[0])],
+            f"{self.model}:query",
+        )[0]
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Returns the process wide EmbeddingCache, in
+    `$PANEL_CHAT_EXAMPLES_EMBEDDING_CACHE` if set, otherwise in
+    `~/.cache/panel_chat_examples/embeddings.sqlite`.
+    """
+    global _cache  # pylint: disable=global-statement
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(os.getenv(CACHE_ENV_VAR) or DEFAULT_CACHE_PATH)
+        return _cache
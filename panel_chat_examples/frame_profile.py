@@ -0,0 +1,163 @@
+"""Compact, cached profiles of DataFrames for the prompts of data agents"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MAX_ENTRIES = 32
+# columns with at most this many distinct values list all of them
+MAX_LISTED_VALUES = 10
+TOP_VALUES = 5
+SAMPLE_ROWS = 3
+QUANTILES = (0.0, 0.25, 0.5, 0.75, 1.0)
+_QUANTILE_LABELS = ("min", "25%", "median", "75%", "max")
+
+
+def frame_key(data: pd.DataFrame) -> str:
+    """Returns the hash of the column names, types and values of a DataFrame"""
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    digest = hashlib.sha256()
+    for column, dtype in data.dtypes.items():
+        digest.update(f"{column}\0{dtype}\0".encode("utf8"))
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _type_name(dtype) -> str:
+    pyarrow_dtype = getattr(dtype, "pyarrow_dtype", None)
+    if pyarrow_dtype is None:
+        return str(dtype)
+    if hasattr(pyarrow_dtype, "value_type"):
+        # a dictionary encoded column
+        return "category"
+    return str(pyarrow_dtype)
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+def profile_frame(data: pd.DataFrame, sample_rows: int = SAMPLE_ROWS) -> str:
+    """
+    Returns a plain text profile of a DataFrame: its shape and, per column,
+    the type, number of missing and distinct values, the quantiles and mean
+    of numeric columns, the most frequent values of the others, and a few
+    sample rows as CSV.
+
+    The statistics of all columns are computed with a few vectorized calls.
+    """
+    missing = data.isna().sum()
+    distinct = data.nunique()
+    numeric = data.select_dtypes("number")
+    quantiles = numeric.quantile(list(QUANTILES)) if len(numeric.columns) else None
+    means = numeric.mean() if len(numeric.columns) else None
+
+    lines = [f"df has {len(data):,} rows and {len(data.columns)} columns.", ""]
+    lines.append("Columns:")
+    for column, dtype in data.dtypes.items():
+        line = (
+            f"- {column} ({_type_name(dtype)}): {missing[column]:,} missing, "
+            f"{distinct[column]:,} distinct"
+        )
+        if column in numeric.columns and distinct[column]:
+            stats = ", ".join(
+                f"{label} {_format(value)}"
+                for label, value in zip(_QUANTILE_LABELS, quantiles[column])
+            )
+            line += f", {stats}, mean {_format(means[column])}"
+        elif distinct[column]:
+            counts = data[column].value_counts()
+            shown = counts if len(counts) <= MAX_LISTED_VALUES else counts[:TOP_VALUES]
+            values = ", ".join(f"{value} ({count:,})" for value, count in shown.items())
+            if len(shown) < len(counts):
+                values += f" and {len(counts) - len(shown):,} more"
+            line += f": {values}"
+        lines.append(line)
+
+    if sample_rows and len(data):
+        sample = data.sample(n=min(sample_rows, len(data)), random_state=0)
+        lines += ["", "Sample rows (CSV):", sample.to_csv(index=False).strip()]
+    return "\n".join(lines)
+
+
+class ProfileCache:
+    """
+    Keeps the profiles of DataFrames by the hash of their content, so a
+    profile is computed once per distinct DataFrame, e.g. not again when the
+    same file is uploaded again, in the same or another session.
+
+    Arguments:
+        max_entries: The number of profiles kept, least recently used first out.
+
+    Example:
+        >>> profile = cache.get(df)
+        >>> profile = cache.get(frame.to_pandas, key=content_key(file_input.value))
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._profiles: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        data: pd.DataFrame | Callable[[], pd.DataFrame],
+        key: str | None = None,
+    ) -> str:
+        """
+        Returns the profile of the DataFrame, computing it if not cached.
+
+        Arguments:
+            data: The DataFrame, or a function returning it if a `key` is given,
+                called only if the profile is not cached.
+            key: The key of the content, e.g. the hash of the uploaded file,
+                instead of the `frame_key` of the DataFrame.
+        """
+        if key is None:
+            key = frame_key(data)
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None:
+                self._profiles.move_to_end(key)
+                self.hits += 1
+                return profile
+            self.misses += 1
+        profile = profile_frame(data() if callable(data) else data)
+        with self._lock:
+            self._profiles[key] = profile
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def stats(self) -> dict[str, int]:
+        """Returns the hits, misses and number of cached profiles"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._profiles),
+            }
+
+
+_cache: ProfileCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_profile_cache() -> ProfileCache:
+    """Returns the process wide ProfileCache"""
+    global _cache  # pylint: disable=global-statement
+    with _cache_lock:
+        if _cache is None:
+            _cache = ProfileCache()
+        return _cache
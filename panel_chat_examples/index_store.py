@@ -0,0 +1,273 @@
+"""A content addressed, size bounded store of persisted document indexes"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from pathlib import Path
+from typing import Any, Callable
+
+MAX_BYTES = 2 * 1024**3
+# Set to the directory of the process wide IndexStore
+INDEX_DIR_ENV_VAR = "PANEL_CHAT_EXAMPLES_INDEX_DIR"
+DEFAULT_INDEX_DIR = Path.home() / ".cache" / "panel_chat_examples" / "indexes"
+MANIFEST = "manifest.json"
+# the seconds between two writes of the manifest for lookups
+MANIFEST_WRITE_INTERVAL = 5.0
+# the loaded indexes kept when no session uses them
+MAX_LOADED = 8
+
+
+def _directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+class IndexStore:
+    """
+    Keeps the indexes of documents, e.g. Chroma vector stores, in
+    directories named after the `content_key` of the document, from
+    `panel_chat_examples.cache`.
+
+    An index is built once per document and loaded from disk by later
+    sessions and after restarts. It is only recorded in the manifest of the
+    store once it is complete, so an interrupted build is built again. The
+    least recently used indexes are removed once they take more than
+    `max_bytes` and built again when requested. Settings that do not change
+    the index, like the number of retrieved chunks, should be applied on top
+    of it so changing them does not rebuild it.
+
+    `get`, `lookup` and `add` hold a reference to the index for the caller,
+    e.g. a session, until it calls `release`. Indexes that are referenced are
+    neither removed from disk nor unloaded, and at most `max_loaded` indexes
+    that are not referenced are kept loaded for the next session.
+
+    Arguments:
+        root: The directory of the indexes.
+        max_bytes: The maximum total size of the indexes on disk.
+        max_loaded: The number of loaded indexes kept when no session uses them.
+
+    Example:
+        >>> db = store.get(key, build=lambda path: Chroma.from_documents(
+        ...     texts, embeddings, persist_directory=str(path)
+        ... ), load=lambda path: Chroma(
+        ...     persist_directory=str(path), embedding_function=embeddings
+        ... ))
+        >>> pn.state.on_session_destroyed(lambda _: store.release(key))
+    """
+
+    def __init__(
+        self,
+        root: str | Path = DEFAULT_INDEX_DIR,
+        max_bytes: int = MAX_BYTES,
+        max_loaded: int = MAX_LOADED,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_loaded = max_loaded
+        self._lock = threading.Lock()
+        self._key_locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._loaded: OrderedDict[str, Any] = OrderedDict()
+        self._references: Counter[str] = Counter()
+        self._manifest: dict[str, dict] = self._read_manifest()
+        self._manifest_written = 0.0
+        self._manifest_dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._manifest
+
+    def path(self, key: str) -> Path:
+        """Returns the directory of the index of the key"""
+        return self.root / key
+
+    def clean_path(self, key: str) -> Path:
+        """
+        Removes the directory of the index of the key, e.g. of an incomplete
+        build, and returns its path to build the index in.
+        """
+        path = self.path(key)
+        shutil.rmtree(path, ignore_errors=True)
+        return path
+
+    def get(
+        self,
+        key: str,
+        build: Callable[[Path], Any],
+        load: Callable[[Path], Any] | None = None,
+    ) -> Any:
+        """
+        Returns the index of the key, building it if it is not stored, and
+        holds a reference to it until `release`.
+
+        Arguments:
+            key: The `content_key` of the document.
+            build: Builds the index, persisted to the given directory, and
+                returns it.
+            load: Loads a persisted index from the given directory. If None,
+                indexes are only reused within the process.
+        """
+        with self._lock:
+            key_lock = self._key_locks[key]
+        with key_lock:
+            index = self.lookup(key, load)
+            if index is not None:
+                return index
+
+            path = self.clean_path(key)
+            try:
+                index = build(path)
+            except BaseException:
+                shutil.rmtree(path, ignore_errors=True)
+                raise
+            self.add(key, index)
+            return index
+
+    def lookup(self, key: str, load: Callable[[Path], Any] | None = None) -> Any:
+        """
+        Returns the index of the key if it is stored, otherwise None. A
+        returned index is referenced until `release`.
+
+        Arguments:
+            key: The `content_key` of the document.
+            load: Loads a persisted index from the given directory. If None,
+                only the indexes loaded in the process are returned.
+        """
+        with self._lock:
+            index = self._loaded.get(key)
+            stored = key in self._manifest
+        if index is None and stored and load is not None:
+            index = load(self.path(key))
+        with self._lock:
+            if index is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._loaded[key] = index
+            self._loaded.move_to_end(key)
+            self._references[key] += 1
+            entry = self._manifest.get(key)
+            if entry is not None:
+                entry["last_used"] = time.time()
+                self._manifest_dirty = True
+                self._write_manifest(debounce=True)
+        return index
+
+    def add(self, key: str, index: Any) -> None:
+        """
+        Records the complete index of the key, persisted to `path(key)`, e.g.
+        after building it incrementally, and references it until `release`.
+        """
+        path = self.path(key)
+        size = _directory_size(path) if path.exists() else 0
+        with self._lock:
+            self._loaded[key] = index
+            self._loaded.move_to_end(key)
+            self._references[key] += 1
+            self._manifest[key] = {"size": size, "last_used": time.time()}
+            self._evict()
+            self._write_manifest()
+
+    def release(self, key: str) -> None:
+        """
+        Drops a reference to the index of the key, e.g. when the session
+        using it is destroyed, so it can be unloaded and evicted.
+        """
+        with self._lock:
+            if self._references[key] <= 0:
+                return
+            self._references[key] -= 1
+            if self._references[key]:
+                return
+            del self._references[key]
+            self._evict()
+            self._unload()
+            self._write_manifest(debounce=True)
+
+    def flush(self) -> None:
+        """Writes the last use times of the indexes, e.g. before shutting down"""
+        with self._lock:
+            if self._manifest_dirty:
+                self._write_manifest()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number and bytes of the indexes, the loaded and
+        referenced indexes, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                "indexes": len(self._manifest),
+                "bytes": sum(entry["size"] for entry in self._manifest.values()),
+                "loaded": len(self._loaded),
+                "referenced": len(self._references),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self):
+        # indexes in use may be open, e.g. by a Chroma client, and are kept
+        total = sum(entry["size"] for entry in self._manifest.values())
+        by_last_used = sorted(
+            self._manifest, key=lambda k: self._manifest[k]["last_used"]
+        )
+        for key in by_last_used:
+            if total <= self.max_bytes:
+                break
+            if self._references[key]:
+                continue
+            total -= self._manifest.pop(key)["size"]
+            self._loaded.pop(key, None)
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            self.evictions += 1
+
+    def _unload(self):
+        unreferenced = [key for key in self._loaded if not self._references[key]]
+        # least recently used first
+        for key in unreferenced[: max(len(unreferenced) - self.max_loaded, 0)]:
+            del self._loaded[key]
+
+    def _read_manifest(self) -> dict[str, dict]:
+        try:
+            manifest = json.loads((self.root / MANIFEST).read_text())
+        except (OSError, ValueError):
+            return {}
+        return {
+            key: entry for key, entry in manifest.items() if self.path(key).exists()
+        }
+
+    def _write_manifest(self, debounce=False):
+        # the last use times of lookups are written at most once per interval
+        now = time.monotonic()
+        if debounce and now - self._manifest_written < MANIFEST_WRITE_INTERVAL:
+            return
+        temp = self.root / f".{MANIFEST}.{os.getpid()}"
+        temp.write_text(json.dumps(self._manifest))
+        temp.replace(self.root / MANIFEST)
+        self._manifest_written = now
+        self._manifest_dirty = False
+
+
+_store: IndexStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_index_store() -> IndexStore:
+    """
+    Returns the process wide IndexStore, in `$PANEL_CHAT_EXAMPLES_INDEX_DIR` if
+    set, otherwise in `~/.cache/panel_chat_examples/indexes`.
+    """
+    global _store  # pylint: disable=global-statement
+    with _store_lock:
+        if _store is None:
+            _store = IndexStore(os.getenv(INDEX_DIR_ENV_VAR) or DEFAULT_INDEX_DIR)
+            atexit.register(_store.flush)
+        return _store
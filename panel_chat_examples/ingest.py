@@ -0,0 +1,150 @@
+"""A parallel, streaming ingestion pipeline for PDFs"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+PAGES_PER_TASK = 8
+MAX_CONCURRENT_BATCHES = 4
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+# the parsed PDFs kept by each worker, e.g. of two PDFs ingested at once
+MAX_READERS = 2
+
+# a PdfReader is not thread safe, so each worker thread has its own
+_local = threading.local()
+
+
+def _reader(path: str):
+    # each worker parses the cross references of a PDF once, not per batch
+    from pypdf import PdfReader  # pylint: disable=import-outside-toplevel
+
+    readers = getattr(_local, "readers", None)
+    if readers is None:
+        readers = _local.readers = OrderedDict()
+    reader = readers.get(path)
+    if reader is None:
+        reader = readers[path] = PdfReader(path)
+        while len(readers) > MAX_READERS:
+            readers.popitem(last=False)
+    readers.move_to_end(path)
+    return reader
+
+
+def page_count(path: str) -> int:
+    """Returns the number of pages of the PDF file"""
+    return len(_reader(path).pages)
+
+
+def extract_pages(path: str, start: int, stop: int) -> list[tuple[int, str]]:
+    """Returns the number and text of the pages of the PDF file from start to stop"""
+    reader = _reader(path)
+    return [
+        (number, reader.pages[number].extract_text()) for number in range(start, stop)
+    ]
+
+
+def _write_temp(pdf: bytes) -> str:
+    handle, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(handle, "wb") as file:
+        file.write(pdf)
+    return path
+
+
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process wide pool that parses the PDFs. It uses the "spawn"
+    start method, as forking the threads of a running server is not safe.
+    """
+    global _process_pool  # pylint: disable=global-statement
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+async def ingest_pdf(
+    pdf: bytes | str | Path,
+    add_texts: Callable[[list[str], list[dict]], object],
+    split_text: Callable[[str], list[str]],
+    pages_per_task: int = PAGES_PER_TASK,
+    max_concurrent_batches: int = MAX_CONCURRENT_BATCHES,
+    executor: Executor | None = None,
+) -> AsyncIterator[tuple[int, int]]:
+    """
+    Parses, splits and adds the pages of a PDF to an index, streaming the
+    progress.
+
+    The pages are parsed in batches of `pages_per_task` pages in a process
+    pool. The workers open the PDF from a file, written once if the bytes
+    are given, and only receive its path and the range of pages of a batch,
+    so the PDF is not sent to and parsed by the workers for every batch.
+    Each batch is split and added,
+    i.e. embedded, as soon as it is parsed, with up to
+    `max_concurrent_batches` batches added concurrently, so the pages that
+    are indexed can be queried while the rest is ingested.
+
+    Arguments:
+        pdf: The bytes or the path of the PDF.
+        add_texts: Adds the chunks and their `{"page": ...}` metadata to the
+            index, e.g. `Chroma.add_texts`. It is called from several threads.
+        split_text: Splits the text of a page into chunks.
+        pages_per_task: The number of pages parsed per task.
+        max_concurrent_batches: The number of batches added concurrently.
+        executor: Parses the pages. Defaults to the process wide pool.
+
+    Yields:
+        The number of pages indexed and the total number of pages.
+    """
+    loop = asyncio.get_running_loop()
+    executor = executor or get_process_pool()
+    if isinstance(pdf, bytes):
+        path = await asyncio.to_thread(_write_temp, pdf)
+        temporary = True
+    else:
+        path, temporary = str(pdf), False
+    semaphore = asyncio.Semaphore(max_concurrent_batches)
+
+    async def index(start, stop):
+        pages = await loop.run_in_executor(executor, extract_pages, path, start, stop)
+        texts, metadatas = [], []
+        for number, text in pages:
+            for chunk in split_text(text):
+                texts.append(chunk)
+                metadatas.append({"page": number})
+        if texts:
+            async with semaphore:
+                await asyncio.to_thread(add_texts, texts, metadatas)
+        return len(pages)
+
+    tasks = []
+    try:
+        total = await loop.run_in_executor(executor, page_count, path)
+        tasks = [
+            asyncio.ensure_future(index(start, min(start + pages_per_task, total)))
+            for start in range(0, total, pages_per_task)
+        ]
+        indexed = 0
+        for task in asyncio.as_completed(tasks):
+            indexed += await task
+            yield indexed, total
+    finally:
+        for task in tasks:
+            task.cancel()
+        if temporary:
+            # a batch still parsing has read the file already
+            Path(path).unlink(missing_ok=True)
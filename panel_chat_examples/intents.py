@@ -0,0 +1,254 @@
+"""Answers simple analytical questions about a DataFrame locally, without an LLM"""
+
+from __future__ import annotations
+
+import numbers
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Sequence
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+AGGREGATIONS = {
+    "average": "mean",
+    "mean": "mean",
+    "median": "median",
+    "sum": "sum",
+    "total": "sum",
+    "maximum": "max",
+    "max": "max",
+    "highest": "max",
+    "largest": "max",
+    "minimum": "min",
+    "min": "min",
+    "lowest": "min",
+    "smallest": "min",
+    "standard deviation": "std",
+}
+MAX_LISTED = 50
+
+_ROWS = r"(?:rows|records|entries|observations|samples)"
+_DATASET = r" in the (?:data|dataframe|table|dataset)"
+_DATA = rf"(?:{_DATASET})?"
+_DISTINCT = r"(?:distinct |unique |different )?"
+_PER = r"(?:per|by|for each|in each|of each|for every|across|grouped by)"
+_COLUMN = r"[\w ]+?"
+_AGGREGATION = "|".join(sorted(AGGREGATIONS, key=len, reverse=True))
+_FILLER = re.compile(r"^(?:(?:please|can you|could you|tell me|give me)\s+)+")
+_WHITESPACE = re.compile(r"\s+")
+_UNIT = re.compile(r"_[a-z]{1,3}$")
+
+_INTENTS = [
+    ("rows", re.compile(rf"^how many {_ROWS}(?: are there| does it have)?{_DATA}$")),
+    (
+        "count_per",
+        re.compile(rf"^how many (?:\w+ )?(?:are there )?{_PER} (?P<group>{_COLUMN})$"),
+    ),
+    (
+        "missing",
+        re.compile(
+            r"^how many (?:missing|null|nan|empty) values(?: are there)?"
+            rf"(?:{_DATASET}| in (?:the )?(?P<column>{_COLUMN}))?$"
+        ),
+    ),
+    (
+        "nunique",
+        re.compile(
+            rf"^how many {_DISTINCT}(?P<column>{_COLUMN})(?: values)? "
+            rf"(?:are there|exist|do we have){_DATA}$"
+        ),
+    ),
+    (
+        "unique",
+        re.compile(
+            rf"^(?:what are|which are|list|show(?: me)?)(?: all)? (?:the )?{_DISTINCT}"
+            rf"(?P<column>{_COLUMN})(?: values)?(?: are there)?{_DATA}$"
+        ),
+    ),
+    (
+        "aggregate",
+        re.compile(
+            r"^(?:(?:what is|what's|what are|compute|calculate|find|show(?: me)?) )?"
+            rf"(?:the )?(?P<aggregation>{_AGGREGATION}) (?:of )?(?:the )?"
+            rf"(?P<column>{_COLUMN})(?: {_PER} (?P<group>{_COLUMN}))?{_DATA}$"
+        ),
+    ),
+]
+
+
+def normalize(question: str) -> str:
+    """Returns the question lower cased, without polite fillers and punctuation"""
+    question = _WHITESPACE.sub(" ", question.lower()).strip().rstrip("?!.").strip()
+    return _FILLER.sub("", question)
+
+
+def resolve_column(phrase: str, columns: Sequence[str]) -> str | None:
+    """
+    Returns the column a phrase refers to, ignoring case, underscores, unit
+    suffixes and plurals, e.g. "bill lengths" refers to "bill_length_mm".
+    """
+    phrase = phrase.strip().removeprefix("the ")
+    candidates = {phrase, phrase[:-1], phrase[:-2]} if len(phrase) > 3 else {phrase}
+    for column in columns:
+        name = str(column).lower()
+        names = {name, name.replace("_", " "), _UNIT.sub("", name).replace("_", " ")}
+        if names & candidates:
+            return column
+    return None
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, numbers.Integral):
+        return f"{value:,}"
+    if isinstance(value, numbers.Real):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def _singular(noun: str) -> str:
+    if noun.endswith(("species", "ss")) or not noun.endswith("s"):
+        return noun
+    if noun.endswith("ies"):
+        return noun[:-3] + "y"
+    return noun[:-1]
+
+
+def _there_are(count: int, noun: str) -> str:
+    """Returns e.g. 'There are 3 rows' or 'There is 1 row'"""
+    if count == 1:
+        return f"There is 1 {_singular(noun)}"
+    return f"There are {count:,} {noun}"
+
+
+def _format_series(series: pd.Series) -> str:
+    return "\n".join(
+        f"- {label}: {_format(value)}"
+        for label, value in series.head(MAX_LISTED).items()
+    )
+
+
+@dataclass
+class LocalAnswer:
+    """An answer computed locally by an IntentMatcher"""
+
+    text: str
+    """The answer in Markdown"""
+    code: str
+    """The pandas expression that computed the answer"""
+    seconds: float
+    """The seconds it took to match and compute the answer"""
+
+
+class IntentMatcher:
+    """
+    Recognizes simple analytical questions about a DataFrame, like "how many
+    species are there?" or "average bill length per species", and answers
+    them with a single vectorized pandas expression in milliseconds instead
+    of a round trip to an LLM agent.
+
+    `answer` returns None for any other question, or one that refers to a
+    column the DataFrame does not have, so it can be passed on to the agent.
+
+    Example:
+        >>> answer = matcher.answer("How many species are there?", df)
+        >>> answer.text if answer else await agent.arun(question)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.answered = 0
+        self.passed = 0
+
+    def answer(self, question: str, data: pd.DataFrame) -> LocalAnswer | None:
+        """Returns the local answer to the question, or None to pass it on"""
+        start = time.perf_counter()
+        try:
+            result = self._answer(normalize(question), data)
+        except (TypeError, ValueError, KeyError):
+            # e.g. an aggregation of a column that is not numeric
+            result = None
+        with self._lock:
+            if result is None:
+                self.passed += 1
+                return None
+            self.answered += 1
+        return LocalAnswer(*result, time.perf_counter() - start)
+
+    def stats(self) -> dict[str, float]:
+        """Returns the number of questions answered locally and passed on"""
+        total = self.answered + self.passed
+        return {
+            "answered": self.answered,
+            "passed": self.passed,
+            "answered_rate": self.answered / total if total else 0.0,
+        }
+
+    def _answer(self, question, data):
+        for kind, pattern in _INTENTS:
+            match = pattern.match(question)
+            if match is None:
+                continue
+            parts = match.groupdict()
+            columns = {}
+            for part in ("column", "group"):
+                if parts.get(part):
+                    columns[part] = resolve_column(parts[part], data.columns)
+                    if columns[part] is None:
+                        break
+            else:
+                return getattr(self, f"_{kind}")(data, parts, **columns)
+        return None
+
+    def _rows(self, data, parts):
+        return f"{_there_are(len(data), 'rows')}.", "len(df)"
+
+    def _count_per(self, data, parts, group):
+        counts = data[group].value_counts()
+        text = f"The number of rows per {parts['group']} is as follows:\n\n"
+        return text + _format_series(counts), f"df[{group!r}].value_counts()"
+
+    def _missing(self, data, parts, column=None):
+        if column is None:
+            missing = data.isna().sum()
+            if not missing.any():
+                return "There are no missing values.", "df.isna().sum()"
+            text = f"{_there_are(int(missing.sum()), 'missing values')}:\n\n"
+            return text + _format_series(missing[missing > 0]), "df.isna().sum()"
+        count = int(data[column].isna().sum())
+        return (
+            f"{_there_are(count, 'missing values')} in {parts['column']}.",
+            f"df[{column!r}].isna().sum()",
+        )
+
+    def _nunique(self, data, parts, column):
+        count = data[column].nunique()
+        return (
+            f"{_there_are(count, parts['column'])}.",
+            f"df[{column!r}].nunique()",
+        )
+
+    def _unique(self, data, parts, column):
+        values = data[column].dropna().unique()
+        listed = ", ".join(str(value) for value in values[:MAX_LISTED])
+        if len(values) > MAX_LISTED:
+            listed += f" and {len(values) - MAX_LISTED:,} more"
+        return (
+            f"The {parts['column']} in the dataframe are: {listed}.",
+            f"df[{column!r}].unique()",
+        )
+
+    def _aggregate(self, data, parts, column, group=None):
+        function = AGGREGATIONS[parts["aggregation"]]
+        label = f"{parts['aggregation']} {parts['column']}"
+        if group is None:
+            value = data[column].agg(function)
+            return f"The {label} is {_format(value)}.", f"df[{column!r}].{function}()"
+        values = data.groupby(group, observed=True, sort=True)[column].agg(function)
+        return (
+            f"The {label} per {parts['group']} is as follows:\n\n"
+            + _format_series(values),
+            f"df.groupby({group!r})[{column!r}].{function}()",
+        )
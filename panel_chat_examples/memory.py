@@ -0,0 +1,81 @@
+"""A token counted chat memory that is updated incrementally"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Callable, Sequence
+
+
+class TokenBufferMemory:
+    """
+    Keeps the most recent messages of a chat history that fit into
+    `max_token_limit` tokens.
+
+    Unlike clearing and refilling a LangChain `ConversationTokenBufferMemory`
+    every turn, the number of tokens of each message is counted once, when the
+    message is added, and a running total is kept. Messages are only evicted
+    from the front when the total exceeds `max_token_limit`.
+
+    Arguments:
+        count_tokens: Returns the number of tokens of a single message, e.g.
+            `lambda message: llm.get_num_tokens_from_messages([message])`.
+        max_token_limit: The maximum number of tokens to keep.
+
+    Example:
+        >>> memory = TokenBufferMemory(count_tokens, max_token_limit=4096)
+        >>> messages = memory.update(history.serialize())
+    """
+
+    def __init__(self, count_tokens: Callable[[Any], int], max_token_limit: int):
+        self.max_token_limit = max_token_limit
+        self.total_tokens = 0
+        self._count_tokens = count_tokens
+        self._buffer: deque[tuple[Any, int]] = deque()
+        self._n_synced = 0
+        self._last_synced: Any = None
+
+    @property
+    def messages(self) -> list[Any]:
+        """The messages currently kept in memory"""
+        return [message for message, _ in self._buffer]
+
+    def add(self, message: Any) -> None:
+        """Adds a message and evicts the oldest ones if over the token limit"""
+        n_tokens = self._count_tokens(message)
+        self._buffer.append((message, n_tokens))
+        self.total_tokens += n_tokens
+        while self._buffer and self.total_tokens > self.max_token_limit:
+            _, evicted_tokens = self._buffer.popleft()
+            self.total_tokens -= evicted_tokens
+
+    def update(self, history: Sequence[Any]) -> list[Any]:
+        """
+        Adds the messages of the history that were not seen before.
+
+        The history is expected to grow by appending, like the list returned by
+        `SerializedHistory.serialize`. If it does not continue the previously
+        seen history, e.g. after an undo or clear, the memory is rebuilt.
+
+        Returns:
+            The messages currently kept in memory.
+        """
+        n_synced = self._n_synced
+        if n_synced and (
+            len(history) < n_synced or history[n_synced - 1] is not self._last_synced
+        ):
+            self.clear()
+            n_synced = 0
+
+        for message in history[n_synced:]:
+            self.add(message)
+
+        self._n_synced = len(history)
+        self._last_synced = history[-1] if history else None
+        return self.messages
+
+    def clear(self) -> None:
+        """Removes all messages"""
+        self._buffer.clear()
+        self.total_tokens = 0
+        self._n_synced = 0
+        self._last_synced = None
@@ -0,0 +1,336 @@
+"""
+An offline stand-in for the OpenAI API to exercise and benchmark the examples.
+
+It speaks the chat completions protocol, streaming and non streaming, including
+tool calls, and answers image generation and embedding requests. The time to
+first token, tokens per second and chunk size are configurable.
+
+Run it with
+
+```bash
+python -m panel_chat_examples.mock_server --port 8000 --ttft 0.2 --tokens-per-second 50
+```
+
+and point the examples to it with
+
+```bash
+export OPENAI_BASE_URL=http://localhost:8000/v1
+export OPENAI_API_KEY=mock
+```
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.web import Application, RequestHandler
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua"
+).split()
+
+# A 1x1 transparent PNG
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8"
+    "AAAAASUVORK5CYII="
+)
+
+
+@dataclass
+class MockConfig:
+    """The behavior of the mock server"""
+
+    ttft: float = 0.2
+    """Seconds before the first token is sent"""
+    tokens_per_second: float = 50.0
+    """The rate at which tokens are sent"""
+    chunk_size: int = 1
+    """The number of tokens per streamed chunk"""
+    reply_tokens: int = 200
+    """The number of tokens of a reply, unless `max_tokens` is smaller"""
+    embedding_dim: int = 256
+    """The dimension of the embeddings"""
+    tool_arguments: dict = field(default_factory=dict)
+    """The arguments to call each tool with, by tool name. Defaults to {}"""
+
+
+class MockStats:
+    """Counts the requests and tokens served"""
+
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0
+
+    def to_dict(self):
+        return {"requests": self.requests, "tokens": self.tokens}
+
+
+def reply_tokens(n_tokens: int) -> list[str]:
+    """Returns the tokens of a reply"""
+    return [WORDS[index % len(WORDS)] + " " for index in range(n_tokens)]
+
+
+def embed(text: str | list[int], dim: int) -> list[float]:
+    """
+    Returns a deterministic, normalized bag of words embedding, so texts
+    sharing words are similar like with a real embedding model.
+    """
+    if isinstance(text, str):
+        words = re.findall(r"\w+", text.lower())
+    else:
+        words = [str(token) for token in text]
+    vector = [0.0] * dim
+    for word in words:
+        digest = hashlib.md5(word.encode("utf8")).digest()  # noqa: S324
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] % 2 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class _BaseHandler(RequestHandler):
+    def initialize(self, config: MockConfig, stats: MockStats):
+        self.config = config
+        self.stats = stats
+
+    def prepare(self):
+        self.stats.requests += 1
+
+    def _json_body(self) -> dict:
+        return json.loads(self.request.body or b"{}")
+
+
+class ChatCompletionsHandler(_BaseHandler):
+    """Handles POST /v1/chat/completions"""
+
+    async def post(self):
+        body = self._json_body()
+        config = self.config
+        n_tokens = min(config.reply_tokens, body.get("max_tokens") or math.inf)
+        tools = body.get("tools") or []
+        if body.get("tool_choice") == "none":
+            tools = []
+        tool_calls = [self._tool_call(index, tool) for index, tool in enumerate(tools)]
+        tokens = [] if tool_calls else reply_tokens(int(n_tokens))
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "mock")
+        await asyncio.sleep(config.ttft)
+        if body.get("stream"):
+            await self._stream(completion_id, model, tokens, tool_calls)
+        else:
+            await asyncio.sleep(len(tokens) / config.tokens_per_second)
+            self.stats.tokens += len(tokens)
+            self.write(self._completion(completion_id, model, tokens, tool_calls))
+
+    def _tool_call(self, index: int, tool: dict) -> dict:
+        name = tool["function"]["name"]
+        arguments = self.config.tool_arguments.get(name, {})
+        return {
+            "index": index,
+            "id": f"call_{index}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)},
+        }
+
+    def _completion(self, completion_id, model, tokens, tool_calls) -> dict:
+        message = {"role": "assistant", "content": "".join(tokens) or None}
+        if tool_calls:
+            message["tool_calls"] = [
+                {key: value for key, value in call.items() if key != "index"}
+                for call in tool_calls
+            ]
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": len(tokens),
+                "total_tokens": len(tokens),
+            },
+        }
+
+    async def _stream(self, completion_id, model, tokens, tool_calls):
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+            }
+
+        await self._send_event(chunk({"role": "assistant", "content": ""}))
+        size = max(self.config.chunk_size, 1)
+        delay = size / self.config.tokens_per_second
+        for start in range(0, len(tokens), size):
+            part = "".join(tokens[start : start + size])
+            await self._send_event(chunk({"content": part}))
+            self.stats.tokens += len(tokens[start : start + size])
+            await asyncio.sleep(delay)
+
+        for call in tool_calls:
+            arguments = call["function"]["arguments"]
+            name = call["function"]["name"]
+            header = dict(call, function={"name": name, "arguments": ""})
+            await self._send_event(chunk({"tool_calls": [header]}))
+            for start in range(0, len(arguments), size * 4):
+                piece = arguments[start : start + size * 4]
+                delta = {"index": call["index"], "function": {"arguments": piece}}
+                await self._send_event(chunk({"tool_calls": [delta]}))
+                await asyncio.sleep(delay)
+
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        await self._send_event(chunk({}, finish_reason))
+        self.write("data: [DONE]\n\n")
+        await self.flush()
+
+    async def _send_event(self, data: dict):
+        self.write(f"data: {json.dumps(data)}\n\n")
+        await self.flush()
+
+
+class ImagesHandler(_BaseHandler):
+    """Handles POST /v1/images/generations"""
+
+    async def post(self):
+        body = self._json_body()
+        await asyncio.sleep(self.config.ttft)
+        if body.get("response_format") == "b64_json":
+            item = {"b64_json": base64.b64encode(PNG).decode("ascii")}
+        else:
+            item = {"url": f"{self.request.protocol}://{self.request.host}/mock.png"}
+        item["revised_prompt"] = body.get("prompt", "")
+        self.write({"created": int(time.time()), "data": [item] * body.get("n", 1)})
+
+
+class EmbeddingsHandler(_BaseHandler):
+    """Handles POST /v1/embeddings"""
+
+    async def post(self):
+        body = self._json_body()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = [
+            {
+                "object": "embedding",
+                "index": index,
+                "embedding": embed(text, self.config.embedding_dim),
+            }
+            for index, text in enumerate(inputs)
+        ]
+        self.write(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "mock"),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+
+class ModelsHandler(_BaseHandler):
+    """Handles GET /v1/models"""
+
+    def get(self):
+        model = {"id": "mock", "object": "model", "created": 0, "owned_by": "mock"}
+        self.write({"object": "list", "data": [model]})
+
+
+class ImageHandler(_BaseHandler):
+    """Serves the generated image"""
+
+    def get(self):
+        self.set_header("Content-Type", "image/png")
+        self.write(PNG)
+
+
+class StatsHandler(_BaseHandler):
+    """Handles GET /stats"""
+
+    def prepare(self):
+        pass
+
+    def get(self):
+        self.write(self.stats.to_dict())
+
+
+def create_app(config: MockConfig | None = None) -> Application:
+    """Returns the tornado Application of the mock server"""
+    kwargs = {"config": config or MockConfig(), "stats": MockStats()}
+    return Application(
+        [
+            (r"/v1/chat/completions", ChatCompletionsHandler, kwargs),
+            (r"/v1/images/generations", ImagesHandler, kwargs),
+            (r"/v1/embeddings", EmbeddingsHandler, kwargs),
+            (r"/v1/models", ModelsHandler, kwargs),
+            (r"/mock.png", ImageHandler, kwargs),
+            (r"/stats", StatsHandler, kwargs),
+        ]
+    )
+
+
+def serve(port: int = 8000, config: MockConfig | None = None) -> HTTPServer:
+    """Starts the mock server on the current IOLoop"""
+    server = HTTPServer(create_app(config))
+    server.listen(port)
+    return server
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Serves a mock OpenAI API")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ttft", type=float, default=MockConfig.ttft)
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=MockConfig.tokens_per_second
+    )
+    parser.add_argument("--chunk-size", type=int, default=MockConfig.chunk_size)
+    parser.add_argument("--reply-tokens", type=int, default=MockConfig.reply_tokens)
+    parser.add_argument(
+        "--tool-arguments",
+        type=json.loads,
+        default={},
+        help="A JSON object with the arguments of each tool by tool name",
+    )
+    args = parser.parse_args(args)
+    config = MockConfig(
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        chunk_size=args.chunk_size,
+        reply_tokens=args.reply_tokens,
+        tool_arguments=args.tool_arguments,
+    )
+    serve(args.port, config)
+    print(f"Serving the mock OpenAI API on http://localhost:{args.port}/v1")
+    IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""A process wide manager of local models that are loaded once and shared"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when the model of a SharedModel is used before it is loaded"""
+
+    def __init__(self, status: str):
+        super().__init__(f"The model is {status}; acquire it first.")
+
+
+class SharedModel:
+    """
+    Loads a model once per process, in a background thread, and shares it
+    between all the sessions that acquire it.
+
+    Sessions `acquire` the model when they start and `release` it when they
+    are destroyed. The first `acquire`, or an explicit `preload` when the
+    server starts, triggers the load; all other sessions wait on the same
+    load, so they can show its `status` and become interactive as soon as it
+    is ready. If `keep_loaded` is False the model is unloaded when the last
+    session releases it.
+
+    Arguments:
+        load: Loads and returns the model, e.g. a `llama_cpp.Llama`.
+        unload: Frees the model. Defaults to dropping the reference.
+        keep_loaded: Whether to keep the model loaded without any users.
+
+    Example:
+        >>> llama = get_shared_model("llama", load_llama)
+        >>> model = await llama.acquire()
+        >>> pn.state.on_session_destroyed(llama.release)
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Any],
+        unload: Callable[[Any], None] | None = None,
+        keep_loaded: bool = True,
+    ):
+        self._load = load
+        self._unload = unload
+        self.keep_loaded = keep_loaded
+        self._lock = threading.Lock()
+        self._future: Future | None = None
+        self.users = 0
+        self.loads = 0
+        self.load_time = 0.0
+
+    @property
+    def status(self) -> str:
+        """One of "unloaded", "loading", "ready" or "failed" """
+        future = self._future
+        if future is None:
+            return UNLOADED
+        if not future.done():
+            return LOADING
+        if future.exception() is not None:
+            return FAILED
+        return READY
+
+    @property
+    def model(self) -> Any:
+        """The loaded model. Raises a ModelNotReadyError if it is not ready"""
+        if self.status != READY:
+            raise ModelNotReadyError(self.status)
+        return self._future.result()
+
+    def preload(self) -> Future:
+        """
+        Starts loading the model in a background thread if it is not loaded or
+        loading, e.g. when the server starts.
+
+        Returns:
+            The future of the model. A failed load is retried.
+        """
+        with self._lock:
+            if self._future is None or self.status == FAILED:
+                self._future = Future()
+                thread = threading.Thread(
+                    target=self._run_load, args=(self._future,), daemon=True
+                )
+                thread.start()
+            return self._future
+
+    async def acquire(self) -> Any:
+        """
+        Registers a user of the model and waits until it is loaded. The user
+        must `release` the model, even if the load failed.
+
+        Returns:
+            The model.
+        """
+        with self._lock:
+            self.users += 1
+        return await asyncio.wrap_future(self.preload())
+
+    def release(self, *_) -> None:
+        """Unregisters a user of the model, e.g. when its session is destroyed"""
+        with self._lock:
+            self.users = max(self.users - 1, 0)
+            if self.users or self.keep_loaded or self.status != READY:
+                return
+            future, self._future = self._future, None
+        if self._unload is not None:
+            self._unload(future.result())
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the status, users, number of loads and seconds of the last load"""
+        return {
+            "status": self.status,
+            "users": self.users,
+            "loads": self.loads,
+            "load_time": self.load_time,
+        }
+
+    def _run_load(self, future: Future):
+        start = time.perf_counter()
+        try:
+            model = self._load()
+        except BaseException as exc:  # pylint: disable=broad-except
+            future.set_exception(exc)
+            return
+        self.loads += 1
+        self.load_time = time.perf_counter() - start
+        future.set_result(model)
+
+
+_models: dict[str, SharedModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_shared_model(name: str, load: Callable[[], Any], **kwargs) -> SharedModel:
+    """
+    Returns the process wide SharedModel of the name, creating it with `load`
+    and `kwargs` the first time.
+
+    The app script is executed for every session, but the first `load`
+    function registered for a name is used for the lifetime of the process.
+    """
+    with _models_lock:
+        shared_model = _models.get(name)
+        if shared_model is None:
+            shared_model = _models[name] = SharedModel(load, **kwargs)
+        return shared_model
@@ -0,0 +1,103 @@
+"""A bounded cache of built plots, keyed by their canonicalized arguments"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, TypeVar
+
+MAX_ENTRIES = 32
+
+T = TypeVar("T")
+
+
+def canonical_key(*parts: Any) -> str:
+    """
+    Returns the same key for equal arguments, e.g. dicts of keyword arguments
+    in any order and with tuples or lists.
+    """
+    return json.dumps(parts, sort_keys=True, separators=(",", ":"), default=repr)
+
+
+class PlotCache:
+    """
+    Keeps the plots built from a dataset, e.g. the HoloViews objects returned
+    by `.hvplot`, so a plot requested again, e.g. by repeating or undoing a
+    request, is not built again.
+
+    Use one cache per session: a plot can hold state of the figure showing it,
+    e.g. a rasterized plot is a DynamicMap with a stream of the ranges of its
+    axes, and is aggregated again whenever these change.
+
+    The cache is keyed by the name of the dataset and the canonicalized
+    arguments that build the plot. Options that only affect how a plot is
+    rendered should be applied to the pane showing it instead. A plot that is
+    requested while it is being built, e.g. from another thread, waits for
+    that build instead of building it again.
+
+    Arguments:
+        max_entries: The number of plots kept, least recently used first out.
+
+    Example:
+        >>> plot = cache.get("gapminder", kwargs, lambda: data.hvplot(**kwargs))
+        >>> pane.param.update(object=plot, **renderer_kwargs)
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._plots: OrderedDict[str, Any] = OrderedDict()
+        self._building: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, dataset: str, kwargs: dict, build: Callable[[], T]) -> T:
+        """Returns the plot of the dataset and arguments, building it if needed"""
+        key = canonical_key(dataset, kwargs)
+        with self._lock:
+            if key in self._plots:
+                self._plots.move_to_end(key)
+                self.hits += 1
+                return self._plots[key]
+            building = key not in self._building
+            if building:
+                self._building[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+            future = self._building[key]
+        if not building:
+            # built by another call, e.g. in another thread
+            return future.result()
+        try:
+            plot = build()
+        except BaseException as exc:
+            with self._lock:
+                del self._building[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._plots[key] = plot
+            while len(self._plots) > self.max_entries:
+                self._plots.popitem(last=False)
+            del self._building[key]
+        future.set_result(plot)
+        return plot
+
+    def stats(self) -> dict[str, float]:
+        """Returns the hits, misses, hit rate and number of cached plots"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._plots),
+            }
+
+    def clear(self) -> None:
+        """Removes all plots, e.g. when a dataset changes"""
+        with self._lock:
+            self._plots.clear()
@@ -0,0 +1,167 @@
+"""Speculative retrieval while the user is typing"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import re
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Any, Awaitable, Callable, Hashable
+
+DEBOUNCE = 0.3
+MIN_LENGTH = 8
+MAX_ENTRIES = 32
+SIMILARITY = 0.97
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def normalize(text: str) -> str:
+    """Returns the text lower cased, with single spaces and no trailing punctuation"""
+    return _WHITESPACE.sub(" ", text.lower()).strip().rstrip("?!.").strip()
+
+
+class RetrievalPrefetcher:
+    """
+    Runs the retrieval of a question in the background while it is typed,
+    so the retrieval latency is hidden behind the typing time.
+
+    Call `update` with the partial text of the input, e.g. from a watcher of
+    the `value_input` of a `ChatAreaInput`. Once the text has not changed for
+    `debounce` seconds the retrieval of the text is started, cancelling the
+    one of the previous text if it is still running. The results are cached
+    by the normalized text and a `context`, e.g. the retrieval settings.
+
+    On submit, `get` reuses the prefetch of the same text, or of a text that
+    is at least `similarity` similar and has the same numbers, e.g. when the
+    last letter was typed after the prefetch started, cancels the prefetches still running and otherwise
+    retrieves the text directly.
+
+    Arguments:
+        retrieve: Retrieves the results of a text; may be async.
+        debounce: The seconds the text must not change to prefetch it.
+        min_length: The minimum length of a text to prefetch.
+        max_entries: The number of results kept.
+        similarity: The minimum similarity ratio of a text to reuse a prefetch
+            of. Texts with different numbers, e.g. years, are never reused.
+
+    Example:
+        >>> prefetcher = RetrievalPrefetcher(retriever.ainvoke)
+        >>> chat_input.param.watch(lambda e: prefetcher.update(e.new), "value_input")
+        >>> docs = await prefetcher.get(contents)
+    """
+
+    def __init__(
+        self,
+        retrieve: Callable[[str], Any | Awaitable[Any]],
+        debounce: float = DEBOUNCE,
+        min_length: int = MIN_LENGTH,
+        max_entries: int = MAX_ENTRIES,
+        similarity: float = SIMILARITY,
+    ):
+        self.retrieve = retrieve
+        self.debounce = debounce
+        self.min_length = min_length
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._entries: OrderedDict[tuple, asyncio.Task] = OrderedDict()
+        self._debounce_task: asyncio.Task | None = None
+        self._running: tuple | None = None
+        self.prefetches = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.cancelled = 0
+
+    def update(self, text: str, context: Hashable = None) -> None:
+        """Schedules the prefetch of the partial text once typing pauses"""
+        if self._debounce_task is not None:
+            self._debounce_task.cancel()
+        text = normalize(text or "")
+        if len(text) < self.min_length:
+            return
+        self._debounce_task = asyncio.get_running_loop().create_task(
+            self._prefetch(text, context)
+        )
+
+    async def get(self, text: str, context: Hashable = None) -> Any:
+        """Returns the results of the text, reusing a matching prefetch"""
+        if self._debounce_task is not None:
+            self._debounce_task.cancel()
+        text = normalize(text)
+        key = (context, text)
+        task = self._entries.get(key)
+        if task is not None:
+            self.hits += 1
+        else:
+            key = self._nearest(text, context)
+            if key is not None:
+                task = self._entries[key]
+                self.near_hits += 1
+        for other_key, other in list(self._entries.items()):
+            if other_key != key and not other.done():
+                other.cancel()
+                del self._entries[other_key]
+                self.cancelled += 1
+        if task is not None and not task.cancelled():
+            self._entries.move_to_end(key)
+            return await asyncio.shield(task)
+        self.misses += 1
+        return await self._call(text)
+
+    def clear(self) -> None:
+        """Cancels the prefetches and removes the results, e.g. when the index changes"""
+        if self._debounce_task is not None:
+            self._debounce_task.cancel()
+        for task in self._entries.values():
+            task.cancel()
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of prefetches, hits, near hits, misses and cancellations"""
+        return {
+            "prefetches": self.prefetches,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "cancelled": self.cancelled,
+        }
+
+    async def _prefetch(self, text, context):
+        await asyncio.sleep(self.debounce)
+        key = (context, text)
+        if key in self._entries:
+            return
+        running = self._entries.get(self._running)
+        if running is not None and not running.done():
+            # the text changed, so the previous prefetch is stale
+            running.cancel()
+            del self._entries[self._running]
+            self.cancelled += 1
+        self.prefetches += 1
+        self._running = key
+        self._entries[key] = asyncio.get_running_loop().create_task(self._call(text))
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            evicted.cancel()
+
+    async def _call(self, text):
+        result = self.retrieve(text)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _nearest(self, text, context):
+        best, best_ratio = None, self.similarity
+        numbers = _NUMBER.findall(text)
+        for key, task in self._entries.items():
+            if key[0] != context or task.cancelled():
+                continue
+            if _NUMBER.findall(key[1]) != numbers:
+                continue
+            ratio = SequenceMatcher(None, text, key[1]).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = key, ratio
+        return best
@@ -0,0 +1,117 @@
+"""A memory bounded cache of the evaluated prompt state of each session"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+MAX_BYTES = 2 * 1024**3
+
+
+def _state_size(state: Any) -> int:
+    size = getattr(state, "llama_state_size", None)
+    if size is None:
+        size = len(getattr(state, "llama_state", b""))
+    return int(size)
+
+
+class PromptStateCache:
+    """
+    Keeps the evaluated prompt state, i.e. the KV cache and input tokens, of
+    each session of a shared local model like a `llama_cpp.Llama`.
+
+    llama.cpp only evaluates the tokens after the longest common prefix of the
+    new prompt and the tokens already in its context. When the sessions of a
+    shared model take turns, each turn finds the context of another session
+    and the whole history is evaluated again. Restoring the session's state
+    before a turn and saving it afterwards means only the new messages are
+    evaluated. The states of the least recently used sessions are evicted
+    once they take more than `max_bytes`.
+
+    `restore` and `save` must be called by the thread that runs the model,
+    around the turn, e.g. in the request of an InferenceScheduler.
+
+    Arguments:
+        max_bytes: The maximum total size of the saved states.
+
+    Example:
+        >>> def generate():
+        ...     prompt_states.restore(session, llama)
+        ...     try:
+        ...         yield from llama.create_chat_completion(messages, stream=True)
+        ...     finally:
+        ...         prompt_states.save(session, llama)
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._states: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._loaded: dict[int, Hashable] = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def restore(self, session: Hashable, model: Any) -> bool:
+        """
+        Loads the saved state of the session into the model, unless the
+        model's context already is the session's.
+
+        Returns:
+            Whether the model has the state of the session.
+        """
+        with self._lock:
+            if self._loaded.get(id(model)) == session:
+                self.hits += 1
+                return True
+            entry = self._states.get(session)
+            if entry is None:
+                self.misses += 1
+                return False
+            self._states.move_to_end(session)
+            self.hits += 1
+        model.load_state(entry[0])
+        with self._lock:
+            self._loaded[id(model)] = session
+        return True
+
+    def save(self, session: Hashable, model: Any) -> None:
+        """Saves the state of the model as the state of the session"""
+        state = model.save_state()
+        size = _state_size(state)
+        with self._lock:
+            self._remove(session)
+            self._loaded[id(model)] = session
+            if size > self.max_bytes:
+                return
+            self._states[session] = (state, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                evicted, _ = next(iter(self._states.items()))
+                self._remove(evicted)
+                self.evictions += 1
+
+    def discard(self, session: Hashable, *_) -> None:
+        """Removes the state of the session, e.g. when it is destroyed"""
+        with self._lock:
+            self._remove(session)
+            for model_id, loaded in list(self._loaded.items()):
+                if loaded == session:
+                    del self._loaded[model_id]
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number and bytes of the states, hits, misses and evictions"""
+        return {
+            "sessions": len(self._states),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, session):
+        entry = self._states.pop(session, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
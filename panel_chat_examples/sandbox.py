@@ -0,0 +1,272 @@
+"""Runs generated pandas code in worker processes, on tables shared by memory mapping"""
+
+from __future__ import annotations
+
+import ast
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+MAX_WORKERS = min(2, os.cpu_count() or 1)
+TIMEOUT = 10.0
+MEMORY_LIMIT = 2 * 1024**3
+MAX_OUTPUT = 10_000
+# The number of call times the statistics are computed over
+CALL_TIMES = 1000
+
+_FENCE = re.compile(r"^\s*`*\s*(python\s)?|\s*`*\s*$")
+
+
+class SandboxError(RuntimeError):
+    """Raised when a worker of a PandasSandbox exits while running code"""
+
+    def __init__(
+        self,
+        message: str = "The sandbox stopped, e.g. as the code exceeded its memory limit",
+    ):
+        super().__init__(message)
+
+
+class SandboxTimeoutError(SandboxError):
+    """Raised when code runs longer than the timeout of a PandasSandbox"""
+
+    def __init__(self, timeout: float):
+        super().__init__(f"The code ran longer than {timeout:g}s")
+
+
+@dataclass
+class SandboxResult:
+    """The output of code run in a PandasSandbox"""
+
+    output: str
+    """The value of the last expression or the printed output"""
+    seconds: float
+    """The seconds the code ran in the worker"""
+
+
+def share_table(table: pa.Table, directory: str | Path | None = None) -> Path:
+    """
+    Writes a table to an uncompressed Arrow IPC file, which the workers of a
+    PandasSandbox memory map, so they share the pages of the file instead of
+    receiving a pickled copy per call. Remove the file when done with it.
+    """
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    handle, path = tempfile.mkstemp(suffix=".arrow", dir=directory)
+    os.close(handle)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Path(path)
+
+
+def _load(path):
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    # the DataFrame is backed by the mapped pages, without copying them
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _execute(code, data):
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    namespace = {"df": data, "pd": pd}
+    stdout = io.StringIO()
+    try:
+        tree = ast.parse(_FENCE.sub("", code))
+        last = None
+        if tree.body and isinstance(tree.body[-1], ast.Expr):
+            last = tree.body.pop().value
+        with contextlib.redirect_stdout(stdout):
+            exec(compile(tree, "<sandbox>", "exec"), namespace)  # noqa: S102
+            if last is not None:
+                value = eval(
+                    compile(ast.Expression(last), "<sandbox>", "eval"), namespace
+                )
+                if value is not None:
+                    return str(value)
+        return stdout.getvalue()
+    except MemoryError:
+        return "MemoryError: the code exceeded the memory limit of the sandbox"
+    except Exception as error:  # pylint: disable=broad-except
+        return f"{type(error).__name__}: {error}"
+
+
+def _serve(connection, memory_limit):
+    if memory_limit:
+        with contextlib.suppress(ImportError, ValueError, OSError):
+            import resource  # pylint: disable=import-outside-toplevel
+
+            # limits the heap but not the memory mapped, read only tables
+            resource.setrlimit(resource.RLIMIT_DATA, (memory_limit, memory_limit))
+    path, data = None, None
+    while True:
+        try:
+            code, table_path = connection.recv()
+        except EOFError:
+            return
+        start = time.perf_counter()
+        if table_path != path:
+            data = None
+            data, path = _load(table_path), table_path
+        output = _execute(code, data)
+        connection.send((output[:MAX_OUTPUT], time.perf_counter() - start))
+
+
+class _Worker:
+    def __init__(self, context, memory_limit):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(child, memory_limit), daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def run(self, code, table_path, timeout):
+        self.connection.send((code, table_path))
+        if not self.connection.poll(timeout):
+            raise SandboxTimeoutError(timeout)
+        return self.connection.recv()
+
+    def stop(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class PandasSandbox:
+    """
+    Runs generated Python code on a DataFrame in a pool of worker processes,
+    like the `python_repl_ast` tool of a LangChain pandas agent does in the
+    server process, so slow or runaway code does not block the server.
+
+    The table is shared with `share_table` and memory mapped by each worker
+    on its first call, and kept mapped until another table is used. The code
+    sees it as `df`, a DataFrame backed by the Arrow buffers, and `pd`. As
+    in the tool, the value of the last expression is returned, otherwise the
+    printed output, and exceptions are returned as text. Unlike the tool,
+    variables do not persist between calls.
+
+    A worker that runs longer than `timeout` is killed and replaced, raising a
+    SandboxTimeoutError. The heap of a worker is limited to `memory_limit`
+    bytes where the platform supports it.
+
+    Arguments:
+        max_workers: The number of worker processes.
+        timeout: The maximum seconds per call.
+        memory_limit: The maximum bytes of the heap per worker, or None.
+
+    Example:
+        >>> path = share_table(frame.table)
+        >>> result = await sandbox.arun("df.species.nunique()", path)
+        >>> result.output, result.seconds
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        timeout: float = TIMEOUT,
+        memory_limit: int | None = MEMORY_LIMIT,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        # the "spawn" start method, as forking the threads of a server is not safe
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.Semaphore(max_workers)
+        self._idle: list[_Worker] = []
+        self._lock = threading.Lock()
+        self._workers = 0
+        self._call_times: deque[float] = deque(maxlen=CALL_TIMES)
+        self.calls = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def run(self, code: str, table_path: str | Path) -> SandboxResult:
+        """Runs the code on the table in a worker, waiting for a free one"""
+        with self._slots:
+            worker = self._acquire()
+            try:
+                output, seconds = worker.run(code, str(table_path), self.timeout)
+            except SandboxTimeoutError:
+                self._discard(worker)
+                with self._lock:
+                    self.timeouts += 1
+                raise
+            except (EOFError, OSError) as error:
+                self._discard(worker)
+                with self._lock:
+                    self.failures += 1
+                raise SandboxError from error
+            with self._lock:
+                self._idle.append(worker)
+        with self._lock:
+            self.calls += 1
+            self._call_times.append(seconds)
+        return SandboxResult(output, seconds)
+
+    async def arun(self, code: str, table_path: str | Path) -> SandboxResult:
+        """Runs the code on the table in a worker without blocking the event loop"""
+        return await asyncio.to_thread(self.run, code, table_path)
+
+    def stats(self) -> dict[str, float]:
+        """Returns the workers, calls, timeouts, failures and call times"""
+        with self._lock:
+            call_times = sorted(self._call_times)
+            stats = {
+                "workers": self._workers,
+                "idle": len(self._idle),
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+            }
+        stats["call_mean"] = sum(call_times) / len(call_times) if call_times else 0.0
+        stats["call_max"] = call_times[-1] if call_times else 0.0
+        return stats
+
+    def close(self) -> None:
+        """Stops the idle workers"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            self._discard(worker)
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self._workers += 1
+        return _Worker(self._context, self.memory_limit)
+
+    def _discard(self, worker):
+        worker.stop()
+        with self._lock:
+            self._workers -= 1
+
+
+_sandbox: PandasSandbox | None = None
+_sandbox_lock = threading.Lock()
+
+
+def get_sandbox() -> PandasSandbox:
+    """Returns the process wide PandasSandbox"""
+    global _sandbox  # pylint: disable=global-statement
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = PandasSandbox()
+        return _sandbox
@@ -0,0 +1,264 @@
+"""A fair scheduler of the inference requests to a shared local model"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Callable, Hashable, Iterable
+
+MAX_QUEUE = 32
+# The number of wait times the statistics are computed over
+WAIT_TIMES = 1000
+
+_CHUNK = "chunk"
+_ERROR = "error"
+_DONE = "done"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a request is submitted to a full InferenceScheduler"""
+
+    def __init__(self, max_queue: int):
+        super().__init__(
+            f"The queue is full with {max_queue} requests; try again later."
+        )
+
+
+class _Job:
+    __slots__ = (
+        "session",
+        "create",
+        "loop",
+        "queue",
+        "on_position",
+        "position",
+        "cancelled",
+        "done",
+        "submitted",
+    )
+
+    def __init__(self, session, create, loop, on_position):
+        self.session = session
+        self.create = create
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.on_position = on_position
+        self.position: int | None = None
+        self.cancelled = False
+        self.done = False
+        self.submitted = time.monotonic()
+
+
+class InferenceScheduler:
+    """
+    Runs the blocking inference requests to a model that is not safe for
+    concurrent use, like a `llama_cpp.Llama`, one at a time in a worker thread.
+
+    Queued requests are served round-robin across sessions, so a session with
+    many requests cannot starve the others. The queue is bounded; submitting
+    to a full queue raises a QueueFullError. A request is cancelled when its
+    stream is closed, e.g. when the callback is stopped, or when its session
+    is cancelled with `cancel_session`, e.g. when it is destroyed. A running
+    request is stopped at its next chunk.
+
+    Arguments:
+        max_queue: The maximum number of queued requests.
+
+    Example:
+        >>> deltas = scheduler.stream(session_id, lambda: llama(prompt, stream=True))
+        >>> await stream_deltas(deltas, instance)
+    """
+
+    def __init__(self, max_queue: int = MAX_QUEUE):
+        self.max_queue = max_queue
+        self._sessions: OrderedDict[Hashable, deque[_Job]] = OrderedDict()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._running: _Job | None = None
+        self._wait_times: deque[float] = deque(maxlen=WAIT_TIMES)
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of queued requests, excluding the running one"""
+        return sum(len(jobs) for jobs in self._sessions.values())
+
+    async def stream(
+        self,
+        session: Hashable,
+        create: Callable[[], Iterable],
+        on_position: Callable[[int], None] | None = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Queues a request and streams its chunks once it runs.
+
+        Arguments:
+            session: Identifies the session of the request, e.g. `id(pn.state.curdoc)`.
+            create: Returns the (sync) iterable of chunks of the response. It
+                is called in the worker thread when the request runs.
+            on_position: Called on the event loop with the number of requests
+                ahead of this one whenever it changes, and with 0 when it runs.
+        """
+        job = _Job(session, create, asyncio.get_running_loop(), on_position)
+        with self._condition:
+            if self.queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(self.max_queue)
+            self.submitted += 1
+            self._sessions.setdefault(session, deque()).append(job)
+            self._update_positions()
+            self._start_worker()
+            self._condition.notify()
+
+        try:
+            while True:
+                kind, value = await job.queue.get()
+                if kind == _CHUNK:
+                    yield value
+                elif kind == _ERROR:
+                    raise value
+                else:
+                    return
+        finally:
+            self._cancel(job)
+
+    def cancel_session(self, session: Hashable, *_) -> None:
+        """Cancels the queued and running requests of the session"""
+        with self._condition:
+            jobs = list(self._sessions.get(session, ()))
+            if self._running is not None and self._running.session == session:
+                jobs.append(self._running)
+        for job in jobs:
+            self._cancel(job)
+            _put(job, (_DONE, None))
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the queue depth, whether a request is running, the request
+        counts and the mean, 95th percentile and max seconds requests waited.
+        """
+        wait_times = sorted(self._wait_times)
+        n = len(wait_times)
+        return {
+            "queue_depth": self.queue_depth,
+            "running": int(self._running is not None),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "wait_mean": sum(wait_times) / n if n else 0.0,
+            "wait_p95": wait_times[min(int(n * 0.95), n - 1)] if n else 0.0,
+            "wait_max": wait_times[-1] if n else 0.0,
+        }
+
+    def _start_worker(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._work, daemon=True)
+            self._thread.start()
+
+    def _cancel(self, job: _Job):
+        with self._condition:
+            if job.done or job.cancelled:
+                return
+            job.cancelled = True
+            jobs = self._sessions.get(job.session)
+            if jobs is not None and job in jobs:
+                jobs.remove(job)
+                if not jobs:
+                    del self._sessions[job.session]
+                job.done = True
+                self.cancelled += 1
+                self._update_positions()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._sessions:
+                    self._condition.wait()
+                # round-robin: the session of the next job moves to the back
+                session, jobs = self._sessions.popitem(last=False)
+                job = jobs.popleft()
+                if jobs:
+                    self._sessions[session] = jobs
+                self._running = job
+                self._wait_times.append(time.monotonic() - job.submitted)
+                self._update_positions()
+            self._run(job)
+            with self._condition:
+                self._running = None
+                job.done = True
+
+    def _run(self, job: _Job):
+        iterator = None
+        try:
+            iterator = iter(job.create())
+            for chunk in iterator:
+                if job.cancelled or not _put(job, (_CHUNK, chunk)):
+                    break
+        except Exception as exc:  # pylint: disable=broad-except
+            self.failed += 1
+            _put(job, (_ERROR, exc))
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        if job.cancelled:
+            self.cancelled += 1
+        else:
+            self.completed += 1
+            _put(job, (_DONE, None))
+
+    def _update_positions(self):
+        position = 0
+        if self._running is not None:
+            _notify_position(self._running, 0)
+            position = 1
+        queues = list(self._sessions.values())
+        for index in range(max(map(len, queues), default=0)):
+            for jobs in queues:
+                if index < len(jobs):
+                    _notify_position(jobs[index], position)
+                    position += 1
+
+
+def _put(job: _Job, item: tuple) -> bool:
+    try:
+        job.loop.call_soon_threadsafe(job.queue.put_nowait, item)
+    except RuntimeError:  # the event loop of the session is closed
+        job.cancelled = True
+        return False
+    return True
+
+
+def _notify_position(job: _Job, position: int):
+    if job.on_position is None or job.position == position:
+        return
+    job.position = position
+    try:
+        job.loop.call_soon_threadsafe(job.on_position, position)
+    except RuntimeError:
+        pass
+
+
+_schedulers: dict[str, InferenceScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(name: str, **kwargs) -> InferenceScheduler:
+    """
+    Returns the process wide InferenceScheduler of the name, e.g. of a
+    SharedModel, creating it with `kwargs` the first time.
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(name)
+        if scheduler is None:
+            scheduler = _schedulers[name] = InferenceScheduler(**kwargs)
+        return scheduler
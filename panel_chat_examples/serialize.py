@@ -0,0 +1,144 @@
+"""Incremental serialization of the chat history of a ChatFeed"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+import panel as pn
+
+
+class _Entry:
+    """The cached, converted form of a single ChatMessage"""
+
+    __slots__ = ("message", "watcher", "version", "serialized_version", "value")
+
+    def __init__(self, message: pn.chat.ChatMessage, watcher):
+        self.message = message
+        self.watcher = watcher
+        self.version = 0
+        self.serialized_version = -1
+        self.value: Any = None
+
+
+class SerializedHistory:
+    """
+    Serializes the messages of a ChatFeed like `ChatFeed.serialize`, but only
+    converts the messages that are new or changed since the last call.
+
+    Each message is cached by identity together with a version that is bumped
+    whenever its `object` or `user` changes. The returned list is shared and
+    updated in place on every call, so it must not be mutated by the caller.
+
+    Arguments:
+        instance: The ChatFeed or ChatInterface to serialize.
+        exclude_users: Users to exclude. Defaults to `["help"]`.
+        role_names: Maps a role to one or more user names. Defaults to
+            `{"user": ["user"], "assistant": [instance.callback_user]}`.
+        default_role: The role of users not found in `role_names`.
+        custom_serializer: Converts the `object` of a message to its content.
+        converter: Converts the serialized `{"role": ..., "content": ...}` dict
+            into a provider specific message, e.g. `lambda m: ChatMessage(**m)`.
+
+    Example:
+        >>> history = SerializedHistory(chat_interface)
+        >>> messages = history.serialize()
+    """
+
+    def __init__(
+        self,
+        instance: pn.chat.ChatFeed,
+        exclude_users: list[str] | None = None,
+        role_names: dict[str, str | list[str]] | None = None,
+        default_role: str = "assistant",
+        custom_serializer: Callable[[Any], str] | None = None,
+        converter: Callable[[dict], Any] | None = None,
+    ):
+        self._instance = instance
+        self._exclude_users = {user.lower() for user in exclude_users or ["help"]}
+        if role_names is None:
+            role_names = {"user": ["user"], "assistant": [instance.callback_user]}
+        self._names_role = {}
+        for role, names in role_names.items():
+            if isinstance(names, str):
+                names = [names]
+            for name in names:
+                self._names_role[name.lower()] = role
+        self._default_role = default_role
+        self._custom_serializer = custom_serializer
+        self._converter = converter
+
+        self._entries: dict[int, _Entry] = {}
+        self._serialized: list[Any] = []
+        self.conversions = 0
+
+    def serialize(self) -> list[Any]:
+        """Returns the shared list of serialized messages"""
+        placeholder = getattr(self._instance, "_placeholder", None)
+        messages = [
+            message
+            for message in self._instance.objects
+            if message is not placeholder
+            and message.user.lower() not in self._exclude_users
+        ]
+
+        serialized = self._serialized
+        for index, message in enumerate(messages):
+            value = self._get_value(message)
+            if index == len(serialized):
+                serialized.append(value)
+            elif serialized[index] is not value:
+                serialized[index] = value
+        del serialized[len(messages) :]
+
+        if len(self._entries) > len(messages):
+            self._prune(messages)
+        return serialized
+
+    def clear(self):
+        """Removes all cached messages"""
+        for entry in self._entries.values():
+            entry.message.param.unwatch(entry.watcher)
+        self._entries.clear()
+        self._serialized.clear()
+
+    def _get_value(self, message: pn.chat.ChatMessage) -> Any:
+        entry = self._entries.get(id(message))
+        if entry is None or entry.message is not message:
+            watcher = message.param.watch(self._bump_version, ["object", "user"])
+            entry = self._entries[id(message)] = _Entry(message, watcher)
+
+        if entry.serialized_version != entry.version:
+            entry.value = self._convert(message)
+            entry.serialized_version = entry.version
+        return entry.value
+
+    def _bump_version(self, event):
+        entry = self._entries.get(id(event.obj))
+        if entry is not None and entry.message is event.obj:
+            entry.version += 1
+
+    def _convert(self, message: pn.chat.ChatMessage) -> Any:
+        self.conversions += 1
+        lowercase_name = message.user.lower()
+        if lowercase_name not in self._names_role and not self._default_role:
+            raise ValueError(  # noqa: TRY003
+                f"User {message.user!r} not found in role_names."
+            )
+        role = self._names_role.get(lowercase_name, self._default_role)
+
+        if self._custom_serializer:
+            content = self._custom_serializer(message.object)
+        else:
+            content = message.serialize()
+
+        value = {"role": role, "content": content}
+        if self._converter:
+            return self._converter(value)
+        return value
+
+    def _prune(self, messages: list[pn.chat.ChatMessage]):
+        current = {id(message) for message in messages}
+        for key in list(self._entries):
+            if key not in current:
+                entry = self._entries.pop(key)
+                entry.message.param.unwatch(entry.watcher)
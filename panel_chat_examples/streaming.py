@@ -0,0 +1,218 @@
+"""Helpers to stream the text deltas of an LLM response into a ChatMessage"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Union
+
+import panel as pn
+
+# Coalescing the deltas bounds the number of updates of the message to the
+# duration of the response instead of the number of chunks.
+FLUSH_INTERVAL = 0.05
+
+Deltas = Union[AsyncIterable[Any], Iterable[Any]]
+
+_DONE = object()
+
+
+def openai_delta(chunk) -> str | None:
+    """Returns the text delta of an OpenAI compatible chat completion chunk"""
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+
+def openai_tool_call_deltas(chunk) -> list:
+    """Returns the tool call deltas of an OpenAI compatible chat completion chunk"""
+    if not chunk.choices:
+        return []
+    return chunk.choices[0].delta.tool_calls or []
+
+
+def mistral_delta(chunk) -> str | None:
+    """Returns the text delta of a MistralAI chat completion event"""
+    return openai_delta(chunk.data)
+
+
+async def aiter_deltas(deltas: Deltas) -> AsyncIterator[Any]:
+    """
+    Iterates over an async or a sync iterable of deltas.
+
+    Sync iterables, like the blocking token generator of llama.cpp, are advanced
+    in a thread so they do not block the event loop.
+    """
+    if hasattr(deltas, "__aiter__"):
+        async for delta in deltas:
+            yield delta
+        return
+
+    iterator = iter(deltas)
+    while True:
+        delta = await asyncio.to_thread(next, iterator, _DONE)
+        if delta is _DONE:
+            break
+        yield delta
+
+
+async def stream_deltas(
+    deltas: Deltas,
+    instance: pn.chat.ChatFeed,
+    get_delta: Callable[[Any], str | None] | None = None,
+    message: pn.chat.ChatMessage | None = None,
+    user: str | None = None,
+    avatar: str | None = None,
+    flush_interval: float = FLUSH_INTERVAL,
+) -> pn.chat.ChatMessage | None:
+    """
+    Streams the text deltas into a single ChatMessage of the instance.
+
+    Instead of rebuilding the full reply and yielding it for every chunk, the
+    deltas are buffered and appended to the message in place at most once per
+    `flush_interval` seconds. The first delta is always flushed immediately to
+    keep the time to first token low.
+
+    Arguments:
+        deltas: An async or sync iterable of chunks.
+        instance: The ChatFeed or ChatInterface to stream into.
+        get_delta: Extracts the text from a chunk, e.g. `openai_delta`. If not
+            provided, the chunks are expected to be strings.
+        message: An existing message to append to. A new message is created if
+            not provided.
+        user: The user of a new message. Defaults to the `callback_user`.
+        avatar: The avatar of a new message.
+        flush_interval: The minimum number of seconds between two updates.
+
+    Returns:
+        The message streamed into or None if no text was received.
+    """
+    user = user or instance.callback_user
+    buffer: list[str] = []
+    last_flush = 0.0
+    async for chunk in aiter_deltas(deltas):
+        delta = get_delta(chunk) if get_delta else chunk
+        if not delta:
+            continue
+
+        buffer.append(delta)
+        now = time.monotonic()
+        if message is None or now - last_flush >= flush_interval:
+            message = _flush(buffer, instance, message, user, avatar)
+            last_flush = now
+
+    if buffer:
+        message = _flush(buffer, instance, message, user, avatar)
+    return message
+
+
+def _flush(buffer, instance, message, user, avatar):
+    text = "".join(buffer)
+    buffer.clear()
+    if message is None:
+        return instance.stream(text, user=user, avatar=avatar)
+    return instance.stream(text, message=message)
+
+
+class ToolCallParser:
+    """
+    Parses the argument JSON of streamed tool calls incrementally, so each
+    call can be acted on as soon as its arguments object is complete instead
+    of when the whole response has arrived.
+
+    The brackets of the arguments are counted as they arrive, outside of
+    strings, so each delta is scanned once and the JSON is only decoded when
+    the outer object closes.
+
+    Example:
+        >>> parser = ToolCallParser()
+        >>> for chunk in chunks:
+        ...     for name, arguments in parser.feed(openai_tool_call_deltas(chunk)):
+        ...         print(name, arguments)
+    """
+
+    def __init__(self):
+        self._calls: dict[int, dict[str, Any]] = {}
+
+    def feed(self, deltas: Iterable[Any]) -> list[tuple[str, dict]]:
+        """
+        Adds the tool call deltas of a chunk and returns the name and
+        arguments of the calls they completed.
+        """
+        completed = []
+        for delta in deltas:
+            call = self._calls.setdefault(
+                delta.index,
+                {
+                    "name": "",
+                    "parts": [],
+                    "depth": 0,
+                    "string": False,
+                    "escape": False,
+                    "done": False,
+                },
+            )
+            function = delta.function
+            if function is None:
+                continue
+            if function.name:
+                call["name"] += function.name
+            if function.arguments and not call["done"]:
+                call["parts"].append(function.arguments)
+                if self._closes(call, function.arguments):
+                    call["done"] = True
+                    completed.append((call["name"], self._decode(call)))
+        return completed
+
+    def finish(self) -> list[tuple[str, dict]]:
+        """Returns the name and arguments of the calls not completed yet"""
+        completed = [
+            (call["name"], self._decode(call))
+            for call in self._calls.values()
+            if not call["done"]
+        ]
+        self._calls.clear()
+        return completed
+
+    @staticmethod
+    def _closes(call, text) -> bool:
+        for character in text:
+            if call["string"]:
+                if call["escape"]:
+                    call["escape"] = False
+                elif character == "\\":
+                    call["escape"] = True
+                elif character == '"':
+                    call["string"] = False
+            elif character == '"':
+                call["string"] = True
+            elif character in "{[":
+                call["depth"] += 1
+            elif character in "}]":
+                call["depth"] -= 1
+                if call["depth"] == 0:
+                    return True
+        return False
+
+    @staticmethod
+    def _decode(call) -> dict:
+        text = "".join(call["parts"]).strip()
+        return json.loads(text) if text else {}
+
+
+async def stream_tool_calls(
+    chunks: Deltas,
+    get_deltas: Callable[[Any], list] = openai_tool_call_deltas,
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Yields the name and arguments of each tool call of a streamed response as
+    soon as its arguments are complete, e.g. to start on the first call while
+    the next one is still generated.
+    """
+    parser = ToolCallParser()
+    async for chunk in aiter_deltas(chunks):
+        for call in parser.feed(get_deltas(chunk)):
+            yield call
+    for call in parser.finish():
+        yield call
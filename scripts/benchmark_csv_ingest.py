@@ -0,0 +1,112 @@
+"""Benchmarks the parse time and memory of CSV uploads of the pandas recipe
+
+Writes penguins like CSVs of 10k, 1M and 10M rows and parses each, in a fresh
+process, as the chat used to, with `pd.read_csv` of the uploaded bytes, and as
+it does now, with `ArrowFrame.from_csv` and the pandas view of the agent. It
+reports the seconds to parse, the bytes of the parsed table and the peak
+resident memory of the process, including the uploaded bytes. It also reports
+the bytes of the window of rows sent to the browser, which no longer grows
+with the table.
+
+Run with
+
+```bash
+python scripts/benchmark_csv_ingest.py --rows 10000 1000000 10000000
+```
+"""
+
+import argparse
+import io
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from panel_chat_examples.columnar import WINDOW_ROWS, ArrowFrame
+
+SPECIES = np.array(["Adelie", "Chinstrap", "Gentoo"])
+ISLANDS = np.array(["Biscoe", "Dream", "Torgersen"])
+SEXES = np.array(["male", "female", "NA"])
+
+
+def _write_csv(path, rows):
+    rng = np.random.default_rng(0)
+    chunk = 1_000_000
+    for start in range(0, rows, chunk):
+        size = min(chunk, rows - start)
+        pd.DataFrame(
+            {
+                "species": SPECIES[rng.integers(0, 3, size)],
+                "island": ISLANDS[rng.integers(0, 3, size)],
+                "bill_length_mm": rng.normal(44, 5, size).round(1),
+                "bill_depth_mm": rng.normal(17, 2, size).round(1),
+                "flipper_length_mm": rng.integers(170, 232, size),
+                "body_mass_g": rng.integers(2700, 6300, size),
+                "sex": SEXES[rng.integers(0, 3, size)],
+                "year": rng.integers(2007, 2010, size),
+            }
+        ).to_csv(path, mode="a", header=not start, index=False)
+
+
+def _peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _parse_pandas(path):
+    contents = Path(path).read_bytes()
+    start = time.perf_counter()
+    data = pd.read_csv(io.BytesIO(contents))
+    seconds = time.perf_counter() - start
+    nbytes = int(data.memory_usage(deep=True).sum())
+    return seconds, nbytes, nbytes, _peak_rss()
+
+
+def _parse_arrow(path):
+    contents = Path(path).read_bytes()
+    start = time.perf_counter()
+    frame = ArrowFrame.from_csv(contents)
+    frame.to_pandas()
+    seconds = time.perf_counter() - start
+    window = int(frame.window(0, WINDOW_ROWS).memory_usage(deep=True).sum())
+    return seconds, frame.nbytes, window, _peak_rss()
+
+
+def _measure(parse, path):
+    # a fresh process per measurement, so the peak memory is its own
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(parse, (path,))
+
+
+def main(rows_list):
+    mb = 1024**2
+    print(
+        f"{'rows':>10} {'parser':<7} {'parse':>8} {'table':>10} "
+        f"{'browser':>10} {'peak RSS':>10}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in rows_list:
+            path = Path(directory) / f"penguins_{rows}.csv"
+            _write_csv(path, rows)
+            for name, parse in (("pandas", _parse_pandas), ("arrow", _parse_arrow)):
+                seconds, nbytes, browser, peak = _measure(parse, str(path))
+                print(
+                    f"{rows:>10,} {name:<7} {seconds:>7.2f}s {nbytes / mb:>8.1f}MB "
+                    f"{browser / mb:>8.2f}MB {peak / mb:>8.1f}MB"
+                )
+            path.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000]
+    )
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,222 @@
+"""Benchmarks the server side overhead of the examples against the mock OpenAI API
+
+Each example is executed as a new session, its `ChatInterface` is sent the
+messages of the example and the following is reported:
+
+- ttfr: the time from sending a message to the first rendered response
+- tokens/s: the rate at which the tokens of the response are rendered
+- cpu/token: the CPU time of the server per rendered token
+- memory: the memory allocated by a session
+
+Run with
+
+```bash
+python scripts/benchmark_examples.py --ttft 0.2 --tokens-per-second 100
+```
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import runpy
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import panel as pn
+
+ROOT_PATH = Path(__file__).parent.parent
+EXAMPLES_PATH = ROOT_PATH / "docs" / "examples"
+EXAMPLE_PDF = ROOT_PATH / "tests" / "ui" / "example.pdf"
+PENGUINS_CSV = ROOT_PATH / "tests" / "ui" / "penguins.csv"
+
+DEFAULT_STEPS = ["Tell me about HoloViz Panel"]
+STEPS = {
+    "control_callback_response.py": ["Heads!"],
+    "delayed_placeholder.py": ["1"],
+    "langchain_chat_with_pandas.py": [
+        lambda: pd.read_csv(PENGUINS_CSV),
+        "How many species are there?",
+    ],
+    "langchain_chat_with_pdf.py": [
+        lambda: BytesIO(EXAMPLE_PDF.read_bytes()),
+        "What is the document about?",
+    ],
+    "openai_chat_with_hvplot.py": ["Plot the life expectancy versus the GDP"],
+}
+SKIP = {
+    "llama_cpp_python_.py": "requires a local model",
+    "mistralai_.py": "requires the MistralAI API",
+}
+TOOL_ARGUMENTS = {
+    "hvplot": {"kind": "scatter", "x": "gdpPercap", "y": "lifeExp", "by": "continent"},
+    "renderer": {"backend": "bokeh"},
+}
+
+
+def _start_mock_server(port, args):
+    process = subprocess.Popen(  # noqa: S603
+        [
+            sys.executable,
+            "-m",
+            "panel_chat_examples.mock_server",
+            f"--port={port}",
+            f"--ttft={args.ttft}",
+            f"--tokens-per-second={args.tokens_per_second}",
+            f"--chunk-size={args.chunk_size}",
+            f"--reply-tokens={args.reply_tokens}",
+            f"--tool-arguments={json.dumps(TOOL_ARGUMENTS)}",
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://localhost:{port}/v1/models")  # noqa: S310
+        except OSError:
+            time.sleep(0.1)
+        else:
+            return process
+    process.terminate()
+    raise RuntimeError(f"The mock server did not start on port {port}")  # noqa: TRY003
+
+
+def _find_chat_interface(namespace):
+    for value in namespace.values():
+        if isinstance(value, pn.chat.ChatInterface):
+            return value
+    raise LookupError("No ChatInterface found")  # noqa: TRY003
+
+
+async def _wait_until_idle(instance, timeout, idle_time=0.3):
+    """Waits until the instance is idle and returns the time it became idle"""
+    start = time.monotonic()
+    idle_since = None
+    while time.monotonic() - start < timeout:
+        await asyncio.sleep(0.01)
+        if instance.disabled:
+            idle_since = None
+        elif idle_since is None:
+            idle_since = time.monotonic()
+        elif time.monotonic() - idle_since > idle_time:
+            return idle_since
+    raise TimeoutError(f"No response within {timeout} seconds")  # noqa: TRY003
+
+
+def _responses(instance, n_before):
+    placeholder = getattr(instance, "_placeholder", None)
+    return [
+        message
+        for message in instance.objects[n_before:]
+        if message is not placeholder and message.serialize().strip()
+    ]
+
+
+async def _run_session(path, timeout):
+    """Runs a session of the example and returns the ttfr, tokens and cpu time"""
+    namespace = runpy.run_path(str(path))
+    instance = _find_chat_interface(namespace)
+    await _wait_until_idle(instance, timeout)
+
+    ttfr = None
+    n_tokens = 0
+    cpu = 0.0
+    render_time = 0.0
+    for step in STEPS.get(path.name, DEFAULT_STEPS):
+        value = step() if callable(step) else step
+        n_before = len(instance.objects) + 1
+        cpu_start = time.process_time()
+        start = time.monotonic()
+        instance.send(value)
+        first = None
+        while first is None and time.monotonic() - start < timeout:
+            await asyncio.sleep(0.005)
+            if _responses(instance, n_before):
+                first = time.monotonic()
+        end = await _wait_until_idle(instance, timeout)
+        cpu += time.process_time() - cpu_start
+
+        if first is None:
+            continue
+        if ttfr is None:
+            ttfr = first - start
+        render_time += end - first
+        n_tokens += sum(
+            len(message.serialize().split())
+            for message in _responses(instance, n_before)
+        )
+    return namespace, ttfr, n_tokens, cpu, render_time
+
+
+async def _benchmark(path, timeout):
+    # the first session warms up the imports and caches
+    await _run_session(path, timeout)
+    _, ttfr, n_tokens, cpu, render_time = await _run_session(path, timeout)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    namespace, *_ = await _run_session(path, timeout)
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del namespace
+    return ttfr, n_tokens, cpu, render_time, memory
+
+
+def _format_row(name, *values):
+    return f"{name:<32}" + "".join(f"{value:>14}" for value in values)
+
+
+async def main(args):
+    os.environ["OPENAI_BASE_URL"] = f"http://localhost:{args.port}/v1"
+    os.environ["OPENAI_API_KEY"] = "mock"
+    os.environ.setdefault("PYDANTIC_AI_MODEL", "openai:gpt-4o")
+    process = _start_mock_server(args.port, args)
+    print(_format_row("example", "ttfr [s]", "tokens/s", "cpu/token", "memory [MB]"))
+    try:
+        for path in sorted(EXAMPLES_PATH.glob("**/*.py")):
+            if args.include and not any(name in path.name for name in args.include):
+                continue
+            if path.name in SKIP:
+                print(_format_row(path.name, f"skipped: {SKIP[path.name]}"))
+                continue
+
+            try:
+                ttfr, n_tokens, cpu, render_time, memory = await _benchmark(
+                    path, args.timeout
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                print(_format_row(path.name, f"failed: {exc!r}"[:80]))
+                continue
+
+            tokens_per_second = n_tokens / render_time if render_time else 0
+            cpu_per_token = f"{cpu / n_tokens * 1e3:.2f}ms" if n_tokens else "-"
+            print(
+                _format_row(
+                    path.name,
+                    f"{ttfr:.3f}" if ttfr is not None else "-",
+                    f"{tokens_per_second:.1f}",
+                    cpu_per_token,
+                    f"{memory / 1e6:.1f}",
+                )
+            )
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=100)
+    parser.add_argument("--chunk-size", type=int, default=1)
+    parser.add_argument("--reply-tokens", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument(
+        "--include", nargs="*", help="Only benchmark examples matching these names"
+    )
+    asyncio.run(main(parser.parse_args()))
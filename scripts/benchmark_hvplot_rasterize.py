@@ -0,0 +1,69 @@
+"""Benchmarks the render time and payload of raw and rasterized hvPlot plots
+
+Builds line and scatter plots of 10k, 1M and 10M random points with `.hvplot`,
+as the hvPlot recipe does, once with every point sent to the browser and once
+rasterized on the server, as the recipe does above its row threshold. It
+reports the seconds to build and render each plot to a Bokeh figure and the
+bytes of the JSON sent to the browser. Raw plots of more than `--max-raw-rows`
+rows are skipped.
+
+Run with
+
+```bash
+python scripts/benchmark_hvplot_rasterize.py --rows 10000 1000000 10000000
+```
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _data(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {"x": np.arange(rows), "y": rng.normal(0, 1, rows).cumsum()},
+    )
+
+
+def _render(data, kind, rasterize):
+    # pylint: disable=import-outside-toplevel
+    import holoviews as hv
+    import hvplot.pandas  # noqa: F401
+    from bokeh.embed import json_item
+
+    start = time.perf_counter()
+    plot = data.hvplot(kind=kind, x="x", y="y", rasterize=rasterize)
+    figure = hv.render(plot, backend="bokeh")
+    payload = json.dumps(json_item(figure))
+    return time.perf_counter() - start, len(payload.encode("utf8"))
+
+
+def main(rows_list, max_raw_rows):
+    mb = 1024**2
+    print(f"{'rows':>10} {'kind':<8} {'plot':<10} {'render':>8} {'payload':>10}")
+    for rows in rows_list:
+        data = _data(rows)
+        for kind in ("line", "scatter"):
+            for rasterize in (False, True):
+                if not rasterize and rows > max_raw_rows:
+                    continue
+                seconds, nbytes = _render(data, kind, rasterize)
+                name = "rasterized" if rasterize else "raw"
+                print(
+                    f"{rows:>10,} {kind:<8} {name:<10} {seconds:>7.2f}s "
+                    f"{nbytes / mb:>8.2f}MB"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--max-raw-rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+    main(args.rows, args.max_raw_rows)
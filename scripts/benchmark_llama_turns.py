@@ -0,0 +1,95 @@
+"""Benchmarks the time to first token per turn of llama.cpp sessions sharing a model
+
+Two sessions take turns chatting with one `Llama` instance, like the sessions of
+the llama.cpp kickstart snippet. Without the `PromptStateCache` every turn finds
+the context of the other session and evaluates the whole history again, so the
+time to first token grows with the turn number. With it only the new messages
+are evaluated.
+
+Run with
+
+```bash
+python scripts/benchmark_llama_turns.py --turns 8
+```
+"""
+
+import argparse
+import time
+
+from huggingface_hub import hf_hub_download
+from llama_cpp import Llama
+
+from panel_chat_examples.prompt_state import PromptStateCache
+
+REPO_ID = "TheBloke/Mistral-7B-Instruct-v0.2-code-ft-GGUF"
+FILENAME = "mistral-7b-instruct-v0.2-code-ft.Q5_K_S.gguf"
+SESSIONS = ("a", "b")
+PROMPT = "Tell me one more fact about {topic} in two sentences."
+TOPICS = {"a": "HoloViz Panel", "b": "the Python programming language"}
+
+
+def _turn(llama, messages, max_tokens):
+    """Returns the seconds to the first token and the reply"""
+    start = time.perf_counter()
+    ttft = None
+    reply = ""
+    for chunk in llama.create_chat_completion(
+        messages=messages, stream=True, max_tokens=max_tokens, temperature=0
+    ):
+        content = chunk["choices"][0]["delta"].get("content")
+        if content:
+            ttft = ttft or time.perf_counter() - start
+            reply += content
+    return ttft or time.perf_counter() - start, reply
+
+
+def _run(llama, turns, max_tokens, prompt_states=None):
+    histories = {session: [] for session in SESSIONS}
+    ttfts = []
+    for _ in range(turns):
+        row = []
+        for session in SESSIONS:
+            messages = histories[session]
+            messages.append(
+                {"role": "user", "content": PROMPT.format(topic=TOPICS[session])}
+            )
+            if prompt_states is not None:
+                prompt_states.restore(session, llama)
+            ttft, reply = _turn(llama, messages, max_tokens)
+            if prompt_states is not None:
+                prompt_states.save(session, llama)
+            messages.append({"role": "assistant", "content": reply})
+            row.append(ttft)
+        ttfts.append(row)
+    return ttfts
+
+
+def main(turns, max_tokens, n_ctx):
+    model_path = hf_hub_download(repo_id=REPO_ID, filename=FILENAME)
+    llama = Llama(
+        model_path=model_path,
+        chat_format="mistral-instruct",
+        n_ctx=n_ctx,
+        verbose=False,
+    )
+
+    llama.reset()
+    before = _run(llama, turns, max_tokens)
+    llama.reset()
+    prompt_states = PromptStateCache()
+    after = _run(llama, turns, max_tokens, prompt_states)
+
+    print(f"{'turn':>4} {'session':>7} {'ttft before':>12} {'ttft after':>11}")
+    for turn, (row_before, row_after) in enumerate(zip(before, after), start=1):
+        for session, ttft_before, ttft_after in zip(SESSIONS, row_before, row_after):
+            print(f"{turn:>4} {session:>7} {ttft_before:>11.3f}s {ttft_after:>10.3f}s")
+    print(prompt_states.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--n-ctx", type=int, default=4096)
+    args = parser.parse_args()
+    main(args.turns, args.max_tokens, args.n_ctx)
@@ -0,0 +1,127 @@
+"""Benchmarks the latency and hit rate of the retrieval modes of the PDF recipe
+
+Indexes `tests/ui/example.pdf` and asks questions with known answers, reporting
+the mean and 95th percentile latency per question and the share of questions
+with the answer in the retrieved chunks (hit@k) of the vector, BM25 and hybrid
+retrieval modes. The answer quality of the chain follows the hit rate, as the
+LLM can only answer from the retrieved chunks.
+
+The vector mode embeds the chunks and questions with the OpenAI API, including
+the time of the remote call per question. Point `OPENAI_BASE_URL` to the
+`mock_server` to run it offline, though its bag of words embeddings are not
+semantic.
+
+Run with
+
+```bash
+python scripts/benchmark_retrieval.py --k 2 --chunk-size 500
+```
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from panel_chat_examples.bm25 import BM25Index, reciprocal_rank_fusion
+from panel_chat_examples.ingest import extract_pages, page_count
+
+PDF_PATH = Path(__file__).parent.parent / "tests" / "ui" / "example.pdf"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+QUESTIONS = {
+    "When was the Python Software Foundation founded?": "March 6, 2001",
+    "Who is the president of the PSF?": "Guido van Rossum",
+    "Who chairs the foundation?": "Thomas Wouters",
+    "What was the revenue of the PSF in 2018?": "$3.1 million",
+    "Which award did the foundation win in 2005?": "Horizon Award",
+    "How many tiers of membership are there?": "five tiers",
+    "Who has to work at least five hours per month on the ecosystem?": "Managing",
+    "How are fellows elevated?": "vote of the members",
+    "Since when does the PSF recommend a code of conduct for conferences?": "2012",
+    "Which trademarks does the PSF protect?": "two-snakes logo",
+}
+
+
+def _chunks(pdf, chunk_size):
+    chunks = []
+    for _, text in extract_pages(pdf, 0, page_count(pdf)):
+        chunk = ""
+        for line in text.splitlines():
+            if chunk and len(chunk) + len(line) > chunk_size:
+                chunks.append(chunk)
+                chunk = ""
+            chunk += line + "\n"
+        if chunk:
+            chunks.append(chunk)
+    return chunks
+
+
+class _VectorIndex:
+    def __init__(self, chunks):
+        from openai import OpenAI  # pylint: disable=import-outside-toplevel
+
+        self._client = OpenAI()
+        self._vectors = self._embed(chunks)
+
+    def _embed(self, texts):
+        response = self._client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+        vectors = np.array([item.embedding for item in response.data])
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def search(self, query, k):
+        scores = self._vectors @ self._embed([query])[0]
+        return list(np.argsort(-scores)[:k])
+
+
+def _report(name, retrieve, chunks, k):
+    latencies = []
+    hits = 0
+    for question, answer in QUESTIONS.items():
+        start = time.perf_counter()
+        ids = retrieve(question, k)
+        latencies.append(time.perf_counter() - start)
+        hits += any(answer.lower() in chunks[i].lower() for i in ids[:k])
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(
+        f"{name:<8} mean={statistics.mean(latencies) * 1000:>8.2f}ms "
+        f"p95={p95 * 1000:>8.2f}ms hit@{k}={hits / len(QUESTIONS):>5.0%}"
+    )
+
+
+def main(k, chunk_size, vector):
+    chunks = _chunks(PDF_PATH.read_bytes(), chunk_size)
+    bm25 = BM25Index()
+    bm25.add(chunks, [{"id": i} for i in range(len(chunks))])
+    print(f"{len(chunks)} chunks, BM25 postings {bm25.nbytes()} bytes")
+
+    def retrieve_bm25(question, k):
+        return [metadata["id"] for _, _, metadata in bm25.search(question, k)]
+
+    _report("BM25", retrieve_bm25, chunks, k)
+    if not vector:
+        return
+
+    vector_index = _VectorIndex(chunks)
+
+    def retrieve_hybrid(question, k):
+        rankings = [vector_index.search(question, k), retrieve_bm25(question, k)]
+        return reciprocal_rank_fusion(rankings)
+
+    _report("Vector", vector_index.search, chunks, k)
+    _report("Hybrid", retrieve_hybrid, chunks, k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument(
+        "--no-vector",
+        action="store_true",
+        help="Only benchmark BM25, e.g. without an OpenAI API key",
+    )
+    args = parser.parse_args()
+    main(args.k, args.chunk_size, not args.no_vector)
@@ -0,0 +1,90 @@
+"""Benchmarks the bytes sent and server CPU per token when streaming a reply
+
+Compares the `message += part; yield message` pattern with `stream_deltas`.
+
+Run with
+
+```bash
+python scripts/benchmark_streaming.py --tokens 3000 --tokens-per-second 500
+```
+"""
+
+import argparse
+import asyncio
+import time
+
+import panel as pn
+from bokeh.document import Document
+from bokeh.protocol import Protocol
+
+from panel_chat_examples.streaming import stream_deltas
+
+TOKEN = "lorem "
+
+
+class _Recorder:
+    """Records the size of the messages sent to the browser"""
+
+    def __init__(self, instance: pn.chat.ChatInterface):
+        self.bytes_sent = 0
+        self.messages_sent = 0
+        self._protocol = Protocol()
+        doc = Document()
+        doc.add_root(instance.get_root(doc))
+        doc.callbacks.on_change(self._on_change)
+
+    def _on_change(self, event):
+        message = self._protocol.create("PATCH-DOC", [event])
+        self.bytes_sent += len(message.content_json) + sum(
+            len(buffer.data) for buffer in message.buffers
+        )
+        self.messages_sent += 1
+
+
+async def _tokens(n_tokens, tokens_per_second):
+    for _ in range(n_tokens):
+        await asyncio.sleep(1 / tokens_per_second)
+        yield TOKEN
+
+
+async def _quadratic(instance, n_tokens, tokens_per_second):
+    message = None
+    text = ""
+    async for part in _tokens(n_tokens, tokens_per_second):
+        text += part
+        # this is what the ChatInterface does with a yielded string
+        if message is None:
+            message = instance.stream(text, user="Assistant")
+        else:
+            message.object = text
+
+
+async def _deltas(instance, n_tokens, tokens_per_second):
+    await stream_deltas(_tokens(n_tokens, tokens_per_second), instance)
+
+
+async def _run(name, func, n_tokens, tokens_per_second):
+    instance = pn.chat.ChatInterface()
+    recorder = _Recorder(instance)
+    start = time.process_time()
+    await func(instance, n_tokens, tokens_per_second)
+    cpu = time.process_time() - start
+    print(
+        f"{name:<12} messages={recorder.messages_sent:>6} "
+        f"bytes={recorder.bytes_sent:>10} "
+        f"bytes/token={recorder.bytes_sent / n_tokens:>9.1f} "
+        f"cpu/token={cpu / n_tokens * 1e6:>8.1f}µs"
+    )
+
+
+async def main(n_tokens, tokens_per_second):
+    await _run("before", _quadratic, n_tokens, tokens_per_second)
+    await _run("after", _deltas, n_tokens, tokens_per_second)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=3000)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.tokens_per_second))
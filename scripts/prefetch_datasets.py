@@ -0,0 +1,11 @@
+"""Fetches the example datasets into the local DatasetCache
+
+Run by `hatch run panel-serve` with `panel serve --setup` when the server
+starts, so the examples load the datasets from disk instead of downloading
+them when they are imported. Datasets that can not be fetched, e.g. offline,
+are logged and fetched when first loaded.
+"""
+
+from panel_chat_examples.datasets import get_dataset_cache
+
+get_dataset_cache().prefetch()
@@ -1,10 +1,30 @@
 """Locust load test file"""
 
+import json
+import os
+import re
+import time
+import uuid
 from pathlib import Path
 from random import choice
 
+import requests
+import websocket
 from conftest import APP_PATHS  # pylint: disable=import-error
-from locust import HttpUser, task
+from locust import HttpUser, User, between, task
+
+# The examples that do not require an API key. Use the CHAT_EXAMPLES environment
+# variable to chat with other examples, e.g. with the `mock_server` running.
+CHAT_EXAMPLES = [
+    example
+    for example in os.environ.get(
+        "CHAT_EXAMPLES",
+        "echo_chat,stream_echo_chat,delayed_placeholder,styled_slim_interface",
+    ).split(",")
+    if example
+]
+CHAT_MESSAGE = os.environ.get("CHAT_MESSAGE", "Tell me about HoloViz Panel")
+CHAT_TIMEOUT = float(os.environ.get("CHAT_TIMEOUT", "120"))
 
 
 class RandomPageUser(HttpUser):
@@ -20,3 +40,165 @@ class RandomPageUser(HttpUser):
     def get_index_page(self):
         """Gets the index page"""
         self.client.get("/")
+
+
+class BokehChatSession:
+    """A minimal client of the Bokeh websocket protocol to chat with an example"""
+
+    def __init__(self, host: str, app: str):
+        self.host = host.rstrip("/")
+        self.app = app
+        self._ws = None
+        self._input_id = None
+        self._input_type = None
+
+    def connect(self):
+        """Opens the session and finds the chat input of the app"""
+        html = requests.get(f"{self.host}/{self.app}", timeout=CHAT_TIMEOUT).text
+        token = re.search(r'"token":\s*"([^"]+)"', html).group(1)
+        ws_url = re.sub(r"^http", "ws", self.host) + f"/{self.app}/ws"
+        self._ws = websocket.create_connection(
+            ws_url,
+            subprotocols=["bokeh", token],
+            origin=self.host,
+            timeout=CHAT_TIMEOUT,
+        )
+        self._receive()  # ACK
+        self._send("PULL-DOC-REQ", {})
+        _, content = self._receive()
+        models = {}
+        _find_models(content, models)
+        for name in ("ChatAreaInput", "TextInput"):
+            for model_type, model_id in models.items():
+                if model_type.split(".")[-1] == name:
+                    self._input_type, self._input_id = name, model_id
+                    return
+        raise LookupError(f"No chat input found in {self.app!r}")  # noqa: TRY003
+
+    def chat(self, message: str) -> tuple:
+        """
+        Sends a message and waits for the reply.
+
+        Returns:
+            The seconds to the first chunk of the reply and to the full reply.
+        """
+        if self._input_type == "ChatAreaInput":
+            values = {
+                "type": "map",
+                "entries": [["model", {"id": self._input_id}], ["value", message]],
+            }
+            msg_data = {"type": "event", "name": "chat_message_event", "values": values}
+            event = {
+                "kind": "MessageSent",
+                "msg_type": "bokeh_event",
+                "msg_data": msg_data,
+            }
+        else:
+            event = {
+                "kind": "ModelChanged",
+                "model": {"id": self._input_id},
+                "attr": "value",
+                "new": message,
+            }
+
+        start = time.perf_counter()
+        self._send("PATCH-DOC", {"events": [event]})
+        disabled = set()
+        first_chunk = None
+        while True:
+            header, content = self._receive()
+            if header["msgtype"] != "PATCH-DOC":
+                continue
+            for change in content.get("events", []):
+                if change.get("attr") == "disabled":
+                    model_id = change["model"]["id"]
+                    if change["new"]:
+                        disabled.add(model_id)
+                    elif model_id in disabled:
+                        end = time.perf_counter() - start
+                        return first_chunk or end, end
+                elif (
+                    disabled
+                    and first_chunk is None
+                    and change.get("kind") == "MessageSent"
+                    and change.get("msg_data", {}).get("name") == "scroll_latest_event"
+                ):
+                    # the chat feed scrolls to the latest message on every chunk
+                    first_chunk = time.perf_counter() - start
+
+    def close(self):
+        if self._ws is not None:
+            self._ws.close()
+            self._ws = None
+
+    def _send(self, msgtype: str, content: dict):
+        self._ws.send(json.dumps({"msgid": uuid.uuid4().hex, "msgtype": msgtype}))
+        self._ws.send("{}")
+        self._ws.send(json.dumps(content))
+
+    def _receive(self) -> tuple:
+        header = json.loads(self._ws.recv())
+        self._ws.recv()  # metadata
+        content = json.loads(self._ws.recv())
+        for _ in range(header.get("num_buffers", 0)):
+            self._ws.recv()  # buffer header
+            self._ws.recv()  # buffer payload
+        return header, content
+
+
+def _find_models(obj, models):
+    if isinstance(obj, dict):
+        if obj.get("type") == "object" and "id" in obj:
+            models.setdefault(obj.get("name", ""), obj["id"])
+        for value in obj.values():
+            _find_models(value, models)
+    elif isinstance(obj, list):
+        for value in obj:
+            _find_models(value, models)
+
+
+class ChatUser(User):
+    """This User chats with a random example over the Bokeh websocket"""
+
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        self.example = choice(CHAT_EXAMPLES)
+        self.session = BokehChatSession(self.host, self.example)
+        start = time.perf_counter()
+        try:
+            self.session.connect()
+        except Exception as exc:  # pylint: disable=broad-except
+            self._fire("connect", start, exc)
+            self.stop()
+            return
+        self._fire("connect", start)
+
+    def on_stop(self):
+        self.session.close()
+
+    @task
+    def chat(self):
+        """Sends a message and records the time to first chunk and round trip"""
+        start = time.perf_counter()
+        try:
+            first_chunk, round_trip = self.session.chat(CHAT_MESSAGE)
+        except Exception as exc:  # pylint: disable=broad-except
+            self._fire("round trip", start, exc)
+            self.session.close()
+            self.on_start()
+            return
+        self._fire("first chunk", start, elapsed=first_chunk)
+        self._fire("round trip", start, elapsed=round_trip)
+
+    def _fire(self, name, start, exception=None, elapsed=None):
+        if elapsed is None:
+            elapsed = time.perf_counter() - start
+        self.environment.events.request.fire(
+            request_type="WS",
+            name=f"{self.example} {name}",
+            response_time=elapsed * 1000,
+            response_length=0,
+            exception=exception,
+            context={},
+        )
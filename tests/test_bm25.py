@@ -0,0 +1,63 @@
+"""Tests of the BM25 index"""
+
+import pytest
+
+from panel_chat_examples.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+TEXTS = [
+    "The Python Software Foundation was founded on March 6, 2001.",
+    "Managing members work at least five hours per month.",
+    "Fellows are elevated by a vote of the members.",
+]
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add(TEXTS, [{"page": i} for i in range(len(TEXTS))])
+    return index
+
+
+def test_tokenize():
+    assert tokenize("The PSF's mission, in 2001!") == [
+        "the",
+        "psf",
+        "s",
+        "mission",
+        "in",
+        "2001",
+    ]
+
+
+def test_search_ranks_matching_texts_first(index):
+    results = index.search("When was the foundation founded?", k=2)
+
+    assert results[0][1] == TEXTS[0]
+    assert results[0][2] == {"page": 0}
+    assert all(score > 0 for score, _, _ in results)
+
+
+def test_search_rare_terms_weigh_more(index):
+    results = index.search("members vote", k=3)
+
+    assert [text for _, text, _ in results][:2] == [TEXTS[2], TEXTS[1]]
+
+
+def test_search_without_matches(index):
+    assert index.search("llama", k=2) == []
+    assert BM25Index().search("python") == []
+
+
+def test_add_extends_the_index(index):
+    index.add(["Llamas are not snakes."])
+
+    assert len(index) == 4
+    assert index.search("llamas", k=1)[0][1] == "Llamas are not snakes."
+    assert index.nbytes() > 0
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]])
+
+    assert fused[0] == "b"
+    assert set(fused) == {"a", "b", "c", "d"}
@@ -0,0 +1,138 @@
+"""Tests of the LLM response cache"""
+
+import threading
+
+import pytest
+
+from panel_chat_examples.cache import (
+    ResponseCache,
+    cached_stream,
+    content_key,
+    request_key,
+)
+
+REQUEST = {"model": "gpt", "messages": [{"role": "user", "content": "Hi"}]}
+
+
+class _Provider:
+    def __init__(self, parts):
+        self.parts = parts
+        self.calls = 0
+
+    async def create(self):
+        self.calls += 1
+        return self._stream()
+
+    async def _stream(self):
+        for part in self.parts:
+            yield part
+
+
+async def _collect(deltas):
+    return [delta async for delta in deltas]
+
+
+def test_request_key_is_canonical():
+    reordered = {"messages": REQUEST["messages"], "model": "gpt"}
+
+    assert request_key(REQUEST) == request_key(reordered)
+    assert request_key(REQUEST) != request_key(dict(REQUEST, model="other"))
+
+
+def test_content_key_depends_on_content_and_parts():
+    assert content_key(b"pdf") == content_key(b"pdf")
+    assert content_key(b"pdf") != content_key(b"other")
+    assert content_key(b"pdf", "1000") != content_key(b"pdf", "500")
+
+
+@pytest.mark.asyncio
+async def test_stream_replays_cache_hit():
+    cache = ResponseCache()
+    provider = _Provider(["Hello", None, " World"])
+
+    first = await _collect(cache.stream(REQUEST, provider.create))
+    second = await _collect(cache.stream(REQUEST, provider.create))
+
+    assert first == second == ["Hello", " World"]
+    assert provider.calls == 1
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+        "bytes_served": 11,
+        "bytes_stored": 11,
+    }
+
+
+def test_memory_tier_is_lru():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", ["a"])
+    cache.set("b", ["b"])
+    cache.get("a")
+    cache.set("c", ["c"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ["a"]
+
+
+def test_disk_tier_persists(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    ResponseCache(path).set("a", ["Hello"])
+
+    cache = ResponseCache(path, max_entries=0)
+
+    assert cache.get("a") == ["Hello"]
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_entries=0, max_disk_entries=2)
+    cache.set("a", ["a"])
+    cache.set("b", ["b"])
+    cache.set("a", ["a"])
+    cache.set("c", ["c"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ["a"]
+    assert cache.get("c") == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_stream_keys_responses_by_base_url():
+    cache = ResponseCache()
+    provider = _Provider(["Hello"])
+
+    await _collect(cache.stream(REQUEST, provider.create, base_url="http://a/v1"))
+    await _collect(cache.stream(REQUEST, provider.create, base_url="http://b/v1"))
+    await _collect(cache.stream(REQUEST, provider.create, base_url="http://a/v1"))
+
+    assert provider.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_reads_and_writes_disk_tier_off_the_event_loop(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(cache, name)
+
+        def record(*args, method=method):
+            threads.append(threading.get_ident())
+            return method(*args)
+
+        setattr(cache, name, record)
+
+    await _collect(cache.stream(REQUEST, _Provider(["Hello"]).create))
+
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_cached_stream_is_opt_in(monkeypatch):
+    monkeypatch.delenv("PANEL_CHAT_EXAMPLES_CACHE", raising=False)
+    provider = _Provider(["Hello"])
+
+    await _collect(cached_stream(REQUEST, provider.create))
+    await _collect(cached_stream(REQUEST, provider.create))
+
+    assert provider.calls == 2
@@ -0,0 +1,60 @@
+"""Tests of the pooled LLM client registry"""
+
+import time
+
+import pytest
+
+from panel_chat_examples.clients import ClientRegistry
+
+
+class _FakeClient:
+    def __init__(self, api_key, http_client, **kwargs):
+        self.api_key = api_key
+        self.http_client = http_client
+        self.kwargs = kwargs
+
+
+@pytest.fixture
+def registry():
+    registry = ClientRegistry(http_client_factory=object)
+    registry.register_provider("fake", _FakeClient, env_var="FAKE_API_KEY")
+    return registry
+
+
+def test_get_reuses_client_per_api_key(registry):
+    client = registry.get("fake", "key-1")
+
+    assert registry.get("fake", "key-1") is client
+    assert registry.stats()["hits"] == 1
+
+
+def test_get_isolates_api_keys_but_shares_http_client(registry):
+    client_1 = registry.get("fake", "key-1")
+    client_2 = registry.get("fake", "key-2")
+
+    assert client_1 is not client_2
+    assert client_1.api_key == "key-1"
+    assert client_2.api_key == "key-2"
+    assert client_1.http_client is client_2.http_client
+
+
+def test_get_defaults_to_env_var(registry, monkeypatch):
+    monkeypatch.setenv("FAKE_API_KEY", "env-key")
+
+    assert registry.get("fake").api_key == "env-key"
+    assert registry.get("fake", "") is registry.get("fake", "env-key")
+
+
+def test_get_evicts_idle_clients(registry):
+    registry.idle_timeout = 0.01
+    client = registry.get("fake", "key-1")
+    time.sleep(0.02)
+
+    assert registry.get("fake", "key-2") is not client
+    assert registry.stats()["evictions"] == 1
+    assert registry.stats()["clients"] == 1
+
+
+def test_get_unknown_provider(registry):
+    with pytest.raises(KeyError, match="Unknown provider"):
+        registry.get("unknown")
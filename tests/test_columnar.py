@@ -0,0 +1,54 @@
+"""Tests of the columnar CSV ingestion"""
+
+from pathlib import Path
+
+import pytest
+
+from panel_chat_examples.columnar import ArrowFrame, read_csv
+
+pa = pytest.importorskip("pyarrow")
+
+PENGUINS = (Path(__file__).parent / "ui" / "penguins.csv").read_bytes()
+
+
+def test_read_csv_infers_types_and_encodes_repetitive_strings():
+    table = read_csv(PENGUINS)
+
+    assert table.num_rows == 344
+    assert pa.types.is_dictionary(table.schema.field("species").type)
+    assert pa.types.is_floating(table.schema.field("bill_length_mm").type)
+    assert pa.types.is_integer(table.schema.field("year").type)
+    # like pandas, "NA" is missing
+    assert table["sex"].null_count > 0
+
+
+def test_read_csv_promotes_types_of_later_blocks():
+    data = b"a,b\n" + b"".join(b"%d,x\n" % i for i in range(10_000)) + b"1.5,y\n"
+
+    table = read_csv(data, block_size=1024)
+
+    assert table.num_rows == 10_001
+    assert pa.types.is_floating(table.schema.field("a").type)
+    assert table["a"][-1].as_py() == 1.5
+
+
+def test_to_pandas_is_built_once_from_arrow_buffers():
+    frame = ArrowFrame.from_csv(PENGUINS)
+
+    data = frame.to_pandas()
+
+    assert data is frame.to_pandas()
+    assert len(data) == len(frame) == 344
+    assert data["species"].nunique() == 3
+    assert str(data["bill_length_mm"].dtype) == "double[pyarrow]"
+
+
+def test_window_converts_only_the_rows():
+    frame = ArrowFrame.from_csv(PENGUINS)
+
+    window = frame.window(340, 400)
+
+    assert len(window) == 4
+    assert list(window.columns) == frame.columns
+    assert window["year"].dtype.kind == "i"
+    assert frame.window(-5, 2).index.size == 2
@@ -0,0 +1,112 @@
+"""Tests of the local cache of the example datasets"""
+
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from panel_chat_examples.datasets import (
+    Dataset,
+    DatasetCache,
+    DatasetChecksumError,
+)
+
+pytest.importorskip("pyarrow")
+
+PENGUINS = (
+    Path(__file__).parent.parent / "docs/examples/applicable_recipes/penguins.csv"
+)
+EXAMPLE = Path(__file__).parent / "ui" / "example.csv"
+
+
+class Downloads:
+    def __init__(self, sources):
+        self.sources = sources
+        self.urls = []
+
+    def __call__(self, url, path):
+        self.urls.append(url)
+        if url not in self.sources:
+            raise FileNotFoundError(url)
+        path.write_bytes(self.sources[url].read_bytes())
+
+
+@pytest.fixture
+def datasets():
+    return {
+        "penguins": Dataset(
+            "penguins",
+            "https://example.com/penguins.csv",
+            "e07636bd8af74260099ea2f8678e2eabbf35def579940cc76f67061ee16c06c1",
+        ),
+        "example": Dataset(
+            "example",
+            "https://example.com/example.csv",
+            "d6f5db97577432a2c903fbd4d5dbfae8960d8c6915f18eb81d1ed26d0e36de7d",
+        ),
+    }
+
+
+def test_load_downloads_once_and_memory_maps_the_table(tmp_path, datasets):
+    download = Downloads({"https://example.com/penguins.csv": PENGUINS})
+    cache = DatasetCache(tmp_path, datasets, download)
+
+    table = cache.load("penguins")
+    assert table.num_rows == 344
+    assert cache.load("penguins") is table
+    assert cache.source_path("penguins").read_bytes() == PENGUINS.read_bytes()
+    assert cache.verify("penguins")
+
+    # a later process loads the stored table without downloading it
+    restarted = DatasetCache(tmp_path, datasets, download)
+    assert "penguins" in restarted
+    assert restarted.load("penguins").equals(table)
+    assert download.urls == ["https://example.com/penguins.csv"]
+    assert restarted.stats()["downloads"] == 0
+
+
+def test_seed_and_checksum_mismatch(tmp_path, datasets):
+    cache = DatasetCache(tmp_path, datasets, Downloads({}))
+
+    with pytest.raises(DatasetChecksumError):
+        cache.fetch("penguins", seed=EXAMPLE)
+    assert "penguins" not in cache
+    assert not list(tmp_path.glob("*.csv"))
+
+    cache.fetch("penguins", seed=PENGUINS)
+    assert cache.stats()["datasets"] == 1
+    assert cache.stats()["downloads"] == 0
+
+
+def test_prefetch_reports_the_datasets_it_could_not_fetch(tmp_path, datasets):
+    download = Downloads({"https://example.com/example.csv": EXAMPLE})
+    cache = DatasetCache(tmp_path, datasets, download)
+
+    assert cache.prefetch() == ["penguins"]
+    assert "example" in cache
+    assert cache.verify("example")
+    assert cache.prefetch(["example"]) == []
+
+
+def test_download_must_match_the_pinned_checksum(tmp_path, datasets):
+    download = Downloads({"https://example.com/penguins.csv": EXAMPLE})
+    cache = DatasetCache(tmp_path, datasets, download)
+
+    with pytest.raises(DatasetChecksumError, match="penguins"):
+        cache.fetch("penguins")
+    assert "penguins" not in cache
+    assert not list(tmp_path.glob("*.arrow"))
+
+
+def test_download_extracts_the_csv_from_a_zip_archive(tmp_path, datasets):
+    archive = tmp_path / "example.whl"
+    with zipfile.ZipFile(archive, "w") as file:
+        file.write(EXAMPLE, "data/example.csv")
+    url = "https://example.com/example.whl"
+    dataset = Dataset("example", url, datasets["example"].sha256, "data/example.csv")
+    cache = DatasetCache(
+        tmp_path / "cache", {"example": dataset}, Downloads({url: archive})
+    )
+
+    assert cache.load("example").num_rows == len(EXAMPLE.read_text().splitlines()) - 1
+    assert cache.source_path("example").read_bytes() == EXAMPLE.read_bytes()
@@ -0,0 +1,88 @@
+"""Tests of the embedding cache"""
+
+import pytest
+
+from panel_chat_examples.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class _Provider:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text)), 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+def test_embed_only_sends_missing_texts():
+    cache = EmbeddingCache()
+    provider = _Provider()
+    cache.embed(["a", "bb"], provider.embed_documents, "model")
+
+    vectors = cache.embed(["bb", "ccc", "a", "ccc"], provider.embed_documents, "model")
+
+    assert vectors == [[2.0, 0.5], [3.0, 0.5], [1.0, 0.5], [3.0, 0.5]]
+    assert provider.batches == [["a", "bb"], ["ccc"]]
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+    assert stats["embeddings"] == 3
+    assert stats["bytes_stored"] == 3 * 2 * 4
+
+
+def test_embed_keys_include_the_model():
+    cache = EmbeddingCache()
+    provider = _Provider()
+    cache.embed(["a"], provider.embed_documents, "model")
+    cache.embed(["a"], provider.embed_documents, "model")
+    cache.embed(["a"], provider.embed_documents, "other")
+
+    assert len(provider.batches) == 2
+    assert cache.stats()["calls_saved"] == 1
+
+
+def test_embeddings_persist(tmp_path):
+    path = tmp_path / "embeddings.sqlite"
+    EmbeddingCache(path).embed(["a"], _Provider().embed_documents, "model")
+    provider = _Provider()
+
+    cache = EmbeddingCache(path)
+
+    assert cache.embed(["a"], provider.embed_documents, "model") == [[1.0, 0.5]]
+    assert provider.batches == []
+    assert cache.stats()["bytes_stored"] == 8
+
+
+def test_least_recently_used_embeddings_are_evicted():
+    cache = EmbeddingCache(max_bytes=16)
+    provider = _Provider()
+    cache.embed(["a"], provider.embed_documents, "model")
+    cache.embed(["b"], provider.embed_documents, "model")
+    cache.embed(["a"], provider.embed_documents, "model")
+    cache.embed(["c"], provider.embed_documents, "model")
+
+    cache.embed(["a", "b", "c"], provider.embed_documents, "model")
+
+    assert provider.batches[-1] == ["b"]
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_cached_embeddings():
+    provider = _Provider()
+    embeddings = CachedEmbeddings(provider, EmbeddingCache(), model="model")
+
+    assert embeddings.embed_documents(["a"]) == [[1.0, 0.5]]
+    assert embeddings.embed_query("a") == [1.0, 1.0]
+    assert embeddings.embed_documents(["a"]) == [[1.0, 0.5]]
+    assert provider.batches == [["a"]]
+
+
+@pytest.mark.parametrize("texts", [[], ["a"]])
+def test_stats_hit_rate(texts):
+    cache = EmbeddingCache()
+    cache.embed(texts, _Provider().embed_documents, "model")
+
+    assert cache.stats()["hit_rate"] == 0
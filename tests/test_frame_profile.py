@@ -0,0 +1,64 @@
+"""Tests of the cached DataFrame profiles"""
+
+import pandas as pd
+
+from panel_chat_examples.frame_profile import ProfileCache, frame_key, profile_frame
+
+DATA = pd.DataFrame(
+    {
+        "species": ["Adelie", "Adelie", "Gentoo", None],
+        "bill_length_mm": [38.0, 40.0, 47.5, None],
+        "id": [f"penguin-{i}" for i in range(4)],
+    }
+)
+
+
+def test_frame_key_changes_with_content_only():
+    assert frame_key(DATA) == frame_key(DATA.copy())
+    changed = DATA.copy()
+    changed.loc[0, "bill_length_mm"] = 39.0
+    assert frame_key(changed) != frame_key(DATA)
+    assert frame_key(DATA.rename(columns={"id": "name"})) != frame_key(DATA)
+
+
+def test_profile_frame():
+    profile = profile_frame(DATA, sample_rows=2)
+
+    assert profile.startswith("df has 4 rows and 3 columns.")
+    assert "- species (" in profile
+    assert "1 missing, 2 distinct: Adelie (2), Gentoo (1)" in profile
+    assert "min 38, 25% 39, median 40, 75% 43.75, max 47.5, mean 41.83" in profile
+    assert "Sample rows (CSV):\nspecies,bill_length_mm,id\n" in profile
+    assert len(profile.split("Sample rows (CSV):\n")[1].splitlines()) == 3
+
+
+def test_profile_frame_lists_top_values_of_many_distinct_values():
+    data = pd.DataFrame({"id": [f"penguin-{i}" for i in range(20)]})
+
+    assert "and 15 more" in profile_frame(data)
+
+
+def test_profile_cache_computes_each_content_once():
+    cache = ProfileCache(max_entries=1)
+
+    profile = cache.get(DATA)
+    assert cache.get(DATA.copy()) is profile
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    cache.get(DATA.head(2))
+    cache.get(DATA)
+    assert cache.stats() == {"hits": 1, "misses": 3, "entries": 1}
+
+
+def test_profile_cache_by_key_only_builds_the_dataframe_on_a_miss():
+    cache = ProfileCache()
+    calls = []
+
+    def data():
+        calls.append(1)
+        return DATA
+
+    profile = cache.get(data, key="file")
+    assert cache.get(data, key="file") is profile
+    assert profile == profile_frame(DATA)
+    assert len(calls) == 1
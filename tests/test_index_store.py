@@ -0,0 +1,106 @@
+"""Tests of the content addressed index store"""
+
+import pytest
+
+from panel_chat_examples.index_store import IndexStore
+
+
+def _build(size):
+    def build(path):
+        path.mkdir()
+        (path / "index.bin").write_bytes(b"0" * size)
+        return f"index of {path.name}"
+
+    return build
+
+
+def _load(path):
+    return f"loaded {path.name}"
+
+
+def test_get_builds_once(tmp_path):
+    store = IndexStore(tmp_path)
+    builds = []
+
+    def build(path):
+        builds.append(path)
+        return "index"
+
+    assert store.get("a", build) == "index"
+    assert store.get("a", build) == "index"
+    assert len(builds) == 1
+    assert store.stats()["hits"] == 1
+
+
+def test_get_loads_persisted_index_after_restart(tmp_path):
+    IndexStore(tmp_path).get("a", _build(10))
+
+    store = IndexStore(tmp_path)
+
+    assert "a" in store
+    assert store.get("a", _build(10), load=_load) == "loaded a"
+    assert store.stats()["bytes"] == 10
+
+
+class EmbeddingError(OSError):
+    pass
+
+
+def test_failed_build_is_not_stored(tmp_path):
+    store = IndexStore(tmp_path)
+
+    def build(path):
+        path.mkdir()
+        raise EmbeddingError
+
+    with pytest.raises(EmbeddingError):
+        store.get("a", build)
+
+    assert "a" not in store
+    assert not store.path("a").exists()
+
+
+def test_least_recently_used_indexes_are_evicted(tmp_path):
+    store = IndexStore(tmp_path, max_bytes=25)
+    for key in ("a", "b", "a", "c"):
+        store.get(key, _build(10))
+        store.release(key)
+
+    assert "b" not in store
+    assert not store.path("b").exists()
+    assert "a" in store
+    assert "c" in store
+    assert store.stats()["evictions"] == 1
+
+
+def test_referenced_indexes_are_not_evicted_or_unloaded(tmp_path):
+    store = IndexStore(tmp_path, max_bytes=15, max_loaded=0)
+    store.get("a", _build(10))
+    store.get("b", _build(10))
+
+    # both are in use, e.g. open in two sessions
+    assert "a" in store
+    assert store.stats()["loaded"] == 2
+
+    store.release("a")
+    assert "a" not in store
+    assert not store.path("a").exists()
+    assert store.stats()["loaded"] == 1
+
+    store.release("b")
+    assert "b" in store
+    assert store.stats()["loaded"] == 0
+    assert store.get("b", _build(10), load=_load) == "loaded b"
+
+
+def test_lookups_write_the_manifest_at_most_once_per_interval(tmp_path):
+    store = IndexStore(tmp_path)
+    store.get("a", _build(10))
+    manifest = tmp_path / "manifest.json"
+    written = manifest.read_text()
+
+    store.lookup("a")
+    assert manifest.read_text() == written
+
+    store.flush()
+    assert manifest.read_text() != written
@@ -0,0 +1,76 @@
+"""Tests of the streaming PDF ingestion pipeline"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from panel_chat_examples.ingest import ingest_pdf
+
+pytest.importorskip("pypdf")
+
+PDF = (Path(__file__).parent / "ui" / "example.pdf").read_bytes()
+
+
+class _Index:
+    def __init__(self):
+        self.texts = []
+        self.metadatas = []
+        self._lock = threading.Lock()
+
+    def add_texts(self, texts, metadatas):
+        with self._lock:
+            self.texts.extend(texts)
+            self.metadatas.extend(metadatas)
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_streams_progress_of_all_pages():
+    index = _Index()
+
+    with ThreadPoolExecutor() as executor:
+        progress = [
+            step
+            async for step in ingest_pdf(
+                PDF, index.add_texts, str.split, pages_per_task=1, executor=executor
+            )
+        ]
+
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert "Python" in index.texts
+    assert {metadata["page"] for metadata in index.metadatas} == {0, 1, 2}
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_parses_in_the_process_pool():
+    index = _Index()
+
+    progress = [step async for step in ingest_pdf(PDF, index.add_texts, str.split)]
+
+    assert progress == [(3, 3)]
+    assert len(index.texts) == len(index.metadatas) > 0
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_sends_the_path_not_the_bytes_to_the_workers():
+    index = _Index()
+    calls = []
+
+    class _Executor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            calls.append(args)
+            return super().submit(fn, *args, **kwargs)
+
+    with _Executor() as executor:
+        progress = [
+            step
+            async for step in ingest_pdf(
+                PDF, index.add_texts, str.split, pages_per_task=2, executor=executor
+            )
+        ]
+
+    assert progress[-1] == (3, 3)
+    assert all(not isinstance(arg, bytes) for args in calls for arg in args)
+    # the temporary file of the bytes is removed
+    assert not Path(calls[0][0]).exists()
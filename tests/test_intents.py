@@ -0,0 +1,109 @@
+"""Tests of the local answers to simple questions about a DataFrame"""
+
+import pandas as pd
+import pytest
+
+from panel_chat_examples.intents import IntentMatcher, normalize, resolve_column
+
+DATA = pd.DataFrame(
+    {
+        "species": ["Adelie", "Adelie", "Gentoo", "Chinstrap"],
+        "island": ["Dream", "Biscoe", "Biscoe", "Dream"],
+        "bill_length_mm": [38.0, 40.0, 47.5, None],
+    }
+)
+
+
+def test_normalize():
+    assert normalize("  Please tell me  How many species?? ") == "how many species"
+
+
+@pytest.mark.parametrize(
+    "phrase, column",
+    [
+        ("species", "species"),
+        ("islands", "island"),
+        ("the bill length", "bill_length_mm"),
+        ("Bill_Length_MM".lower(), "bill_length_mm"),
+        ("flipper length", None),
+    ],
+)
+def test_resolve_column(phrase, column):
+    assert resolve_column(phrase, DATA.columns) == column
+
+
+@pytest.mark.parametrize(
+    "question, text, code",
+    [
+        (
+            "How many species are there?",
+            "There are 3 species.",
+            "df['species'].nunique()",
+        ),
+        (
+            "What are the islands?",
+            "The islands in the dataframe are: Dream, Biscoe.",
+            "df['island'].unique()",
+        ),
+        ("How many rows are there?", "There are 4 rows.", "len(df)"),
+        (
+            "What is the average bill length per species?",
+            "The average bill length per species is as follows:\n\n"
+            "- Adelie: 39.00\n- Chinstrap: nan\n- Gentoo: 47.50",
+            "df.groupby('species')['bill_length_mm'].mean()",
+        ),
+        (
+            "max bill length",
+            "The max bill length is 47.50.",
+            "df['bill_length_mm'].max()",
+        ),
+        (
+            "How many penguins per island?",
+            "The number of rows per island is as follows:\n\n- Dream: 2\n- Biscoe: 2",
+            "df['island'].value_counts()",
+        ),
+        (
+            "How many missing values in bill length?",
+            "There is 1 missing value in bill length.",
+            "df['bill_length_mm'].isna().sum()",
+        ),
+    ],
+)
+def test_answer(question, text, code):
+    answer = IntentMatcher().answer(question, DATA)
+
+    assert (answer.text, answer.code) == (text, code)
+    assert answer.seconds < 1
+
+
+@pytest.mark.parametrize(
+    "question, text",
+    [
+        ("How many rows are there?", "There is 1 row."),
+        ("How many species are there?", "There is 1 species."),
+        ("How many islands are there?", "There is 1 island."),
+        ("How many missing values are there?", "There is 1 missing value:"),
+    ],
+)
+def test_answer_of_one_is_singular(question, text):
+    data = pd.DataFrame(
+        {"species": ["Adelie"], "island": ["Dream"], "bill_length_mm": [None]}
+    )
+
+    assert IntentMatcher().answer(question, data).text.startswith(text)
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "Which species has the longest bill?",
+        "What is the average flipper length?",
+        "What is the average species?",
+        "Plot the bill length",
+    ],
+)
+def test_other_questions_are_passed_on(question):
+    matcher = IntentMatcher()
+
+    assert matcher.answer(question, DATA) is None
+    assert matcher.stats() == {"answered": 0, "passed": 1, "answered_rate": 0.0}
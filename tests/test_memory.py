@@ -0,0 +1,46 @@
+"""Tests of the token counted chat memory"""
+
+from panel_chat_examples.memory import TokenBufferMemory
+
+
+class _Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, message):
+        self.calls += 1
+        return len(message.split())
+
+
+def test_update_only_counts_new_messages():
+    count_tokens = _Counter()
+    memory = TokenBufferMemory(count_tokens, max_token_limit=100)
+    history = ["one two", "three"]
+    memory.update(history)
+
+    history.append("four five six")
+    messages = memory.update(history)
+
+    assert messages == ["one two", "three", "four five six"]
+    assert memory.total_tokens == 6
+    assert count_tokens.calls == 3
+
+
+def test_update_evicts_from_the_front():
+    memory = TokenBufferMemory(_Counter(), max_token_limit=4)
+
+    messages = memory.update(["one two", "three", "four five six"])
+
+    assert messages == ["three", "four five six"]
+    assert memory.total_tokens == 4
+
+
+def test_update_rebuilds_when_history_does_not_continue():
+    count_tokens = _Counter()
+    memory = TokenBufferMemory(count_tokens, max_token_limit=100)
+    memory.update(["one", "two", "three"])
+
+    messages = memory.update(["one", "other"])
+
+    assert messages == ["one", "other"]
+    assert count_tokens.calls == 5
@@ -0,0 +1,83 @@
+"""Tests of the mock OpenAI API"""
+
+import json
+
+import pytest
+import pytest_asyncio
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+
+from panel_chat_examples.mock_server import MockConfig, create_app, embed
+
+
+@pytest_asyncio.fixture
+async def mock_url():
+    config = MockConfig(
+        ttft=0, tokens_per_second=10_000, reply_tokens=5, tool_arguments={"t": {"a": 1}}
+    )
+    sock, port = bind_unused_port()
+    server = HTTPServer(create_app(config))
+    server.add_sockets([sock])
+    yield f"http://localhost:{port}"
+    server.stop()
+
+
+async def _post(url, body):
+    response = await AsyncHTTPClient().fetch(url, method="POST", body=json.dumps(body))
+    return response.body.decode("utf8")
+
+
+@pytest.mark.asyncio
+async def test_chat_completion(mock_url):
+    body = {"model": "mock", "messages": [{"role": "user", "content": "Hi"}]}
+
+    response = json.loads(await _post(f"{mock_url}/v1/chat/completions", body))
+
+    assert response["choices"][0]["message"]["content"].split() == [
+        "lorem",
+        "ipsum",
+        "dolor",
+        "sit",
+        "amet",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_stream_with_tool_calls(mock_url):
+    tools = [{"type": "function", "function": {"name": "t", "parameters": {}}}]
+    body = {"messages": [], "tools": tools, "stream": True}
+
+    events = (await _post(f"{mock_url}/v1/chat/completions", body)).split("\n\n")
+
+    assert events[-2] == "data: [DONE]"
+    chunks = [json.loads(event[len("data: ") :]) for event in events[:-2]]
+    arguments = "".join(
+        call["function"]["arguments"]
+        for chunk in chunks
+        for call in chunk["choices"][0]["delta"].get("tool_calls", [])
+    )
+    assert json.loads(arguments) == {"a": 1}
+    assert chunks[-1]["choices"][0]["finish_reason"] == "tool_calls"
+
+
+@pytest.mark.asyncio
+async def test_images(mock_url):
+    body = {"prompt": "A cat", "n": 2}
+
+    response = json.loads(await _post(f"{mock_url}/v1/images/generations", body))
+
+    assert len(response["data"]) == 2
+    assert response["data"][0]["url"].endswith("/mock.png")
+
+
+def test_embed_is_normalized_and_similar_for_shared_words():
+    cat = embed("the cat sat", 64)
+    cats = embed("the cat ran", 64)
+    dog = embed("a dog barked loudly", 64)
+
+    def dot(a, b):
+        return sum(x * y for x, y in zip(a, b))
+
+    assert dot(cat, cat) == pytest.approx(1)
+    assert dot(cat, cats) > dot(cat, dog)
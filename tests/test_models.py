@@ -0,0 +1,71 @@
+"""Tests of the shared local model manager"""
+
+import asyncio
+import threading
+
+import pytest
+
+from panel_chat_examples.models import SharedModel, get_shared_model
+
+
+@pytest.mark.asyncio
+async def test_acquire_loads_once_for_concurrent_sessions():
+    started = threading.Event()
+    loaded = threading.Event()
+
+    def load():
+        started.set()
+        loaded.wait(5)
+        return object()
+
+    shared_model = SharedModel(load)
+    sessions = [asyncio.create_task(shared_model.acquire()) for _ in range(3)]
+    await asyncio.sleep(0)
+    started.wait(5)
+
+    assert shared_model.status == "loading"
+    loaded.set()
+    models = await asyncio.gather(*sessions)
+
+    assert models[0] is models[1] is models[2] is shared_model.model
+    assert shared_model.stats()["users"] == 3
+    assert shared_model.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_release_unloads_without_users_unless_kept_loaded():
+    unloaded = []
+    shared_model = SharedModel(object, unload=unloaded.append, keep_loaded=False)
+    model = await shared_model.acquire()
+    await shared_model.acquire()
+
+    shared_model.release()
+    assert shared_model.status == "ready"
+    shared_model.release()
+
+    assert unloaded == [model]
+    assert shared_model.status == "unloaded"
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_retried():
+    attempts = []
+
+    def load():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionResetError
+        return "model"
+
+    shared_model = SharedModel(load)
+    with pytest.raises(OSError):
+        await shared_model.acquire()
+    assert shared_model.status == "failed"
+
+    assert await shared_model.acquire() == "model"
+
+
+def test_get_shared_model_is_process_wide():
+    shared_model = get_shared_model("test", object)
+
+    assert get_shared_model("test", list) is shared_model
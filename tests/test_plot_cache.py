@@ -0,0 +1,81 @@
+"""Tests of the cache of built plots"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from panel_chat_examples.plot_cache import PlotCache, canonical_key
+
+
+def test_canonical_key_ignores_order_of_arguments():
+    assert canonical_key({"x": "year", "by": ["country"]}) == canonical_key(
+        {"by": ("country",), "x": "year"}
+    )
+    assert canonical_key({"x": "year"}) != canonical_key({"x": "pop"})
+
+
+def test_get_builds_each_plot_once():
+    cache = PlotCache()
+    builds = []
+
+    def build(kwargs):
+        builds.append(kwargs)
+        return object()
+
+    kwargs = {"kind": "line", "x": "year"}
+    plot = cache.get("gapminder", kwargs, lambda: build(kwargs))
+
+    assert cache.get("gapminder", dict(reversed(kwargs.items())), build) is plot
+    assert cache.get("other", kwargs, lambda: build(kwargs)) is not plot
+    assert len(builds) == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3, "entries": 2}
+
+
+def test_least_recently_used_plot_is_evicted():
+    cache = PlotCache(max_entries=2)
+    for kind in ("line", "scatter"):
+        cache.get("gapminder", {"kind": kind}, object)
+    cache.get("gapminder", {"kind": "line"}, object)
+    cache.get("gapminder", {"kind": "bar"}, object)
+
+    misses = cache.stats()["misses"]
+    cache.get("gapminder", {"kind": "line"}, object)
+    cache.get("gapminder", {"kind": "scatter"}, object)
+    assert cache.stats()["misses"] == misses + 1
+
+
+def test_concurrent_requests_share_one_build():
+    cache = PlotCache()
+    started = threading.Event()
+    release = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(1)
+        started.set()
+        release.wait(5)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(cache.get, "gapminder", {"kind": "line"}, build)
+        started.wait(5)
+        second = executor.submit(cache.get, "gapminder", {"kind": "line"}, build)
+        release.set()
+        plots = first.result(), second.result()
+
+    assert plots[0] is plots[1]
+    assert len(builds) == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_failed_build_is_not_cached():
+    cache = PlotCache()
+
+    def fail():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        cache.get("gapminder", {"kind": "line"}, fail)
+    assert cache.get("gapminder", {"kind": "line"}, object) is not None
+    assert cache.stats()["misses"] == 2
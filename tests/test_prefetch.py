@@ -0,0 +1,127 @@
+"""Tests of the retrieval prefetching while typing"""
+
+import asyncio
+
+import pytest
+
+from panel_chat_examples.prefetch import RetrievalPrefetcher, normalize
+
+
+class _Retriever:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        await asyncio.sleep(self.delay)
+        return [text.upper()]
+
+
+def test_normalize():
+    assert normalize("  Who   founded\nthe PSF?? ") == "who founded the psf"
+
+
+@pytest.mark.asyncio
+async def test_get_reuses_debounced_prefetch():
+    retriever = _Retriever()
+    prefetcher = RetrievalPrefetcher(retriever, debounce=0.01)
+
+    for text in ("Who found", "Who founded", "Who founded the PSF"):
+        prefetcher.update(text, context=2)
+    await asyncio.sleep(0.05)
+
+    assert retriever.calls == ["who founded the psf"]
+    assert await prefetcher.get("Who founded the PSF?", context=2) == [
+        "WHO FOUNDED THE PSF"
+    ]
+    assert retriever.calls == ["who founded the psf"]
+    assert prefetcher.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_reuses_near_match_of_same_context():
+    retriever = _Retriever()
+    prefetcher = RetrievalPrefetcher(retriever, debounce=0.01)
+
+    prefetcher.update("When was the PSF founde", context=2)
+    await asyncio.sleep(0.05)
+
+    assert await prefetcher.get("When was the PSF founded", context=2) == [
+        "WHEN WAS THE PSF FOUNDE"
+    ]
+    assert prefetcher.stats()["near_hits"] == 1
+    await prefetcher.get("When was the PSF founded", context=3)
+    assert prefetcher.stats()["misses"] == 1
+    assert len(retriever.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_does_not_reuse_prefetch_of_other_numbers():
+    retriever = _Retriever()
+    prefetcher = RetrievalPrefetcher(retriever, debounce=0.01)
+
+    prefetcher.update("What were the sales in 2022", context=2)
+    await asyncio.sleep(0.05)
+
+    assert await prefetcher.get("What were the sales in 2021", context=2) == [
+        "WHAT WERE THE SALES IN 2021"
+    ]
+    assert prefetcher.stats()["near_hits"] == 0
+    assert prefetcher.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_does_not_reuse_prefetch_of_less_similar_text():
+    retriever = _Retriever()
+    prefetcher = RetrievalPrefetcher(retriever, debounce=0.01)
+
+    prefetcher.update("Who founded the PSF", context=2)
+    await asyncio.sleep(0.05)
+
+    await prefetcher.get("Who founded the NSF", context=2)
+    assert prefetcher.stats()["near_hits"] == 0
+    assert retriever.calls == ["who founded the psf", "who founded the nsf"]
+
+
+@pytest.mark.asyncio
+async def test_stale_prefetch_is_cancelled():
+    retriever = _Retriever(delay=0.2)
+    prefetcher = RetrievalPrefetcher(retriever, debounce=0.01)
+
+    prefetcher.update("Who is the president")
+    await asyncio.sleep(0.05)
+    prefetcher.update("How many tiers of membership")
+    await asyncio.sleep(0.05)
+
+    assert prefetcher.stats()["cancelled"] == 1
+    assert await prefetcher.get("How many tiers of membership?") == [
+        "HOW MANY TIERS OF MEMBERSHIP"
+    ]
+    assert prefetcher.stats()["prefetches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_get_cancels_unused_prefetch_and_retrieves():
+    retriever = _Retriever(delay=0.2)
+    prefetcher = RetrievalPrefetcher(retriever, debounce=0.01)
+
+    prefetcher.update("Which trademarks")
+    await asyncio.sleep(0.05)
+
+    assert await prefetcher.get("How are fellows elevated") == [
+        "HOW ARE FELLOWS ELEVATED"
+    ]
+    stats = prefetcher.stats()
+    assert (stats["misses"], stats["cancelled"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_short_text_is_not_prefetched():
+    retriever = _Retriever()
+    prefetcher = RetrievalPrefetcher(retriever, debounce=0.01)
+
+    prefetcher.update("Who")
+    await asyncio.sleep(0.05)
+
+    assert retriever.calls == []
@@ -0,0 +1,72 @@
+"""Tests of the per session prompt state cache"""
+
+from panel_chat_examples.prompt_state import PromptStateCache
+
+
+class _State:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.llama_state_size = 10 * len(tokens)
+
+
+class _Model:
+    def __init__(self):
+        self.tokens = []
+        self.loads = 0
+
+    def save_state(self):
+        return _State(list(self.tokens))
+
+    def load_state(self, state):
+        self.tokens = list(state.tokens)
+        self.loads += 1
+
+
+def test_restore_loads_the_state_of_the_session():
+    model = _Model()
+    prompt_states = PromptStateCache()
+    model.tokens = ["a1"]
+    prompt_states.save("a", model)
+    model.tokens = ["b1"]
+    prompt_states.save("b", model)
+
+    assert prompt_states.restore("a", model)
+    assert model.tokens == ["a1"]
+    assert not prompt_states.restore("c", model)
+
+
+def test_restore_skips_loading_the_state_in_the_model():
+    model = _Model()
+    prompt_states = PromptStateCache()
+    prompt_states.save("a", model)
+
+    assert prompt_states.restore("a", model)
+    assert model.loads == 0
+
+
+def test_states_are_evicted_least_recently_used_first():
+    model = _Model()
+    prompt_states = PromptStateCache(max_bytes=50)
+    for session in "abc":
+        model.tokens = [session, session]
+        prompt_states.save(session, model)
+
+    assert prompt_states.stats() == {
+        "sessions": 2,
+        "bytes": 40,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 1,
+    }
+    assert not prompt_states.restore("a", model)
+
+
+def test_discard_removes_the_state_of_the_session():
+    model = _Model()
+    prompt_states = PromptStateCache()
+    prompt_states.save("a", model)
+
+    prompt_states.discard("a")
+
+    assert not prompt_states.restore("a", model)
+    assert prompt_states.stats()["bytes"] == 0
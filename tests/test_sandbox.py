@@ -0,0 +1,79 @@
+"""Tests of the out of process sandbox of generated pandas code"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from panel_chat_examples.columnar import read_csv
+from panel_chat_examples.sandbox import (
+    PandasSandbox,
+    SandboxTimeoutError,
+    share_table,
+)
+
+pytest.importorskip("pyarrow")
+
+PENGUINS = (Path(__file__).parent / "ui" / "penguins.csv").read_bytes()
+
+
+@pytest.fixture(scope="module")
+def table_path():
+    path = share_table(read_csv(PENGUINS))
+    yield path
+    path.unlink()
+
+
+@pytest.fixture
+def sandbox():
+    sandbox = PandasSandbox(max_workers=1, timeout=30)
+    yield sandbox
+    sandbox.close()
+
+
+def test_run_returns_last_expression_or_printed_output(sandbox, table_path):
+    result = sandbox.run("```python\ndf.species.nunique()\n```", table_path)
+    assert result.output == "3"
+    assert result.seconds > 0
+
+    result = sandbox.run(
+        "species = df.species.unique()\nprint(len(species))", table_path
+    )
+    assert result.output == "3\n"
+    assert sandbox.stats()["calls"] == 2
+    assert sandbox.stats()["workers"] == 1
+
+
+def test_run_returns_exceptions_as_text(sandbox, table_path):
+    result = sandbox.run("df['missing']", table_path)
+    assert result.output.startswith("KeyError")
+
+    # the worker keeps serving
+    assert sandbox.run("len(df)", table_path).output == "344"
+
+
+@pytest.mark.asyncio
+async def test_timeout_replaces_worker(sandbox, table_path):
+    sandbox.run("len(df)", table_path)
+    sandbox.timeout = 0.5
+
+    with pytest.raises(SandboxTimeoutError):
+        await sandbox.arun("while True: pass", table_path)
+
+    stats = sandbox.stats()
+    assert (stats["timeouts"], stats["workers"]) == (1, 0)
+    sandbox.timeout = 30
+    assert (await sandbox.arun("df.year.max()", table_path)).output == "2009"
+
+
+@pytest.mark.skipif(
+    sys.platform != "linux", reason="RLIMIT_DATA is only enforced on Linux"
+)
+def test_memory_limit_is_reported(table_path):
+    sandbox = PandasSandbox(max_workers=1, timeout=30, memory_limit=1024**3)
+    try:
+        result = sandbox.run("len(bytearray(4 * 1024**3))", table_path)
+    finally:
+        sandbox.close()
+
+    assert result.output.startswith("MemoryError")
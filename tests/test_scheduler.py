@@ -0,0 +1,115 @@
+"""Tests of the fair inference scheduler"""
+
+import asyncio
+import threading
+
+import pytest
+
+from panel_chat_examples.scheduler import InferenceScheduler, QueueFullError
+
+
+async def _collect(deltas):
+    return [delta async for delta in deltas]
+
+
+def _blocked(gate, name):
+    def create():
+        gate.wait(5)
+        yield name
+
+    return create
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_chunks_of_the_request():
+    scheduler = InferenceScheduler()
+
+    chunks = await _collect(scheduler.stream("a", lambda: iter(["Hello", " World"])))
+
+    assert chunks == ["Hello", " World"]
+    assert scheduler.stats()["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_requests_are_served_round_robin_across_sessions():
+    scheduler = InferenceScheduler()
+    gate = threading.Event()
+    order = []
+
+    async def request(session, name):
+        order.extend(await _collect(scheduler.stream(session, _blocked(gate, name))))
+
+    tasks = [asyncio.create_task(request("blocker", "blocker"))]
+    await asyncio.sleep(0.05)
+    for session, name in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]:
+        tasks.append(asyncio.create_task(request(session, name)))
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.05)
+    gate.set()
+    await asyncio.gather(*tasks)
+
+    assert order == ["blocker", "a1", "b1", "a2", "a3"]
+
+
+@pytest.mark.asyncio
+async def test_on_position_reports_requests_ahead():
+    scheduler = InferenceScheduler()
+    gate = threading.Event()
+    positions = []
+
+    first = asyncio.create_task(_collect(scheduler.stream("a", _blocked(gate, "a"))))
+    await asyncio.sleep(0.05)
+    second = asyncio.create_task(
+        _collect(scheduler.stream("b", _blocked(gate, "b"), positions.append))
+    )
+    await asyncio.sleep(0.05)
+    gate.set()
+    await asyncio.gather(first, second)
+
+    assert positions == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_queue_is_bounded():
+    scheduler = InferenceScheduler(max_queue=1)
+    gate = threading.Event()
+
+    running = asyncio.create_task(_collect(scheduler.stream("a", _blocked(gate, "a"))))
+    await asyncio.sleep(0.05)
+    queued = asyncio.create_task(_collect(scheduler.stream("b", _blocked(gate, "b"))))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(QueueFullError):
+        await _collect(scheduler.stream("c", _blocked(gate, "c")))
+    gate.set()
+    await asyncio.gather(running, queued)
+    assert scheduler.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_session_drops_queued_and_stops_running_requests():
+    scheduler = InferenceScheduler()
+    gate = threading.Event()
+    produced = []
+
+    def create():
+        gate.wait(5)
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    running = asyncio.create_task(_collect(scheduler.stream("a", create)))
+    await asyncio.sleep(0.05)
+    queued = asyncio.create_task(_collect(scheduler.stream("a", create)))
+    await asyncio.sleep(0.05)
+    scheduler.cancel_session("a")
+    gate.set()
+
+    assert await queued == []
+    await running
+    await asyncio.sleep(0.05)
+    stats = scheduler.stats()
+    assert stats["cancelled"] == 2
+    assert stats["queue_depth"] == 0
+    assert stats["running"] == 0
+    assert len(produced) <= 1
@@ -0,0 +1,62 @@
+"""Tests of the incremental serialization of the chat history"""
+
+import panel as pn
+
+from panel_chat_examples.serialize import SerializedHistory
+
+
+def _chat_interface(n_messages):
+    instance = pn.chat.ChatInterface(help_text="Some help")
+    for index in range(n_messages):
+        user = "User" if index % 2 == 0 else instance.callback_user
+        instance.send(f"Message {index}", user=user, respond=False)
+    return instance
+
+
+def test_serialize_matches_chat_feed_serialize():
+    instance = _chat_interface(4)
+    history = SerializedHistory(instance)
+
+    assert history.serialize() == instance.serialize()
+
+
+def test_serialize_only_converts_new_messages():
+    instance = _chat_interface(30)
+    history = SerializedHistory(instance)
+    messages = history.serialize()
+    assert history.conversions == 30
+
+    instance.send("Another message", respond=False)
+
+    assert history.serialize() is messages
+    assert history.conversions == 31
+    assert messages == instance.serialize()
+
+
+def test_serialize_reconverts_changed_messages():
+    instance = _chat_interface(3)
+    history = SerializedHistory(instance)
+    history.serialize()
+
+    instance.objects[1].stream(" streamed")
+
+    assert history.serialize() == instance.serialize()
+    assert history.conversions == 4
+
+
+def test_serialize_removed_messages():
+    instance = _chat_interface(4)
+    history = SerializedHistory(instance)
+    history.serialize()
+
+    instance.undo(2)
+
+    assert history.serialize() == instance.serialize()
+    assert history.conversions == 4
+
+
+def test_serialize_with_converter():
+    instance = _chat_interface(2)
+    history = SerializedHistory(instance, converter=lambda msg: msg["content"])
+
+    assert history.serialize() == ["Message 0", "Message 1"]
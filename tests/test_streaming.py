@@ -0,0 +1,106 @@
+"""Tests of the streaming helpers"""
+
+from types import SimpleNamespace
+
+import panel as pn
+import pytest
+
+from panel_chat_examples.streaming import (
+    ToolCallParser,
+    openai_delta,
+    stream_deltas,
+    stream_tool_calls,
+)
+
+
+def _openai_chunk(content):
+    delta = SimpleNamespace(content=content, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _tool_call_chunk(index, arguments, name=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    delta = SimpleNamespace(
+        content=None, tool_calls=[SimpleNamespace(index=index, function=function)]
+    )
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+async def _async_parts(parts):
+    for part in parts:
+        yield part
+
+
+@pytest.mark.asyncio
+async def test_stream_deltas_appends_to_single_message():
+    instance = pn.chat.ChatInterface()
+    parts = ["Hello", " ", "World", "!"]
+
+    message = await stream_deltas(_async_parts(parts), instance, flush_interval=60)
+
+    assert message.object == "Hello World!"
+    assert message.user == instance.callback_user
+    assert instance.objects == [message]
+
+
+@pytest.mark.asyncio
+async def test_stream_deltas_sync_iterable_with_get_delta():
+    instance = pn.chat.ChatInterface()
+    chunks = [_openai_chunk("a"), _openai_chunk(None), _openai_chunk("b")]
+
+    message = await stream_deltas(
+        chunks, instance, get_delta=openai_delta, user="Bot", avatar="🤖"
+    )
+
+    assert message.object == "ab"
+    assert message.user == "Bot"
+    assert message.avatar == "🤖"
+
+
+@pytest.mark.asyncio
+async def test_stream_deltas_without_text_returns_none():
+    instance = pn.chat.ChatInterface()
+
+    assert await stream_deltas([None, ""], instance) is None
+    assert not instance.objects
+
+
+def test_tool_call_parser_completes_call_when_object_closes():
+    parser = ToolCallParser()
+    deltas = [
+        _tool_call_chunk(0, "", name="hvplot"),
+        _tool_call_chunk(0, '{"x": "year", "title": "a } \\" ['),
+        _tool_call_chunk(0, '", "by": ["country"]'),
+        _tool_call_chunk(0, "}"),
+        _tool_call_chunk(1, '{"width": 4', name="renderer"),
+    ]
+    completed = [parser.feed(chunk.choices[0].delta.tool_calls) for chunk in deltas]
+
+    assert completed[:3] == [[], [], []]
+    assert completed[3] == [
+        ("hvplot", {"x": "year", "title": 'a } " [', "by": ["country"]})
+    ]
+    assert not completed[4]
+    with pytest.raises(ValueError, match="Expecting"):
+        parser.finish()
+
+
+@pytest.mark.asyncio
+async def test_stream_tool_calls_yields_each_call_before_the_next_ends():
+    received = []
+
+    async def chunks():
+        yield _openai_chunk("")
+        yield _tool_call_chunk(0, '{"kind": "line"}', name="hvplot")
+        received.append("renderer started")
+        yield _tool_call_chunk(1, '{"width": 400', name="renderer")
+        yield _tool_call_chunk(1, "}")
+
+    async for name, arguments in stream_tool_calls(chunks()):
+        received.append((name, arguments))
+
+    assert received == [
+        ("hvplot", {"kind": "line"}),
+        "renderer started",
+        ("renderer", {"width": 400}),
+    ]